@@ -1,23 +1,20 @@
 """
 Angle Generator Agent - Creates distinct engaging angles for LinkedIn content
 """
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.output_parsers import StrOutputParser
+from agents.llm_factory import create_llm
+from agents.prompt_prefix import PromptPrefix
 
 
 class AngleGeneratorAgent:
     """Agent responsible for generating creative content angles."""
     
-    def __init__(self, google_api_key: str):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=google_api_key,
-            temperature=0.6
-        )
+    def __init__(self, google_api_key: str, prefix_backend=None, settings=None):
+        self.llm = create_llm("angle_generation", google_api_key, settings)
         
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a creative content strategist specializing in LinkedIn engagement and thought leadership.
+        self.prefix = PromptPrefix(
+            name="angle_generation",
+            system="""You are a creative content strategist specializing in LinkedIn engagement and thought leadership.
 
 Your role is to take a single topic and generate 3 distinct, engaging angles that would work well for LinkedIn posts.
 
@@ -54,11 +51,12 @@ Key points: [3-4 bullet points]
 Hook: [Engaging opening line]
 Core Message: [Main argument/perspective]
 Why it works: [Engagement reasoning]
-Key points: [3-4 bullet points]"""),
-            ("human", "Generate 3 distinct engaging angles for this topic:\n\n{topic}")
-        ])
+Key points: [3-4 bullet points]""",
+            human="Generate 3 distinct engaging angles for this topic:\n\n{topic}"
+        )
+        self.prompt = self.prefix.template
         
-        self.chain = self.prompt | self.llm | StrOutputParser()
+        self.chain = self.prefix.build_chain(self.llm, prefix_backend) | StrOutputParser()
     
     def generate_angles(self, topic: str) -> str:
         """Generate 3 distinct angles for the given topic."""
@@ -67,3 +65,10 @@ Key points: [3-4 bullet points]"""),
             return result
         except Exception as e:
             return f"Error generating angles: {str(e)}"
+    
+    async def agenerate_angles(self, topic: str) -> str:
+        """Async version of generate_angles."""
+        try:
+            return await self.chain.ainvoke({"topic": topic})
+        except Exception as e:
+            return f"Error generating angles: {str(e)}"
@@ -1,23 +1,30 @@
 """
 Critique Agent - Provides adversarial feedback on LinkedIn post drafts
 """
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+import os
+import re
+from typing import List, Optional
 from langchain_core.output_parsers import StrOutputParser
+from agents.llm_factory import create_llm
+from agents.prompt_prefix import PromptPrefix, estimate_tokens
+from config.settings import load_settings
+
+
+_SCORE_RE = re.compile(r"SCORE[*:\s]*(\d{1,3})")
+_HASHTAGS_RE = re.compile(r"HASHTAGS[*:\s]*(.*)")
+_CRITIQUE_HEADER_RE = re.compile(r"^[#*=\s]*CRITIQUE\s+(\d+)[#*=\s]*$", re.MULTILINE)
+
+# Output tokens one critique in the format below takes, with headroom
+CRITIQUE_OUTPUT_TOKENS = 700
 
 
 class CritiqueAgent:
     """Agent responsible for providing quality control and improvement feedback."""
     
-    def __init__(self, google_api_key: str):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=google_api_key,
-            temperature=0.3
-        )
+    def __init__(self, google_api_key: str, prefix_backend=None, settings=None):
+        self.llm = create_llm("critique", google_api_key, settings)
         
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a world-class social media editor and LinkedIn engagement expert with years of experience optimizing content for maximum professional impact.
+        system = """You are a world-class social media editor and LinkedIn engagement expert with years of experience optimizing content for maximum professional impact.
 
 Your role is to critically review LinkedIn post drafts and provide actionable feedback for improvement. You have a keen eye for what works and what doesn't on LinkedIn.
 
@@ -73,11 +80,35 @@ Provide your feedback in this format:
 **PRIORITY FIXES:**
 - [Top 3 most important changes needed]
 
-Be direct, specific, and constructive. Focus on actionable improvements that will significantly enhance the post's performance."""),
-            ("human", "Review this LinkedIn post draft and provide detailed improvement feedback:\n\n{draft}")
-        ])
+**SCORE:** [0-100: how ready the draft is to publish as-is; 90 or above means it only needs hashtags and light formatting]
+**HASHTAGS:** [3-5 relevant hashtags mixing popular and niche ones, e.g. #Leadership #DataEngineering]
+
+Be direct, specific, and constructive. Focus on actionable improvements that will significantly enhance the post's performance."""
+        
+        self.prefix = PromptPrefix(
+            name="critique",
+            system=system,
+            human="Review this LinkedIn post draft and provide detailed improvement feedback:\n\n{draft}"
+        )
+        self.prompt = self.prefix.template
+        
+        self.chain = self.prefix.build_chain(self.llm, prefix_backend) | StrOutputParser()
+        
+        # Several drafts per call: the system prompt and round trip are paid once per batch
+        self.batch_prefix = PromptPrefix(
+            name="critique_batch",
+            system=system + """
+
+You will receive several drafts, each under a "=== DRAFT n ===" line. Review every draft independently, in order. Start the review of draft n with a line "=== CRITIQUE n ===" and give the complete feedback format above for it, including its own SCORE and HASHTAGS lines.""",
+            human="Review each of these {count} LinkedIn post drafts and provide detailed improvement feedback:\n\n{drafts}"
+        )
+        self.batch_llm = create_llm("critique_batch", google_api_key, settings)
+        self.batch_chain = self.batch_prefix.build_chain(self.batch_llm, prefix_backend) | StrOutputParser()
         
-        self.chain = self.prompt | self.llm | StrOutputParser()
+        output_tokens = (settings or load_settings()).stage("critique_batch").max_output_tokens or 8192
+        self.batch_max_drafts = max(1, min(int(os.getenv("CRITIQUE_BATCH_MAX_DRAFTS", "8")),
+                                           output_tokens // CRITIQUE_OUTPUT_TOKENS))
+        self.batch_input_tokens = int(os.getenv("CRITIQUE_BATCH_TOKENS", "6000"))
     
     def critique(self, draft: str) -> str:
         """Provide detailed critique and improvement suggestions for the draft."""
@@ -86,3 +117,95 @@ Be direct, specific, and constructive. Focus on actionable improvements that wil
             return result
         except Exception as e:
             return f"Error during critique: {str(e)}"
+    
+    async def acritique(self, draft: str) -> str:
+        """Async version of critique."""
+        try:
+            return await self.chain.ainvoke({"draft": draft})
+        except Exception as e:
+            return f"Error during critique: {str(e)}"
+    
+    def pack(self, drafts: List[str]) -> List[List[int]]:
+        """Group draft indexes into batches under the input-token budget and the output room for critiques."""
+        groups, tokens = [], 0
+        for index, draft in enumerate(drafts):
+            size = estimate_tokens(draft)
+            if groups and len(groups[-1]) < self.batch_max_drafts and tokens + size <= self.batch_input_tokens:
+                groups[-1].append(index)
+                tokens += size
+            else:
+                groups.append([index])
+                tokens = size
+        return groups
+    
+    @staticmethod
+    def _batch_input(drafts: List[str]) -> dict:
+        sections = [f"=== DRAFT {number} ===\n{draft.strip()}" for number, draft in enumerate(drafts, start=1)]
+        return {"count": len(drafts), "drafts": "\n\n".join(sections)}
+    
+    @classmethod
+    def split_batch(cls, output: str, count: int) -> List[Optional[str]]:
+        """Per-draft critiques from a batched response; None where a section is missing or has no score."""
+        critiques: List[Optional[str]] = [None] * count
+        headers = list(_CRITIQUE_HEADER_RE.finditer(output or ""))
+        for position, header in enumerate(headers):
+            number = int(header.group(1))
+            end = headers[position + 1].start() if position + 1 < len(headers) else len(output)
+            section = output[header.end():end].strip()
+            if 1 <= number <= count and critiques[number - 1] is None and cls.parse_score(section) is not None:
+                critiques[number - 1] = section
+        return critiques
+    
+    def critique_batch(self, drafts: List[str]) -> List[str]:
+        """Critique several drafts in as few calls as the budget allows, in input order.
+        
+        Groups run concurrently. Any draft whose critique cannot be found in
+        its group's response is critiqued on its own.
+        """
+        groups = [group for group in self.pack(drafts) if len(group) > 1]
+        outputs = self.batch_chain.batch([self._batch_input([drafts[i] for i in group]) for group in groups],
+                                         return_exceptions=True)
+        critiques = self._assign(len(drafts), groups, outputs)
+        
+        missing = [index for index, critique in enumerate(critiques) if critique is None]
+        fallbacks = self.chain.batch([{"draft": drafts[i]} for i in missing], return_exceptions=True)
+        return self._fill(critiques, missing, fallbacks)
+    
+    async def acritique_batch(self, drafts: List[str]) -> List[str]:
+        """Async version of critique_batch."""
+        groups = [group for group in self.pack(drafts) if len(group) > 1]
+        outputs = await self.batch_chain.abatch([self._batch_input([drafts[i] for i in group]) for group in groups],
+                                                return_exceptions=True)
+        critiques = self._assign(len(drafts), groups, outputs)
+        
+        missing = [index for index, critique in enumerate(critiques) if critique is None]
+        fallbacks = await self.chain.abatch([{"draft": drafts[i]} for i in missing], return_exceptions=True)
+        return self._fill(critiques, missing, fallbacks)
+    
+    def _assign(self, count: int, groups: List[List[int]], outputs: list) -> List[Optional[str]]:
+        critiques: List[Optional[str]] = [None] * count
+        for group, output in zip(groups, outputs):
+            if isinstance(output, str):
+                for index, critique in zip(group, self.split_batch(output, len(group))):
+                    critiques[index] = critique
+        return critiques
+    
+    @staticmethod
+    def _fill(critiques: List[Optional[str]], missing: List[int], fallbacks: list) -> List[str]:
+        for index, output in zip(missing, fallbacks):
+            critiques[index] = output if isinstance(output, str) else f"Error during critique: {str(output)}"
+        return critiques
+    
+    @staticmethod
+    def parse_score(critique: str) -> Optional[int]:
+        """Quality score (0-100) from the critique's SCORE line, or None if it is missing."""
+        match = _SCORE_RE.search(critique or "")
+        if not match:
+            return None
+        return min(100, int(match.group(1)))
+    
+    @staticmethod
+    def parse_hashtags(critique: str) -> List[str]:
+        """Hashtags suggested on the critique's HASHTAGS line."""
+        match = _HASHTAGS_RE.search(critique or "")
+        return re.findall(r"#\w+", match.group(1)) if match else []
@@ -1,23 +1,20 @@
 """
 Drafting Agent - Writes engaging LinkedIn posts based on topic and angle
 """
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.output_parsers import StrOutputParser
+from agents.llm_factory import create_llm
+from agents.prompt_prefix import PromptPrefix
 
 
 class DraftingAgent:
     """Agent responsible for writing LinkedIn post drafts."""
     
-    def __init__(self, google_api_key: str):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=google_api_key,
-            temperature=0.5
-        )
+    def __init__(self, google_api_key: str, prefix_backend=None, settings=None):
+        self.llm = create_llm("drafting", google_api_key, settings)
         
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert LinkedIn content writer specializing in creating engaging, professional posts that drive meaningful engagement.
+        self.prefix = PromptPrefix(
+            name="drafting",
+            system="""You are an expert LinkedIn content writer specializing in creating engaging, professional posts that drive meaningful engagement.
 
 Your role is to write a well-structured, compelling first draft of a LinkedIn post based on the given topic and chosen angle.
 
@@ -44,11 +41,12 @@ Writing Guidelines:
 - Create natural line breaks for readability
 - Don't include hashtags or emojis (the formatting agent will add these)
 
-Write a complete, engaging LinkedIn post that follows these guidelines."""),
-            ("human", "Write a LinkedIn post draft for this topic and angle:\n\nTopic: {topic}\n\nChosen Angle: {angle}")
-        ])
+Write a complete, engaging LinkedIn post that follows these guidelines.""",
+            human="Write a LinkedIn post draft for this topic and angle:\n\nTopic: {topic}\n\nChosen Angle: {angle}"
+        )
+        self.prompt = self.prefix.template
         
-        self.chain = self.prompt | self.llm | StrOutputParser()
+        self.chain = self.prefix.build_chain(self.llm, prefix_backend) | StrOutputParser()
     
     def draft_post(self, topic: str, angle: str) -> str:
         """Draft a LinkedIn post based on topic and angle."""
@@ -57,3 +55,10 @@ Write a complete, engaging LinkedIn post that follows these guidelines."""),
             return result
         except Exception as e:
             return f"Error drafting post: {str(e)}"
+    
+    async def adraft_post(self, topic: str, angle: str) -> str:
+        """Async version of draft_post."""
+        try:
+            return await self.chain.ainvoke({"topic": topic, "angle": angle})
+        except Exception as e:
+            return f"Error drafting post: {str(e)}"
@@ -1,23 +1,22 @@
 """
 Formatting Agent - Final polisher for LinkedIn posts with hashtags and formatting
 """
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+import re
+from typing import List, Optional
 from langchain_core.output_parsers import StrOutputParser
+from agents.llm_factory import create_llm
+from agents.prompt_prefix import PromptPrefix
 
 
 class FormattingAgent:
     """Agent responsible for final formatting and polishing of LinkedIn posts."""
     
-    def __init__(self, google_api_key: str):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=google_api_key,
-            temperature=0.2
-        )
+    def __init__(self, google_api_key: str, prefix_backend=None, settings=None):
+        self.llm = create_llm("formatting", google_api_key, settings)
         
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a LinkedIn formatting specialist who creates the final, polished version of posts optimized for maximum engagement and professional impact.
+        self.prefix = PromptPrefix(
+            name="formatting",
+            system="""You are a LinkedIn formatting specialist who creates the final, polished version of posts optimized for maximum engagement and professional impact.
 
 Your role is to take the original draft and critique feedback to create a final, perfectly formatted LinkedIn post.
 
@@ -61,16 +60,50 @@ Formatting Requirements:
 
 Create the final, publication-ready LinkedIn post that incorporates all feedback and follows LinkedIn best practices. 
 
-IMPORTANT: Output ONLY the final LinkedIn post content without any introductory text, explanations, or prefacing statements."""),
-            ("human", "Create the final, polished LinkedIn post by incorporating this feedback into the original draft:\n\nORIGINAL DRAFT:\n{draft}\n\nCRITIQUE FEEDBACK:\n{critique}")
-        ])
+IMPORTANT: Output ONLY the final LinkedIn post content without any introductory text, explanations, or prefacing statements.""",
+            human="Create the final, polished LinkedIn post by incorporating this feedback into the original draft:\n\nORIGINAL DRAFT:\n{draft}\n\nCRITIQUE FEEDBACK:\n{critique}"
+        )
+        self.prompt = self.prefix.template
+        
+        self.chain = self.prefix.build_chain(self.llm, prefix_backend) | StrOutputParser()
         
-        self.chain = self.prompt | self.llm | StrOutputParser()
+        # Same instructions for a draft with no critique, e.g. when the latency budget skipped it
+        self.plain_prefix = PromptPrefix(
+            name="formatting_plain",
+            system=self.prefix.system,
+            human="No critique feedback is available for this draft. Create the final, polished LinkedIn post from the original draft:\n\nORIGINAL DRAFT:\n{draft}"
+        )
+        self.plain_chain = self.plain_prefix.build_chain(self.llm, prefix_backend) | StrOutputParser()
     
-    def format_final_post(self, draft: str, critique: str) -> str:
-        """Create the final formatted post incorporating critique feedback."""
+    def format_final_post(self, draft: str, critique: Optional[str]) -> str:
+        """Create the final formatted post incorporating critique feedback, or from the draft alone without it."""
         try:
+            if not critique:
+                return self.plain_chain.invoke({"draft": draft})
             result = self.chain.invoke({"draft": draft, "critique": critique})
             return result
         except Exception as e:
             return f"Error formatting final post: {str(e)}"
+    
+    async def aformat_final_post(self, draft: str, critique: Optional[str]) -> str:
+        """Async version of format_final_post."""
+        try:
+            if not critique:
+                return await self.plain_chain.ainvoke({"draft": draft})
+            return await self.chain.ainvoke({"draft": draft, "critique": critique})
+        except Exception as e:
+            return f"Error formatting final post: {str(e)}"
+    
+    @staticmethod
+    def tidy(draft: str, hashtags: List[str]) -> str:
+        """Cheap local cleanup for drafts that skip the rewrite: plain-text bullets, spacing and hashtags."""
+        lines = []
+        for line in draft.strip().splitlines():
+            line = line.rstrip().replace("**", "").replace("__", "")
+            line = re.sub(r"^\s*[-*]\s+", "• ", line)
+            lines.append(line)
+        post = re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+        
+        if hashtags and not re.search(r"(^|\s)#\w", post):
+            post += "\n\n" + " ".join(hashtags[:5])
+        return post
@@ -0,0 +1,126 @@
+"""
+LLM Backends - Where each stage's chat model runs: the Gemini API or a local quantized model on CPU
+
+A stage picks its backend with the StageConfig `backend` field (e.g.
+STAGE_FORMATTING_BACKEND=local). Each backend names the fair-share pool its
+calls queue in, so local CPU calls never take slots meant for the API quota.
+"""
+import os
+import threading
+from typing import Any, Dict, List, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_google_genai import ChatGoogleGenerativeAI
+from config.settings import StageConfig
+
+
+class GeminiBackend:
+    """Google Gemini over the API (the default)."""
+
+    pool = "llm"
+
+    def create(self, stage: str, config: StageConfig, google_api_key: str) -> BaseChatModel:
+        kwargs = {
+            "model": config.model,
+            "google_api_key": google_api_key,
+            "temperature": config.temperature,
+            "max_retries": config.max_retries
+        }
+        if config.max_output_tokens:
+            kwargs["max_output_tokens"] = config.max_output_tokens
+        if config.timeout:
+            kwargs["timeout"] = config.timeout
+        if config.thinking_budget is not None:
+            kwargs["thinking_budget"] = config.thinking_budget
+        return ChatGoogleGenerativeAI(**kwargs)
+
+
+class LocalChatModel(BaseChatModel):
+    """Chat model answered by llama.cpp on CPU from a quantized GGUF file.
+
+    Loaded models are shared per file and each one serves a call at a time
+    (llama.cpp contexts are not thread-safe); the "local_llm" pool's
+    capacity decides how many calls wait here versus in the scheduler.
+    No tool calling, so it suits the text-in, text-out stages.
+    """
+
+    model: str
+    temperature: float = 0.3
+    max_tokens: Optional[int] = None
+    n_ctx: int = 8192
+    n_threads: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "llama-cpp"
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        llama, lock = _load(self.model, self.n_ctx, self.n_threads)
+        with lock:
+            response = llama.create_chat_completion(
+                messages=[{"role": _ROLES.get(type(message), "user"), "content": str(message.content)}
+                          for message in messages],
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stop=stop
+            )
+        usage = response.get("usage") or {}
+        message = AIMessage(content=response["choices"][0]["message"]["content"] or "", usage_metadata={
+            "input_tokens": usage.get("prompt_tokens", 0),
+            "output_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0)
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+_ROLES = {SystemMessage: "system", HumanMessage: "user", AIMessage: "assistant"}
+_models: Dict[str, tuple] = {}
+_models_lock = threading.Lock()
+
+
+def _load(path: str, n_ctx: int, n_threads: Optional[int]) -> tuple:
+    """The llama.cpp model for a GGUF file and the lock serializing its calls, loaded once per process."""
+    with _models_lock:
+        if path not in _models:
+            try:
+                from llama_cpp import Llama
+            except ImportError as e:
+                raise ImportError("The local LLM backend needs llama-cpp-python: pip install llama-cpp-python") from e
+            _models[path] = (Llama(model_path=path, n_ctx=n_ctx, n_threads=n_threads, verbose=False), threading.Lock())
+        return _models[path]
+
+
+class LocalBackend:
+    """Small quantized model on CPU; the stage's `model` is a GGUF file, relative to LOCAL_MODEL_DIR."""
+
+    pool = "local_llm"
+
+    def create(self, stage: str, config: StageConfig, google_api_key: str) -> BaseChatModel:
+        threads = os.getenv("LOCAL_LLM_THREADS")
+        return LocalChatModel(
+            model=os.path.join(os.getenv("LOCAL_MODEL_DIR", "models"), config.model),
+            temperature=config.temperature,
+            max_tokens=config.max_output_tokens,
+            n_ctx=int(os.getenv("LOCAL_LLM_CONTEXT", "8192")),
+            n_threads=int(threads) if threads else None
+        )
+
+
+LLM_BACKENDS: Dict[str, Any] = {
+    "gemini": GeminiBackend(),
+    "local": LocalBackend()
+}
+
+
+def register_backend(name: str, backend):
+    """Make a backend (any object with `pool` and `create(stage, config, google_api_key)`) selectable by name."""
+    LLM_BACKENDS[name] = backend
+
+
+def get_backend(name: str):
+    """The backend registered under a StageConfig `backend` name."""
+    try:
+        return LLM_BACKENDS[(name or "gemini").strip().lower()]
+    except KeyError:
+        raise ValueError(f"Unknown LLM backend '{name}' (expected one of: {', '.join(LLM_BACKENDS)})") from None
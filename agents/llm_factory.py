@@ -0,0 +1,64 @@
+"""
+LLM Factory - Builds each agent's chat model from the stage settings
+"""
+from typing import Callable, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.outputs import ChatResult
+from langchain_core.runnables import RunnableBinding
+from agents.llm_backends import get_backend
+from config.settings import Settings, StageConfig, load_settings
+from tools.fair_share import get_scheduler
+
+# When set, builds every stage's model instead of its backend (e.g. the load-test harness's stubs)
+_llm_override: Optional[Callable[[str, StageConfig], BaseChatModel]] = None
+
+
+def set_llm_override(factory: Optional[Callable[[str, StageConfig], BaseChatModel]]):
+    """Build models with factory(stage, config) from now on; None restores the configured backends."""
+    global _llm_override
+    _llm_override = factory
+
+
+class ScheduledChatModel(BaseChatModel):
+    """Wraps a chat model so every call first takes a slot from a fair-share pool.
+
+    Token streaming is not passed through: stream() falls back to one chunk
+    per call, which is all the agents use.
+    """
+
+    inner: BaseChatModel
+    pool: str = "llm"
+    # The wrapped model's name, read by prompt prefix backends
+    model: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.inner._llm_type}"
+
+    def bind_tools(self, tools, **kwargs):
+        """Bind tools on the wrapped model, keeping the bound model scheduled."""
+        bound = self.inner.bind_tools(tools, **kwargs)
+        if isinstance(bound, RunnableBinding) and isinstance(bound.bound, BaseChatModel):
+            model = self if bound.bound is self.inner else self.model_copy(update={"inner": bound.bound})
+            return bound.model_copy(update={"bound": model})
+        raise TypeError(f"{type(self.inner).__name__}.bind_tools returned {type(bound).__name__}, "
+                        "which cannot be scheduled")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        with get_scheduler(self.pool).slot():
+            return self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        async with get_scheduler(self.pool).aslot():
+            return await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+def create_llm(stage: str, google_api_key: str, settings: Settings = None) -> BaseChatModel:
+    """Create the chat model configured for the given pipeline stage, scheduled in its backend's pool."""
+    config = (settings or load_settings()).stage(stage)
+    backend = get_backend(config.backend)
+    if _llm_override is not None:
+        llm = _llm_override(stage, config)
+    else:
+        llm = backend.create(stage, config, google_api_key)
+    return ScheduledChatModel(inner=llm, pool=backend.pool, model=config.model_label)
@@ -1,33 +1,46 @@
 """
 Master Research Agent - Intelligent multi-tool research agent
 """
+from typing import AsyncIterator, Iterator, Optional
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from agents.llm_factory import create_llm
 from tools.gnews_tool import GNewsSearchTool
 from tools.tavily_tool import TavilySearchTool
 from tools.youtube_tool import YouTubeSearchTool
 from tools.wikipedia_tool import WikipediaSearchTool
+from tools.multi_search_tool import MultiQuerySearchTool
+from tools.local_search_tool import LocalSearchTool
+from tools.deadline import remaining_time
+from tools.circuit_breaker import TOOL_FALLBACKS, breaker_states, is_error_result
 
 
+# Agent iterations per research run, unless a latency plan allows fewer
+MAX_ITERATIONS = 3
+
 class MasterResearchAgent:
     """Intelligent research agent that selects the best tool for each query."""
     
-    def __init__(self, google_api_key: str, gnews_api_key: str, tavily_api_key: str):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=google_api_key,
-            temperature=0.3
-        )
+    def __init__(self, google_api_key: str, gnews_api_key: str, tavily_api_key: str, settings=None):
+        self.llm = create_llm("research", google_api_key, settings)
         
         # Initialize all available tools
         self.tools = [
             GNewsSearchTool(gnews_api_key),
             TavilySearchTool(tavily_api_key),
             YouTubeSearchTool(),
-            WikipediaSearchTool()
+            WikipediaSearchTool(),
+            LocalSearchTool()
         ]
         
+        # Reroute calls to a fallback tool while a tool's circuit breaker is open
+        tools_by_name = {tool.name: tool for tool in self.tools}
+        for tool in self.tools:
+            tool.fallback = tools_by_name.get(TOOL_FALLBACKS.get(tool.name))
+        
+        # Query expansion: the agent writes the sub-queries, web and news search run them together
+        self.tools.append(MultiQuerySearchTool([tools_by_name["tavily_search"], tools_by_name["gnews_search"]]))
+        
         # Create ReAct-style prompt for intelligent tool selection
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a highly intelligent research assistant. Your goal is to find the most accurate and insightful information for a given topic to help create a LinkedIn post.
@@ -37,6 +50,8 @@ You have access to these tools:
 - **tavily_search**: For general questions, lists, explanations, tutorials, and comprehensive web content (PRIMARY TOOL)
 - **youtube_search**: For video content, tutorials, reviews, and expert discussions
 - **wikipedia_search**: For definitions, historical context, and foundational knowledge
+- **multi_search**: Runs 3-5 focused sub-queries at once across web and news search and merges the results
+- **local_search**: Articles, summaries and posts saved from earlier research runs; instant and free, but may be dated
 
 **Your Reasoning Process:**
 1. Analyze the user's request carefully
@@ -46,6 +61,8 @@ You have access to these tools:
    - General questions, "best tools for...", "how to...", lists, opinions → **tavily_search** (DEFAULT)
    - Complex terms needing definition, historical entities, company backgrounds → **wikipedia_search**
    - Video tutorials, reviews, visual content → **youtube_search**
+   - A field or topic that was probably researched before (a repeat or close variant) → **local_search** first; if it finds nothing useful, or the request needs the latest news, use a live tool
+   - Broad or vague fields ("Finance", "Marketing", "Healthcare") → **multi_search**, with 3-5 sub-queries that each cover a different current aspect of the field (e.g. "central bank rate decisions", "fintech lending regulation")
 4. Execute the chosen tool and provide comprehensive results
 
 **Important:** Always explain your tool choice in your thought process. Be thorough in your research to provide rich content for LinkedIn post creation.
@@ -62,67 +79,154 @@ Begin your analysis and tool selection:"""),
             tools=self.tools,
             verbose=True,
             handle_parsing_errors=True,
-            max_iterations=3
+            max_iterations=MAX_ITERATIONS
         )
     
-    def research(self, field_or_topic: str) -> dict:
+    def _describe_tool_choice(self, field_or_topic: str, output: str, intermediate_steps: list) -> tuple:
+        """Work out which tool was used and why, from the agent's steps or its output."""
+        # Better tool detection from intermediate steps
+        used_tool = "Unknown"
+        reasoning = f"Analyzed query: {field_or_topic}"
+        
+        # Check intermediate steps for tool usage
+        for step in intermediate_steps:
+            if len(step) >= 2:
+                action = step[0]
+                if hasattr(action, 'tool'):
+                    tool_name = action.tool
+                    if tool_name == "gnews_search":
+                        used_tool = "GNews Search"
+                        reasoning = f"Selected news search for recent developments in: {field_or_topic}"
+                    elif tool_name == "tavily_search":
+                        used_tool = "Tavily Web Search"
+                        reasoning = f"Selected web search for comprehensive information on: {field_or_topic}"
+                    elif tool_name == "youtube_search":
+                        used_tool = "YouTube Search"
+                        reasoning = f"Selected video search for tutorials/discussions on: {field_or_topic}"
+                    elif tool_name == "wikipedia_search":
+                        used_tool = "Wikipedia Search"
+                        reasoning = f"Selected Wikipedia for foundational knowledge on: {field_or_topic}"
+                    elif tool_name == "local_search":
+                        used_tool = "Local Search"
+                        reasoning = f"Answered from earlier research saved locally for: {field_or_topic}"
+                    elif tool_name == "multi_search":
+                        used_tool = "Multi-Query Search (Tavily + GNews)"
+                        queries = action.tool_input.get("queries", []) if isinstance(action.tool_input, dict) else []
+                        reasoning = f"Expanded {field_or_topic} into {len(queries)} focused sub-queries: {'; '.join(queries)}"
+                    break
+        
+        # Fallback: check output content for tool indicators
+        if used_tool == "Unknown":
+            output_lower = output.lower()
+            if "article" in output_lower and "news" in output_lower:
+                used_tool = "GNews Search"
+                reasoning = f"Detected news content for: {field_or_topic}"
+            elif "wikipedia" in output_lower or "definition" in output_lower:
+                used_tool = "Wikipedia Search"
+                reasoning = f"Detected encyclopedia content for: {field_or_topic}"
+            elif "video" in output_lower or "youtube" in output_lower:
+                used_tool = "YouTube Search"
+                reasoning = f"Detected video content for: {field_or_topic}"
+            else:
+                used_tool = "Tavily Web Search"
+                reasoning = f"Used web search for: {field_or_topic}"
+        
+        return used_tool, reasoning
+    
+    def research(self, field_or_topic: str, max_iterations: Optional[int] = None) -> dict:
         """Conduct intelligent research using the best available tool."""
         try:
+            # Stop starting new agent iterations once the caller's deadline is used up
+            self.agent_executor.max_execution_time = remaining_time()
+            self.agent_executor.max_iterations = max_iterations or MAX_ITERATIONS
             result = self.agent_executor.invoke({"field": field_or_topic})
-            
-            # Extract tool selection reasoning from the agent's output
-            output = result.get("output", "")
-            intermediate_steps = result.get("intermediate_steps", [])
-            
-            # Better tool detection from intermediate steps
-            used_tool = "Unknown"
-            reasoning = f"Analyzed query: {field_or_topic}"
-            
-            # Check intermediate steps for tool usage
-            for step in intermediate_steps:
-                if len(step) >= 2:
-                    action = step[0]
-                    if hasattr(action, 'tool'):
-                        tool_name = action.tool
-                        if tool_name == "gnews_search":
-                            used_tool = "GNews Search"
-                            reasoning = f"Selected news search for recent developments in: {field_or_topic}"
-                        elif tool_name == "tavily_search":
-                            used_tool = "Tavily Web Search"
-                            reasoning = f"Selected web search for comprehensive information on: {field_or_topic}"
-                        elif tool_name == "youtube_search":
-                            used_tool = "YouTube Search"
-                            reasoning = f"Selected video search for tutorials/discussions on: {field_or_topic}"
-                        elif tool_name == "wikipedia_search":
-                            used_tool = "Wikipedia Search"
-                            reasoning = f"Selected Wikipedia for foundational knowledge on: {field_or_topic}"
-                        break
-            
-            # Fallback: check output content for tool indicators
-            if used_tool == "Unknown":
-                output_lower = output.lower()
-                if "article" in output_lower and "news" in output_lower:
-                    used_tool = "GNews Search"
-                    reasoning = f"Detected news content for: {field_or_topic}"
-                elif "wikipedia" in output_lower or "definition" in output_lower:
-                    used_tool = "Wikipedia Search"
-                    reasoning = f"Detected encyclopedia content for: {field_or_topic}"
-                elif "video" in output_lower or "youtube" in output_lower:
-                    used_tool = "YouTube Search"
-                    reasoning = f"Detected video content for: {field_or_topic}"
-                else:
-                    used_tool = "Tavily Web Search"
-                    reasoning = f"Used web search for: {field_or_topic}"
-            
-            return {
-                "research_data": output,
-                "tool_used": used_tool,
-                "reasoning": reasoning
-            }
-            
+            return self._research_result(field_or_topic, result.get("output", ""), result.get("intermediate_steps", []))
+        except Exception as e:
+            return self._research_error(e)
+    
+    async def aresearch(self, field_or_topic: str, max_iterations: Optional[int] = None) -> dict:
+        """Async version of research; tool calls and LLM calls are awaited, not run on threads."""
+        try:
+            self.agent_executor.max_execution_time = remaining_time()
+            self.agent_executor.max_iterations = max_iterations or MAX_ITERATIONS
+            result = await self.agent_executor.ainvoke({"field": field_or_topic})
+            return self._research_result(field_or_topic, result.get("output", ""), result.get("intermediate_steps", []))
+        except Exception as e:
+            return self._research_error(e)
+    
+    def research_stream(self, field_or_topic: str, max_iterations: Optional[int] = None) -> Iterator[dict]:
+        """Research like `research`, yielding an event as each tool call starts and returns.
+        
+        Events: {"event": "tool_start", "tool", "query"},
+        {"event": "tool_result", "tool", "observation"} and finally
+        {"event": "research_done", "result": <same dict as research()>}.
+        Callers may stop iterating early; the agent then makes no further calls.
+        """
+        steps = []
+        try:
+            self.agent_executor.max_execution_time = remaining_time()
+            self.agent_executor.max_iterations = max_iterations or MAX_ITERATIONS
+            output = ""
+            for chunk in self.agent_executor.stream({"field": field_or_topic}):
+                yield from self._chunk_events(chunk, steps)
+                if "output" in chunk:
+                    output = chunk["output"]
+            result = self._research_result(field_or_topic, output, steps)
+        except Exception as e:
+            result = self._research_error(e)
+        
+        yield {"event": "research_done", "result": result}
+    
+    async def aresearch_stream(self, field_or_topic: str, max_iterations: Optional[int] = None) -> AsyncIterator[dict]:
+        """Async version of research_stream, with the same events."""
+        steps = []
+        try:
+            self.agent_executor.max_execution_time = remaining_time()
+            self.agent_executor.max_iterations = max_iterations or MAX_ITERATIONS
+            output = ""
+            async for chunk in self.agent_executor.astream({"field": field_or_topic}):
+                for event in self._chunk_events(chunk, steps):
+                    yield event
+                if "output" in chunk:
+                    output = chunk["output"]
+            result = self._research_result(field_or_topic, output, steps)
         except Exception as e:
-            return {
-                "research_data": f"Error during research: {str(e)}",
-                "tool_used": "None",
-                "reasoning": f"Failed to complete research: {str(e)}"
-            }
+            result = self._research_error(e)
+        
+        yield {"event": "research_done", "result": result}
+    
+    @staticmethod
+    def _chunk_events(chunk: dict, steps: list) -> Iterator[dict]:
+        for action in chunk.get("actions", []):
+            yield {"event": "tool_start", "tool": action.tool, "query": action.tool_input}
+        for step in chunk.get("steps", []):
+            steps.append((step.action, step.observation))
+            yield {"event": "tool_result", "tool": step.action.tool, "observation": str(step.observation)}
+    
+    def _research_result(self, field_or_topic: str, output: str, steps: list) -> dict:
+        # Extract tool selection reasoning from the agent's output
+        used_tool, reasoning = self._describe_tool_choice(field_or_topic, output, steps)
+        return {
+            "research_data": output,
+            # Raw tool output behind the write-up, which topic analysis map-reduces when it is large
+            "sources": self.sources(str(observation) for _, observation in steps),
+            "tool_used": used_tool,
+            "reasoning": reasoning,
+            "breakers": breaker_states(),
+            "iterations": len(steps)
+        }
+    
+    @staticmethod
+    def sources(observations) -> str:
+        """Usable tool results joined in call order; error results are left out."""
+        return "\n\n".join(observation for observation in observations if not is_error_result(observation))
+    
+    @staticmethod
+    def _research_error(e: Exception) -> dict:
+        return {
+            "research_data": f"Error during research: {str(e)}",
+            "sources": "",
+            "tool_used": "None",
+            "reasoning": f"Failed to complete research: {str(e)}",
+            "breakers": breaker_states()
+        }
@@ -0,0 +1,147 @@
+"""
+Prompt Prefix - Separates static system instructions from per-request variables
+"""
+import hashlib
+import threading
+from typing import Dict, Optional
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for savings reports."""
+    return max(1, len(text) // 4) if text else 0
+
+
+class PromptPrefix:
+    """A fixed system prompt plus the human template that carries the variables."""
+
+    def __init__(self, name: str, system: str, human: str):
+        self.name = name
+        self.system = system
+        self.human = human
+        self.key = hashlib.sha256(system.encode("utf-8")).hexdigest()[:16]
+        self.static_tokens = estimate_tokens(system)
+
+        self.template = ChatPromptTemplate.from_messages([
+            ("system", system),
+            ("human", human)
+        ])
+
+    def build_chain(self, llm, backend: Optional["InlinePrefixBackend"] = None):
+        """Build `prompt | llm` for this prefix through the given backend."""
+        backend = backend or InlinePrefixBackend()
+        model = getattr(llm, "model", "")
+        handle = backend.register(self, model)
+        return backend.bind(self, llm, handle)
+
+
+class PrefixUsage:
+    """Thread-safe counters of static vs. variable input tokens per prefix."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, dict] = {}
+
+    def record(self, prefix: PromptPrefix, variables: dict, simulated: bool = False):
+        """Record one call made with the given prefix.
+
+        Every call sends the full prompt. For `simulated` calls (made through
+        LocalPrefixCache) the static tokens are also counted apart, as what a
+        provider cache would have saved.
+        """
+        variable_tokens = sum(estimate_tokens(str(value)) for value in variables.values())
+        variable_tokens += estimate_tokens(prefix.human)
+        with self._lock:
+            stats = self._stats.setdefault(prefix.name, {
+                "calls": 0,
+                "static_tokens": prefix.static_tokens,
+                "variable_tokens": 0,
+                "tokens_sent": 0,
+                "simulated_calls": 0,
+                "tokens_simulated": 0
+            })
+            stats["calls"] += 1
+            stats["variable_tokens"] += variable_tokens
+            stats["tokens_sent"] += variable_tokens + prefix.static_tokens
+            if simulated:
+                stats["simulated_calls"] += 1
+                stats["tokens_simulated"] += prefix.static_tokens
+
+    def report(self) -> dict:
+        """Return per-prefix stats plus totals and the simulated input-token reduction."""
+        with self._lock:
+            per_prefix = {name: dict(stats) for name, stats in self._stats.items()}
+        sent = sum(stats["tokens_sent"] for stats in per_prefix.values())
+        simulated = sum(stats["tokens_simulated"] for stats in per_prefix.values())
+        return {
+            "prefixes": per_prefix,
+            "tokens_sent": sent,
+            "tokens_simulated": simulated,
+            "simulated_reduction": simulated / sent if sent else 0.0
+        }
+
+    def reset(self):
+        """Clear all counters."""
+        with self._lock:
+            self._stats.clear()
+
+
+# Process-wide usage counters shared by every agent
+prefix_usage = PrefixUsage()
+
+
+def usage_tracker(prefix: PromptPrefix, simulated: bool = False) -> RunnableLambda:
+    """Pass-through step that records prefix usage; runs inline on the event loop under ainvoke."""
+    def track(variables: dict) -> dict:
+        prefix_usage.record(prefix, variables, simulated=simulated)
+        return variables
+
+    async def atrack(variables: dict) -> dict:
+        return track(variables)
+
+    return RunnableLambda(track, afunc=atrack)
+
+
+class InlinePrefixBackend:
+    """Default backend: sends the full system prompt with every call."""
+
+    def register(self, prefix: PromptPrefix, model: str) -> Optional[str]:
+        """Register the static part and return a handle for it, or None to send it inline."""
+        return None
+
+    def bind(self, prefix: PromptPrefix, llm, handle: Optional[str]):
+        """Return a runnable that takes the prompt variables and calls the model."""
+        return usage_tracker(prefix) | prefix.template | llm
+
+
+class LocalPrefixCache(InlinePrefixBackend):
+    """In-process stand-in for a context cache, for tests and offline runs.
+
+    Handles are resolved locally: the stored system prompt is re-attached before
+    the model call, so it works with any chat model. The full prompt is still
+    sent, so the static part is reported as simulated savings, never as saved.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.handles: Dict[str, PromptPrefix] = {}
+
+    def register(self, prefix: PromptPrefix, model: str) -> Optional[str]:
+        handle = f"local/{model or 'default'}/{prefix.key}"
+        with self._lock:
+            self.handles.setdefault(handle, prefix)
+        return handle
+
+    def bind(self, prefix: PromptPrefix, llm, handle: Optional[str]):
+        track = usage_tracker(prefix, simulated=handle is not None)
+        stored = self.handles.get(handle, prefix) if handle else prefix
+        return track | stored.template | llm
+
+
+def create_prefix_backend(name: str) -> InlinePrefixBackend:
+    """Create a prefix backend by name: "local" or "inline" (default)."""
+    name = (name or "inline").strip().lower()
+    if name == "local":
+        return LocalPrefixCache()
+    return InlinePrefixBackend()
@@ -1,23 +1,51 @@
 """
 Topic Analyst Agent - Analyzes news data to identify compelling LinkedIn topics
 """
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+import re
+from typing import List, Optional
 from langchain_core.output_parsers import StrOutputParser
+from agents.llm_factory import create_llm
+from agents.prompt_prefix import PromptPrefix
+from tools.fair_share import fan_out_scope, get_scheduler
+from config.settings import load_settings
+
+# Lines that start a new article or source block in rendered research records
+_BLOCK_START = re.compile(r"^(\[\d+\] |Summary: |\[\w+ unavailable)")
+
+
+def split_research(research_data: str, chunk_chars: int) -> List[str]:
+    """Split research into chunks of whole article/source blocks, each at most chunk_chars where possible."""
+    blocks = []
+    for line in research_data.splitlines():
+        if not blocks or _BLOCK_START.match(line):
+            blocks.append([])
+        blocks[-1].append(line)
+
+    chunks, current = [], ""
+    for block in ("\n".join(lines) for lines in blocks):
+        # A single oversized block is cut by characters
+        pieces = [block[i:i + chunk_chars] for i in range(0, len(block), chunk_chars)] or [""]
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > chunk_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
 
 
 class TopicAnalystAgent:
     """Agent responsible for analyzing news and identifying compelling topics."""
     
-    def __init__(self, google_api_key: str):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=google_api_key,
-            temperature=0.4
-        )
+    def __init__(self, google_api_key: str, prefix_backend=None, settings=None):
+        self.llm = create_llm("topic_analysis", google_api_key, settings)
+        # Raw research longer than this is analyzed map-reduce style; None always uses one call
+        self.map_reduce_chars = (settings or load_settings()).stage("topic_analysis").map_reduce_chars
         
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert content strategist and trend analyst specializing in LinkedIn content.
+        self.prefix = PromptPrefix(
+            name="topic_analysis",
+            system="""You are an expert content strategist and trend analyst specializing in LinkedIn content.
 
 Your role is to analyze raw news data and identify 2-3 compelling, high-potential topics that would resonate with a LinkedIn professional audience.
 
@@ -51,16 +79,146 @@ Key angle: [Professional insight opportunity]
 
 Topic 3: [Title] (if applicable)
 Why it matters: [Brief explanation]
-Key angle: [Professional insight opportunity]"""),
-            ("human", "Analyze this news data and identify 2-3 compelling topics for LinkedIn content:\n\n{news_data}")
-        ])
+Key angle: [Professional insight opportunity]""",
+            human="Analyze this news data and identify 2-3 compelling topics for LinkedIn content:\n\n{news_data}"
+        )
+        self.prompt = self.prefix.template
         
-        self.chain = self.prompt | self.llm | StrOutputParser()
+        self.chain = self.prefix.build_chain(self.llm, prefix_backend) | StrOutputParser()
+        
+        # Map step: short candidate lists from one chunk of the research
+        self.map_prefix = PromptPrefix(
+            name="topic_candidates",
+            system="""You are a trend analyst scanning one batch of research for a LinkedIn content strategist.
+
+List up to 3 candidate topics from this batch that a professional audience would care about. Be brief and concrete; skip anything generic.
+
+Output format:
+Topic: [Title]
+Why it matters: [One sentence]
+Key angle: [One sentence]""",
+            human="Extract candidate LinkedIn topics from this batch of research:\n\n{news_data}"
+        )
+        self.map_chain = self.map_prefix.build_chain(self.llm, prefix_backend) | StrOutputParser()
+        
+        # Reduce step: the main analyst prompt, applied to the candidates from every chunk
+        self.reduce_prefix = PromptPrefix(
+            name="topic_reduce",
+            system=self.prefix.system,
+            human="These candidate topics were extracted from separate batches of research. Merge duplicates and identify the 2-3 most compelling topics for LinkedIn content:\n\n{news_data}"
+        )
+        self.reduce_chain = self.reduce_prefix.build_chain(self.llm, prefix_backend) | StrOutputParser()
+        
+        # Incremental refresh: only news since the last run, plus that run's topics in brief
+        self.refresh_prefix = PromptPrefix(
+            name="topic_refresh",
+            system=self.prefix.system,
+            human="""These topics were identified for this field in the last run:
+{earlier_topics}
+
+Below is only the news published since then. Identify the 2-3 most compelling topics for LinkedIn content now. Keep an earlier topic if the new research still supports it, replace it when something newer matters more, and prefer new developments over repeating earlier topics:
+
+{news_data}"""
+        )
+        self.refresh_chain = self.refresh_prefix.build_chain(self.llm, prefix_backend) | StrOutputParser()
     
-    def analyze(self, news_data: str) -> str:
-        """Analyze news data and identify compelling topics."""
+    def analyze(self, news_data: str, sources: str = "") -> str:
+        """Analyze news data and identify compelling topics.
+        
+        `sources` is the raw tool output the research write-up was made
+        from. When it (or news_data) is over the size threshold, topics are
+        map-reduced from it instead, so every article is read, not just what
+        the write-up kept.
+        """
+        large = self._large_input(news_data, sources)
+        if large:
+            return self.analyze_map_reduce(large)
         try:
             result = self.chain.invoke({"news_data": news_data})
             return result
         except Exception as e:
             return f"Error during topic analysis: {str(e)}"
+    
+    def analyze_incremental(self, news_data: str, earlier_topics: str, sources: str = "") -> str:
+        """Update earlier topics from research published since they were identified."""
+        # A delta this large is mostly new content; analyze it on its own
+        large = self._large_input(news_data, sources)
+        if large:
+            return self.analyze_map_reduce(large)
+        try:
+            return self.refresh_chain.invoke({"earlier_topics": earlier_topics, "news_data": news_data})
+        except Exception as e:
+            return f"Error during topic analysis: {str(e)}"
+    
+    def analyze_map_reduce(self, news_data: str, max_chunks: int = 8, min_chunk_chars: int = 6000) -> str:
+        """Summarize research chunks into candidate topics in parallel, then pick the best in one reduce call."""
+        try:
+            chunks = self._map_inputs(news_data, max_chunks, min_chunk_chars)
+            with fan_out_scope():
+                candidates = self.map_chain.batch(chunks, config={"max_concurrency": len(chunks)}, return_exceptions=True)
+            merged = self._merge_candidates(candidates)
+            if merged is None:
+                return "Error during topic analysis: every research chunk failed"
+            return self.reduce_chain.invoke({"news_data": merged})
+        except Exception as e:
+            return f"Error during topic analysis: {str(e)}"
+    
+    async def aanalyze(self, news_data: str, sources: str = "") -> str:
+        """Async version of analyze."""
+        large = self._large_input(news_data, sources)
+        if large:
+            return await self.aanalyze_map_reduce(large)
+        try:
+            return await self.chain.ainvoke({"news_data": news_data})
+        except Exception as e:
+            return f"Error during topic analysis: {str(e)}"
+    
+    async def aanalyze_incremental(self, news_data: str, earlier_topics: str, sources: str = "") -> str:
+        """Async version of analyze_incremental."""
+        large = self._large_input(news_data, sources)
+        if large:
+            return await self.aanalyze_map_reduce(large)
+        try:
+            return await self.refresh_chain.ainvoke({"earlier_topics": earlier_topics, "news_data": news_data})
+        except Exception as e:
+            return f"Error during topic analysis: {str(e)}"
+    
+    async def aanalyze_map_reduce(self, news_data: str, max_chunks: int = 8, min_chunk_chars: int = 6000) -> str:
+        """Async version of analyze_map_reduce; the map calls run concurrently on the event loop."""
+        try:
+            chunks = self._map_inputs(news_data, max_chunks, min_chunk_chars)
+            with fan_out_scope():
+                candidates = await self.map_chain.abatch(chunks, config={"max_concurrency": len(chunks)},
+                                                         return_exceptions=True)
+            merged = self._merge_candidates(candidates)
+            if merged is None:
+                return "Error during topic analysis: every research chunk failed"
+            return await self.reduce_chain.ainvoke({"news_data": merged})
+        except Exception as e:
+            return f"Error during topic analysis: {str(e)}"
+    
+    def _large_input(self, news_data: str, sources: str) -> Optional[str]:
+        # The raw sources first: they are what a size-capped research write-up leaves out
+        for text in (sources, news_data):
+            if self.map_reduce_chars and len(text) > self.map_reduce_chars:
+                return text
+        return None
+    
+    def _map_inputs(self, news_data: str, max_chunks: int, min_chunk_chars: int) -> List[dict]:
+        # Size chunks so the map step runs as a single parallel wave within the model pool
+        max_chunks = max(1, min(max_chunks, get_scheduler(self.llm.pool).capacity))
+        chunk_chars = max(min_chunk_chars, -(-len(news_data) // max_chunks))
+        chunks = split_research(news_data, chunk_chars)
+        # Splitting on whole blocks can spill into extra chunks, which would need a second wave
+        while len(chunks) > max_chunks:
+            chunk_chars = int(chunk_chars * 1.1) + 1
+            chunks = split_research(news_data, chunk_chars)
+        return [{"news_data": chunk} for chunk in chunks]
+    
+    @staticmethod
+    def _merge_candidates(candidates: list) -> Optional[str]:
+        # A failed chunk only loses its own candidates
+        candidates = [c for c in candidates if isinstance(c, str) and c.strip()]
+        if not candidates:
+            return None
+        return "\n\n".join(f"Batch {i}:\n{c}" for i, c in enumerate(candidates, 1))
@@ -3,14 +3,28 @@ LangChain Content Strategist - AI-powered LinkedIn content creation
 """
 import streamlit as st
 import os
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import pyperclip
 from chains.analysis_chain import AnalysisChain
 from chains.creation_chain import CreationChain
+from chains.quality_gate import quality_gate_stats
+from chains.result_store import deep_size, result_store
+from chains.topic_history import topic_history
+from tools.search_depth import depth_decisions
+from tools.fair_share import BATCH, INTERACTIVE, scheduler_report, tenant_scope
+from agents.prompt_prefix import create_prefix_backend, prefix_usage
+from config.settings import load_settings
 
 # Load environment variables
 load_dotenv()
 
+# Keep only the most recent workflow log entries per session
+WORKFLOW_LOG_LIMIT = int(os.getenv("WORKFLOW_LOG_LIMIT", "100"))
+
 # Page configuration
 st.set_page_config(
     page_title="LinkedIn Content Strategist",
@@ -67,6 +81,71 @@ def initialize_session_state():
         st.session_state.show_topic_selection = False
     if 'show_final_post' not in st.session_state:
         st.session_state.show_final_post = False
+    if 'session_key' not in st.session_state:
+        st.session_state.session_key = uuid.uuid4().hex
+    if 'batch_results' not in st.session_state:
+        st.session_state.batch_results = None
+
+def expire_idle_session():
+    """Reset this session if its stored results were evicted while it sat idle"""
+    if result_store.is_evicted(st.session_state.session_key):
+        for key in list(st.session_state.keys()):
+            del st.session_state[key]
+        initialize_session_state()
+        st.info("⏳ This session was idle for a while, so its results were cleared. Start again below.")
+    result_store.touch(st.session_state.session_key)
+
+def keep_session_alive():
+    """Refresh the session's idle timer on fragment reruns, which skip main()"""
+    if result_store.is_evicted(st.session_state.session_key):
+        # A full rerun lets expire_idle_session() reset the session
+        st.rerun()
+    result_store.touch(st.session_state.session_key)
+
+def store_result(result):
+    """Offload a chain result's large fields to the shared result store"""
+    return result_store.offload(result, st.session_state.session_key)
+
+def result_text(result, field, default=""):
+    """Text of a stored result field, loading offloaded fields from the result store"""
+    return result_store.resolve(result.get(field, default), default)
+
+def get_settings():
+    """Stage settings for this session (A/B variant is sticky per session)"""
+    return load_settings(assignment_key=st.session_state.session_key)
+
+def topic_context(topic_data):
+    """Topic dict passed to the creation chain"""
+    return {
+        "title": topic_data.get("title", ""),
+        "why": topic_data.get("why", ""),
+        "angle": topic_data.get("angle", ""),
+        "full_context": f"Topic: {topic_data.get('title', '')}\nWhy it matters: {topic_data.get('why', '')}\nKey angle: {topic_data.get('angle', '')}"
+    }
+
+def display_post(final_post):
+    """Render a finished post in the publish-ready card"""
+    st.markdown(f"""
+    <div style="background-color: #f8f9fa; padding: 1.5rem; border-radius: 0.5rem; border: 1px solid #dee2e6; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; color: #000000;">
+    {final_post.replace(chr(10), '<br>')}
+    </div>
+    """, unsafe_allow_html=True)
+
+def display_batch_result(placeholder, title, result):
+    """Fill a batch placeholder with one finished post"""
+    final_post = result_text(result, "final_post")
+    with placeholder.container():
+        if final_post and "Error" not in final_post:
+            with st.expander(f"✅ {title}", expanded=False):
+                display_post(final_post)
+                st.code(final_post, language=None)
+        else:
+            st.error(f"**{title}:** {final_post or 'Unknown error'}")
+
+@st.cache_resource
+def get_prefix_backend(google_api_key):
+    """Shared prompt-prefix backend, so every session reports into the same prefix handles"""
+    return create_prefix_backend(os.getenv("PROMPT_CACHE_BACKEND", "inline"))
 
 def add_to_workflow_log(step, message, status="info"):
     """Add step to workflow log"""
@@ -75,6 +154,37 @@ def add_to_workflow_log(step, message, status="info"):
         "message": message,
         "status": status
     })
+    del st.session_state.workflow_log[:-WORKFLOW_LOG_LIMIT]
+
+def log_budget(result):
+    """Log the stages the latency planner cut or shortened to meet the request's time budget"""
+    budget = result.get("budget") or {}
+    if budget.get("degradations"):
+        cuts = "; ".join(f"{cut['stage']} {cut['action']} ({cut['reason']})" for cut in budget["degradations"])
+        add_to_workflow_log(
+            "Latency Budget",
+            f"{cuts} - finished in {budget['elapsed_seconds']:.1f}s of {budget['budget_seconds']:.0f}s",
+            "info" if budget["met"] else "error"
+        )
+
+def log_prompt_cache():
+    """Log the static prompt tokens the local prefix backend would have kept off the wire"""
+    usage = prefix_usage.report()
+    if usage["tokens_simulated"]:
+        add_to_workflow_log(
+            "Prompt Cache",
+            f"Simulated only: the local backend still sends every prompt in full "
+            f"({usage['tokens_simulated']:,} static tokens a provider cache could have skipped)",
+            "info"
+        )
+
+def show_trace(result):
+    """Stage timeline of a chain run, with its critical path"""
+    trace = result.get("trace")
+    if trace:
+        st.caption(f"Critical path: {' → '.join(trace['critical_path']) or '-'} "
+                   f"({trace['critical_seconds']:.1f}s of {trace['wall_seconds']:.1f}s)")
+        st.code(trace["timeline"], language=None)
 
 def display_workflow_log():
     """Show workflow progress"""
@@ -130,9 +240,239 @@ def parse_topics_from_analysis(topics_text):
     
     return topics
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_topics(topics_text):
+    """Parsed topics and their radio labels, cached per analysis text"""
+    topics = parse_topics_from_analysis(topics_text)
+    topic_options = []
+    for i, topic in enumerate(topics):
+        title = topic.get("title", f"Topic {i+1}")
+        why = topic.get("why", "")
+        option = f"{title}"
+        if why:
+            option += f" - {why[:100]}..."
+        topic_options.append(option)
+    return topics, topic_options
+
+@contextmanager
+def timed_render(name):
+    """Record how long a page section took to render"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        render_times = st.session_state.setdefault("render_times", {})
+        render_times.setdefault(name, deque(maxlen=50)).append(time.perf_counter() - start)
+
+def display_render_times():
+    """Show recent per-interaction render times"""
+    render_times = st.session_state.get("render_times", {})
+    if render_times:
+        with st.expander("⏱️ Render Times"):
+            for name, samples in render_times.items():
+                st.caption(f"**{name}**: last {samples[-1] * 1000:.0f} ms, mean {sum(samples) / len(samples) * 1000:.0f} ms over {len(samples)} runs")
+            st.caption(f"**session state**: {deep_size(dict(st.session_state)) / 1024:.1f} KB")
+
+@st.fragment
+def topic_picker(google_api_key):
+    """Topic radio and Create Post button; selecting a topic reruns only this fragment"""
+    with timed_render("topic_picker"):
+        keep_session_alive()
+        st.subheader("🎯 Pick a Topic")
+        
+        topics, topic_options = get_topics(result_text(st.session_state.analysis_result, "topics"))
+        
+        if not topics:
+            st.error("No topics could be parsed from the analysis. Please try again.")
+            return
+        
+        selected_index = st.radio(
+            "Which topic interests you?",
+            range(len(topic_options)),
+            format_func=lambda x: topic_options[x]
+        )
+        
+        # Store the full topic data, not just the title
+        st.session_state.selected_topic = topic_context(topics[selected_index])
+        
+        col_one, col_again, col_all = st.columns(3)
+        create_one = col_one.button("✨ Create Post", type="primary")
+        # Create Post reuses this session's saved stage outputs for the same topic; Regenerate writes a fresh post
+        regenerate = col_again.button("🔄 Regenerate Post", disabled=not st.session_state.creation_result)
+        create_all = col_all.button(f"⚡ Create Posts for All {len(topics)} Topics")
+        
+        # Create post button
+        if create_one or regenerate:
+            try:
+                add_to_workflow_log("Writing", "Writing a fresh post..." if regenerate else "Creating your post...", "info")
+                creation_chain = CreationChain(google_api_key, get_prefix_backend(google_api_key), get_settings())
+                
+                # Unset means no budget: every stage runs however long it takes
+                budget_seconds = os.getenv("CREATE_POST_BUDGET_SECONDS")
+                with st.spinner("✨ Working on it..."), tenant_scope(st.session_state.session_key, INTERACTIVE):
+                    creation_result = creation_chain.invoke(st.session_state.selected_topic,
+                                                            budget_seconds=float(budget_seconds) if budget_seconds else None,
+                                                            regenerate=regenerate)
+                    st.session_state.creation_result = store_result(creation_result)
+                log_budget(creation_result)
+                
+                resumed = [stage for stage, status in creation_result.get("stages", {}).items() if status == "resumed"]
+                if resumed:
+                    add_to_workflow_log("Checkpoints", f"Reused saved output for: {', '.join(resumed)}", "info")
+                
+                if creation_result.get("stages", {}).get("formatting") == "skipped":
+                    gate = quality_gate_stats.report()
+                    add_to_workflow_log(
+                        "Quality Gate",
+                        f"Critique scored the draft {creation_result['critique_score']}/100, so the formatting rewrite was skipped "
+                        f"({gate['skip_rate']:.0%} of {gate['decisions']} posts skipped, ~{gate['estimated_seconds_saved']:.0f}s saved)",
+                        "info"
+                    )
+                
+                if "Error" not in creation_result.get("final_post", ""):
+                    add_to_workflow_log("Done", "Post is ready!", "success")
+                    log_prompt_cache()
+                    st.session_state.show_final_post = True
+                else:
+                    add_to_workflow_log("Error", f"Failed to generate post: {creation_result.get('final_post', 'Unknown error')}", "error")
+                    failed = [stage for stage, status in creation_result.get("stages", {}).items() if status == "failed"]
+                    if failed:
+                        add_to_workflow_log("Retry", f"Click Create Post again to resume from the {failed[0]} stage", "info")
+                    
+            except Exception as e:
+                add_to_workflow_log("Error", f"Failed to generate content: {str(e)}", "error")
+            
+            # The log, results and final post live outside this fragment
+            st.rerun()
+        
+        if create_all:
+            create_all_posts(google_api_key, [topic_context(topic) for topic in topics])
+            st.rerun()
+
+def create_all_posts(google_api_key, topic_contexts):
+    """Run the creation chain over every topic, rendering each post as soon as it finishes"""
+    max_concurrency = int(os.getenv("BATCH_MAX_CONCURRENCY", "3"))
+    # Critique every draft in a few packed calls instead of one call per post
+    batch_critique = os.getenv("BATCH_CRITIQUE", "on").strip().lower() not in ("off", "false", "0")
+    add_to_workflow_log("Writing", f"Creating {len(topic_contexts)} posts ({max_concurrency} at a time)...", "info")
+    
+    results = [None] * len(topic_contexts)
+    try:
+        creation_chain = CreationChain(google_api_key, get_prefix_backend(google_api_key), get_settings())
+        progress = st.progress(0.0, text="✨ Working on it...")
+        placeholders = []
+        for topic in topic_contexts:
+            placeholder = st.empty()
+            placeholder.info(f"⏳ {topic['title']}")
+            placeholders.append(placeholder)
+        
+        start = time.perf_counter()
+        # Batch calls get the capacity interactive sessions leave over
+        with tenant_scope(st.session_state.session_key, BATCH):
+            for done, (index, result) in enumerate(
+                creation_chain.batch_as_completed(topic_contexts, max_concurrency=max_concurrency,
+                                                  batch_critique=batch_critique), start=1
+            ):
+                results[index] = result
+                display_batch_result(placeholders[index], topic_contexts[index]["title"], result)
+                progress.progress(done / len(topic_contexts), text=f"✨ {done}/{len(topic_contexts)} posts ready")
+        
+        failed = sum(1 for result in results if "Error" in result.get("final_post", ""))
+        add_to_workflow_log(
+            "Done",
+            f"{len(results) - failed}/{len(results)} posts ready in {time.perf_counter() - start:.1f}s",
+            "success" if not failed else "error"
+        )
+        waits = scheduler_report().get("llm", {}).get("classes", {})
+        if BATCH in waits:
+            add_to_workflow_log(
+                "Fair Share",
+                f"Batch model calls waited p95 {waits[BATCH]['p95_wait_seconds']:.1f}s for a slot "
+                f"(interactive p95 {waits.get(INTERACTIVE, {}).get('p95_wait_seconds', 0.0):.1f}s since startup)",
+                "info"
+            )
+    except Exception as e:
+        add_to_workflow_log("Error", f"Failed to generate content: {str(e)}", "error")
+    
+    st.session_state.batch_results = [
+        (topic["title"], store_result(result)) for topic, result in zip(topic_contexts, results) if result is not None
+    ]
+
+@st.fragment
+def batch_posts_panel():
+    """Posts from the last Create All run"""
+    with timed_render("batch_posts"):
+        st.subheader(f"🗂️ All Posts ({len(st.session_state.batch_results)})")
+        for title, result in st.session_state.batch_results:
+            display_batch_result(st.empty(), title, result)
+
+@st.fragment
+def final_post_panel():
+    """Final post with copy/restart actions; copying reruns only this fragment"""
+    with timed_render("final_post"):
+        keep_session_alive()
+        st.subheader("🎉 Your Post")
+        
+        final_post = result_text(st.session_state.creation_result, "final_post")
+        
+        if final_post and "Error" not in final_post:
+            # Display the final post
+            st.markdown("### 📋 Ready to Publish:")
+            display_post(final_post)
+            
+            # Action buttons
+            col_copy, col_restart = st.columns(2)
+            
+            with col_copy:
+                if st.button("📋 Copy to Clipboard"):
+                    try:
+                        pyperclip.copy(final_post)
+                        st.success("✅ Post copied to clipboard!")
+                    except Exception as e:
+                        st.error(f"Failed to copy: {str(e)}")
+                        st.code(final_post)
+            
+            with col_restart:
+                if st.button("🔄 Start Over"):
+                    # Clear all session state
+                    result_store.release(st.session_state.session_key)
+                    for key in list(st.session_state.keys()):
+                        del st.session_state[key]
+                    st.rerun()
+        else:
+            st.error("Failed to generate the final post. Please check the workflow log for details.")
+
+@st.fragment
+def workflow_log_panel():
+    """Workflow log; skipped when another fragment reruns"""
+    with timed_render("workflow_log"):
+        display_workflow_log()
+
+@st.fragment
+def results_panels():
+    """Intermediate research and creation outputs; skipped when another fragment reruns"""
+    with timed_render("results_panels"):
+        if st.session_state.analysis_result:
+            with st.expander("📊 Research Results"):
+                tool_used = st.session_state.analysis_result.get("tool_used", "Unknown")
+                st.markdown(f"**Tool Used:** {tool_used}")
+                st.text_area("Research Data", result_text(st.session_state.analysis_result, "research_data"), height=150)
+                st.text_area("Identified Topics", result_text(st.session_state.analysis_result, "topics"), height=200)
+                show_trace(st.session_state.analysis_result)
+        
+        if st.session_state.creation_result:
+            with st.expander("📝 Creation Process"):
+                st.text_area("Generated Angles", result_text(st.session_state.creation_result, "angles"), height=150)
+                st.text_area("Initial Draft", result_text(st.session_state.creation_result, "draft"), height=150)
+                st.text_area("Critique Feedback", result_text(st.session_state.creation_result, "critique"), height=150)
+                if st.session_state.creation_result.get("critique_score") is not None:
+                    st.caption(f"Critique score: {st.session_state.creation_result['critique_score']}/100")
+                show_trace(st.session_state.creation_result)
+
 def main():
     """Main application function."""
     initialize_session_state()
+    expire_idle_session()
     
     # Header
     st.markdown('<h1 class="main-header">🚀 LinkedIn Content Strategist</h1>', unsafe_allow_html=True)
@@ -177,33 +517,88 @@ def main():
             help="What industry or topics do you work with?"
         )
         
+        # Offer an incremental refresh when this session researched the field recently; history is
+        # per session, so another user's run is never found here and the box can default to on
+        previous_run = (topic_history.get(professional_field, tenant=st.session_state.session_key)
+                        if professional_field.strip() else None)
+        incremental = False
+        if previous_run:
+            last_run = time.strftime("%H:%M", time.localtime(previous_run["started_at"]))
+            incremental = st.checkbox(
+                f"🔄 Only analyze news since the last run ({last_run})",
+                value=True,
+                help="Researches only articles published since the last Find Topics for this field and updates those topics"
+            )
+        
         # Main action button
         if st.button("🔍 Find Topics", type="primary", disabled=not professional_field.strip()):
             if professional_field.strip():
                 # Clear previous results
+                result_store.release(st.session_state.session_key)
                 st.session_state.analysis_result = None
                 st.session_state.creation_result = None
                 st.session_state.selected_topic = None
                 st.session_state.show_topic_selection = False
                 st.session_state.show_final_post = False
+                st.session_state.batch_results = None
                 st.session_state.workflow_log = []
                 
                 # Initialize chains
                 try:
-                    add_to_workflow_log("Setup", "Initializing multi-tool research system...", "info")
-                    analysis_chain = AnalysisChain(google_api_key, gnews_api_key, tavily_api_key)
+                    settings = get_settings()
+                    add_to_workflow_log("Setup", f"Initializing multi-tool research system (config: {settings.variant})...", "info")
+                    analysis_chain = AnalysisChain(google_api_key, gnews_api_key, tavily_api_key, get_prefix_backend(google_api_key), settings)
                     
                     # Execute analysis chain with enhanced logging
                     add_to_workflow_log("MasterResearch", "Analyzing request and selecting best research tool...", "info")
-                    with st.spinner("🔍 Intelligent research in progress..."):
-                        result = analysis_chain.invoke(professional_field)
-                        st.session_state.analysis_result = result
+                    result = None
+                    # LLM and tool calls queue fairly against other sessions' calls
+                    with st.status("🔍 Intelligent research in progress...", expanded=True) as status, \
+                            tenant_scope(st.session_state.session_key, INTERACTIVE):
+                        for event in analysis_chain.stream(professional_field, incremental=incremental,
+                                                           deadline_seconds=float(os.getenv("FIND_TOPICS_BUDGET_SECONDS", "90"))):
+                            if event["event"] == "tool_start":
+                                status.write(f"🔧 Searching with **{event['tool']}**...")
+                            elif event["event"] == "tool_result":
+                                preview = event["observation"][:400]
+                                status.write(f"📥 **{event['tool']}** returned {len(event['observation']):,} characters")
+                                status.caption(preview + ("..." if len(event["observation"]) > 400 else ""))
+                            elif event["event"] == "analysis_start":
+                                status.update(label="🧠 Identifying compelling topics...")
+                            elif event["event"] == "done":
+                                result = event["result"]
+                        status.update(label="✅ Research complete", state="complete", expanded=False)
+                    st.session_state.analysis_result = store_result(result)
                     
                     if "Error" not in result.get("topics", ""):
                         # Enhanced logging with tool selection details
                         tool_used = result.get("tool_used", "Unknown")
                         reasoning = result.get("reasoning", "")
                         add_to_workflow_log("Tool Selection", f"Selected {tool_used} - {reasoning}", "info")
+                        depth = depth_decisions.report()
+                        if "tavily" in tool_used.lower() and depth["adaptive"]:
+                            add_to_workflow_log(
+                                "Search Depth",
+                                f"Tavily escalated {depth['escalated']} of {depth['adaptive']} searches to advanced depth "
+                                f"(~{depth['estimated_seconds_saved']:.0f}s and {depth['credits_saved']} credits saved since startup)",
+                                "info"
+                            )
+                        refresh = result.get("refresh", {})
+                        if refresh.get("mode") == "incremental":
+                            add_to_workflow_log(
+                                "Incremental Refresh",
+                                f"{refresh['new_records']} new results since {refresh['since']}, {refresh['skipped_records']} already analyzed or older"
+                                + ("" if refresh["new_records"] else " - kept the last run's topics"),
+                                "info"
+                            )
+                        log_budget(result)
+                        for tool_name, breaker in result.get("breakers", {}).items():
+                            if breaker["state"] != "closed" or breaker["rerouted"]:
+                                add_to_workflow_log(
+                                    "Circuit Breaker",
+                                    f"{tool_name} is {breaker['state']} (failure rate {breaker['failure_rate']:.0%}, {breaker['rerouted']} calls rerouted)",
+                                    "error" if breaker["state"] == "open" else "info"
+                                )
                         add_to_workflow_log("Analysis", "Identified compelling topics for content creation", "success")
                         st.session_state.show_topic_selection = True
                     else:
@@ -214,108 +609,20 @@ def main():
         
         # Topic Selection
         if st.session_state.show_topic_selection and st.session_state.analysis_result:
-            st.subheader("🎯 Pick a Topic")
-            
-            topics = parse_topics_from_analysis(st.session_state.analysis_result.get("topics", ""))
-            
-            if topics:
-                topic_options = []
-                for i, topic in enumerate(topics):
-                    title = topic.get("title", f"Topic {i+1}")
-                    why = topic.get("why", "")
-                    option = f"{title}"
-                    if why:
-                        option += f" - {why[:100]}..."
-                    topic_options.append(option)
-                
-                selected_index = st.radio(
-                    "Which topic interests you?",
-                    range(len(topic_options)),
-                    format_func=lambda x: topic_options[x]
-                )
-                
-                selected_topic_data = topics[selected_index]
-                # Store the full topic data, not just the title
-                st.session_state.selected_topic = {
-                    "title": selected_topic_data.get("title", ""),
-                    "why": selected_topic_data.get("why", ""),
-                    "angle": selected_topic_data.get("angle", ""),
-                    "full_context": f"Topic: {selected_topic_data.get('title', '')}\nWhy it matters: {selected_topic_data.get('why', '')}\nKey angle: {selected_topic_data.get('angle', '')}"
-                }
-                
-                # Create post button
-                if st.button("✨ Create Post", type="primary"):
-                    try:
-                        add_to_workflow_log("Writing", "Creating your post...", "info")
-                        creation_chain = CreationChain(google_api_key)
-                        
-                        with st.spinner("✨ Working on it..."):
-                            creation_result = creation_chain.invoke(st.session_state.selected_topic)
-                            st.session_state.creation_result = creation_result
-                        
-                        if "Error" not in creation_result.get("final_post", ""):
-                            add_to_workflow_log("Done", "Post is ready!", "success")
-                            st.session_state.show_final_post = True
-                        else:
-                            add_to_workflow_log("Error", f"Failed to generate post: {creation_result.get('final_post', 'Unknown error')}", "error")
-                            
-                    except Exception as e:
-                        add_to_workflow_log("Error", f"Failed to generate content: {str(e)}", "error")
-            else:
-                st.error("No topics could be parsed from the analysis. Please try again.")
+            topic_picker(google_api_key)
         
         # Show final post
         if st.session_state.show_final_post and st.session_state.creation_result:
-            st.subheader("🎉 Your Post")
-            
-            final_post = st.session_state.creation_result.get("final_post", "")
-            
-            if final_post and "Error" not in final_post:
-                # Display the final post
-                st.markdown("### 📋 Ready to Publish:")
-                st.markdown(f"""
-                <div style="background-color: #f8f9fa; padding: 1.5rem; border-radius: 0.5rem; border: 1px solid #dee2e6; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; color: #000000;">
-                {final_post.replace(chr(10), '<br>')}
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Action buttons
-                col_copy, col_restart = st.columns(2)
-                
-                with col_copy:
-                    if st.button("📋 Copy to Clipboard"):
-                        try:
-                            pyperclip.copy(final_post)
-                            st.success("✅ Post copied to clipboard!")
-                        except Exception as e:
-                            st.error(f"Failed to copy: {str(e)}")
-                            st.code(final_post)
-                
-                with col_restart:
-                    if st.button("🔄 Start Over"):
-                        # Clear all session state
-                        for key in list(st.session_state.keys()):
-                            del st.session_state[key]
-                        st.rerun()
-            else:
-                st.error("Failed to generate the final post. Please check the workflow log for details.")
+            final_post_panel()
+        
+        if st.session_state.batch_results:
+            batch_posts_panel()
     
     with col2:
-        display_workflow_log()
-        
-        # Show intermediate results in expanders
-        if st.session_state.analysis_result:
-            with st.expander("📊 Research Results"):
-                tool_used = st.session_state.analysis_result.get("tool_used", "Unknown")
-                st.markdown(f"**Tool Used:** {tool_used}")
-                st.text_area("Research Data", st.session_state.analysis_result.get("research_data", ""), height=150)
-                st.text_area("Identified Topics", st.session_state.analysis_result.get("topics", ""), height=200)
-        
-        if st.session_state.creation_result:
-            with st.expander("📝 Creation Process"):
-                st.text_area("Generated Angles", st.session_state.creation_result.get("angles", ""), height=150)
-                st.text_area("Initial Draft", st.session_state.creation_result.get("draft", ""), height=150)
-                st.text_area("Critique Feedback", st.session_state.creation_result.get("critique", ""), height=150)
+        workflow_log_panel()
+        results_panels()
+        display_render_times()
 
 if __name__ == "__main__":
-    main()
+    with timed_render("page"):
+        main()
@@ -0,0 +1,3 @@
+"""
+Benchmarks package for LinkedIn Content Strategist
+"""
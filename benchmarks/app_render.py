@@ -0,0 +1,73 @@
+"""
+Benchmark: per-interaction render time of app.py with large session payloads
+
+Seeds a session with a big research payload, a long workflow log and a
+finished post, drives a few interactions, and reports the per-section render
+times recorded by app.py. AppTest always reruns the whole script, so the cost
+of a fragment rerun is that fragment's own section time, compared here with
+the full page.
+
+Usage: python -m benchmarks.app_render [iterations]
+"""
+import os
+import sys
+import time
+from streamlit.logger import set_log_level
+from streamlit.testing.v1 import AppTest
+
+TOPICS = "\n\n".join(
+    f"Topic {i}: Topic number {i}\nWhy it matters: Because it changes how teams work in area {i}\nKey angle: Angle {i}"
+    for i in range(1, 4)
+)
+
+
+def seeded_app() -> AppTest:
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.setdefault("GNEWS_API_KEY", "benchmark")
+    os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+
+    app = AppTest.from_file(os.path.join(os.path.dirname(__file__), "..", "app.py"), default_timeout=30)
+    app.session_state["analysis_result"] = {
+        "research_data": "Research line with a fair amount of text in it.\n" * 4000,
+        "topics": TOPICS,
+        "tool_used": "Tavily Web Search"
+    }
+    app.session_state["creation_result"] = {
+        "angles": "Angle text\n" * 2000,
+        "draft": "Draft text\n" * 2000,
+        "critique": "Critique text\n" * 2000,
+        "final_post": "Final post line\n" * 40
+    }
+    app.session_state["workflow_log"] = [
+        {"step": f"Step {i}", "message": "Something happened in the pipeline", "status": "info"}
+        for i in range(300)
+    ]
+    app.session_state["show_topic_selection"] = True
+    app.session_state["show_final_post"] = True
+    return app.run()
+
+
+def mean_ms(samples) -> float:
+    return sum(samples) / len(samples) * 1000
+
+
+def main():
+    set_log_level("error")
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    app = seeded_app()
+
+    for i in range(iterations):
+        app.radio[0].set_value((i + 1) % 3).run()
+        next(button for button in app.button if "Copy" in button.label).click().run()
+
+    render_times = app.session_state["render_times"]
+    page = mean_ms(render_times["page"])
+    print(f"full page render:              {page:7.1f} ms")
+    print(f"topic change (topic_picker):   {mean_ms(render_times['topic_picker']):7.1f} ms")
+    print(f"copy click (final_post):       {mean_ms(render_times['final_post']):7.1f} ms")
+    print(f"skipped on fragment reruns:    workflow_log {mean_ms(render_times['workflow_log']):.1f} ms, "
+          f"results_panels {mean_ms(render_times['results_panels']):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark: thread-per-session vs asyncio sessions at high concurrency
+
+Runs N simulated sessions (Find Topics, then Create Post) two ways against the
+same stubbed backends as benchmarks.load_test:
+- threads: one pool thread per session calling stream()/invoke()
+- asyncio: one task per session on a single event loop calling astream()/ainvoke()
+The stubs sleep with time.sleep on the sync path and asyncio.sleep on the async
+path, so each mode waits on backends the way real HTTP clients would.
+
+Reports wall time, request latency percentiles, peak OS thread count and peak
+RSS growth for each mode and concurrency level. Each run gets a fresh process so
+one mode's threads and heap don't carry over into the other's numbers.
+
+Usage: python -m benchmarks.async_concurrency [--levels 100,200] [--rounds 1]
+                                              [--latency-scale 0.1] [--modes threads,asyncio]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from benchmarks.load_test import (FILLER, BackendProfile, RssSampler, _service_time, create_post, find_topics,
+                                  install_stubs, measure, percentile)
+from chains.analysis_chain import AnalysisChain
+from chains.creation_chain import CreationChain
+from tools.fair_share import FairShareScheduler, set_scheduler, tenant_scope
+
+
+async def afind_topics(field: str) -> tuple:
+    chain = AnalysisChain("stub", "stub", "stub")
+    chain.master_researcher.agent_executor.verbose = False
+    result = {}
+    async for event in chain.astream(field):
+        if event["event"] == "done":
+            result = event["result"]
+    return result, "Error" not in result.get("topics", "Error")
+
+
+async def acreate_post(field: str) -> tuple:
+    topic = {"title": field, "full_context": f"Topic: {field}\nWhy it matters: {FILLER[:120]}\nKey angle: What changes next"}
+    result = await CreationChain("stub").ainvoke(topic)
+    return result, "Error" not in result.get("final_post", "Error")
+
+
+async def ameasure(phase: str, afn) -> dict:
+    """Async version of load_test.measure; each task gets its own service-time counter."""
+    service = [0.0]
+    _service_time.set(service)
+    start = time.perf_counter()
+    try:
+        _, ok = await afn()
+    except Exception:
+        ok = False
+    latency = time.perf_counter() - start
+    return {"phase": phase, "latency": latency, "queue_delay": max(0.0, latency - service[0]), "ok": ok}
+
+
+def thread_session(session: int, rounds: int, stagger: float) -> List[dict]:
+    time.sleep(random.uniform(0, stagger))
+    rows = []
+    with tenant_scope(f"session-{session}"):
+        for round_number in range(rounds):
+            field = f"platform engineering {session}-{round_number}"
+            for phase, fn in (("find_topics", find_topics), ("create_post", create_post)):
+                rows.append(measure(phase, lambda: fn(field))[0])
+    return rows
+
+
+async def async_session(session: int, rounds: int, stagger: float) -> List[dict]:
+    await asyncio.sleep(random.uniform(0, stagger))
+    rows = []
+    with tenant_scope(f"session-{session}"):
+        for round_number in range(rounds):
+            field = f"platform engineering {session}-{round_number}"
+            for phase, afn in (("find_topics", afind_topics), ("create_post", acreate_post)):
+                rows.append(await ameasure(phase, lambda: afn(field)))
+    return rows
+
+
+def run_threads(level: int, rounds: int, stagger: float) -> List[dict]:
+    with ThreadPoolExecutor(max_workers=level) as pool:
+        sessions = list(pool.map(lambda session: thread_session(session, rounds, stagger), range(level)))
+    return [row for rows in sessions for row in rows]
+
+
+def run_asyncio(level: int, rounds: int, stagger: float) -> List[dict]:
+    async def run():
+        return await asyncio.gather(*(async_session(session, rounds, stagger) for session in range(level)))
+    return [row for rows in asyncio.run(run()) for row in rows]
+
+
+MODES = {"threads": run_threads, "asyncio": run_asyncio}
+
+
+def run_mode(mode: str, level: int, rounds: int, stagger: float, latency_scale: float, seed: int) -> dict:
+    """Run one mode at one level; called in a fresh process so memory and threads start from scratch."""
+    random.seed(seed)
+    # Errors are off so both modes do identical work
+    install_stubs(BackendProfile(latency_scale, llm_error_rate=0.0, tool_error_rate=0.0))
+    # This compares runtime overhead, so the pools are sized to never queue
+    for pool in ("llm", "tools"):
+        set_scheduler(pool, FairShareScheduler(pool, capacity=level * 4, tenant_limit=level * 4))
+    start = time.perf_counter()
+    with RssSampler() as rss:
+        rows = MODES[mode](level, rounds, stagger)
+    elapsed = time.perf_counter() - start
+
+    latencies = [row["latency"] for row in rows]
+    delays = [row["queue_delay"] for row in rows]
+    return {
+        "elapsed": elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "queue_delay": sum(delays) / len(delays),
+        "errors": sum(1 for row in rows if not row["ok"]),
+        "threads": rss.peak_threads,
+        "rss_mb": (rss.peak - rss.baseline) / 1024 / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thread-per-session vs asyncio at high concurrency")
+    parser.add_argument("--levels", default="100,200", help="comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=1, help="find-topics + create-post rounds per session")
+    parser.add_argument("--stagger", type=float, default=0.5, help="spread session starts over this many seconds")
+    parser.add_argument("--latency-scale", type=float, default=0.1, help="multiplier on the backend latency medians")
+    parser.add_argument("--modes", default="threads,asyncio")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"\n{'mode':>8}{'users':>7}{'wall s':>8}{'p50 s':>7}{'p95 s':>7}{'queue s':>9}"
+          f"{'errors':>8}{'threads':>9}{'RSS MB':>8}")
+    context = multiprocessing.get_context("spawn")
+    for level in (int(value) for value in args.levels.split(",")):
+        for mode in args.modes.split(","):
+            with context.Pool(1) as pool:
+                r = pool.apply(run_mode, (mode, level, args.rounds, args.stagger, args.latency_scale, args.seed))
+            print(f"{mode:>8}{level:>7}{r['elapsed']:>8.2f}{r['p50']:>7.2f}{r['p95']:>7.2f}{r['queue_delay']:>9.3f}"
+                  f"{r['errors']:>8}{r['threads']:>9}{r['rss_mb']:>8.1f}")
+
+    print("\nthreads = peak OS threads in the process; RSS MB = peak resident growth over the run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: one critique call per draft vs. several drafts packed into one call
+
+Critiques N synthetic drafts with CritiqueAgent.critique (concurrently) and
+with critique_batch, against a stand-in model whose latency grows with prompt
+and output size, and prints request counts, input tokens and wall time.
+--drop N makes the stub leave out one critique per batched response, to show
+the per-draft fallback.
+
+Usage: python -m benchmarks.batch_critique [drafts] [--drop N]
+"""
+import re
+import sys
+import time
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from agents.critique_agent import CritiqueAgent
+from agents.llm_factory import set_llm_override
+from agents.prompt_prefix import prefix_usage
+from config.settings import load_settings
+
+DRAFT = ("Hospitals piloting AI triage cut low-acuity waits by a third. "
+         "Here is what the first six months taught three regional ERs about trust, liability and alert fatigue. ") * 6
+CRITIQUE = ("**STRENGTHS:**\n- Concrete numbers\n\n**PRIORITY FIXES:**\n- Sharpen the hook\n\n"
+            "**SCORE:** 78\n**HASHTAGS:** #HealthTech #AI #Hospitals")
+
+
+class CritiqueStubModel(BaseChatModel):
+    """Critiques every draft it is sent; latency = first-token delay + prefill + decode."""
+
+    first_token: float = 0.6
+    prefill_tokens_per_s: float = 25000
+    decode_tokens_per_s: float = 150
+    drop: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "critique-stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = str(messages[-1].content)
+        numbers = [int(n) for n in re.findall(r"=== DRAFT (\d+) ===", prompt)]
+        if numbers:
+            content = "\n\n".join(f"=== CRITIQUE {n} ===\n{CRITIQUE}" for n in numbers if n != self.drop)
+        else:
+            content = CRITIQUE
+        prompt_tokens = sum(len(str(message.content)) for message in messages) / 4
+        output_tokens = len(content) / 4
+        time.sleep(self.first_token + prompt_tokens / self.prefill_tokens_per_s + output_tokens / self.decode_tokens_per_s)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+def run(agent: CritiqueAgent, drafts: list, batched: bool) -> tuple:
+    prefix_usage.reset()
+    start = time.perf_counter()
+    if batched:
+        critiques = agent.critique_batch(drafts)
+    else:
+        critiques = agent.chain.batch([{"draft": draft} for draft in drafts])
+    elapsed = time.perf_counter() - start
+    report = prefix_usage.report()
+    calls = {name: stats["calls"] for name, stats in report["prefixes"].items()}
+    scored = sum(agent.parse_score(critique) is not None for critique in critiques)
+    return calls, report["tokens_sent"], elapsed, scored
+
+
+def main():
+    args = sys.argv[1:]
+    drop = 0
+    if "--drop" in args:
+        position = args.index("--drop")
+        drop = int(args[position + 1])
+        del args[position:position + 2]
+    count = int(args[0]) if args else 20
+
+    set_llm_override(lambda stage, config: CritiqueStubModel(drop=drop))
+    agent = CritiqueAgent("benchmark-key", settings=load_settings())
+    drafts = [f"Draft {i}: {DRAFT}" for i in range(count)]
+    print(f"🧪 {count} drafts, up to {agent.batch_max_drafts} per batch "
+          f"and {agent.batch_input_tokens} draft tokens (CRITIQUE_BATCH_MAX_DRAFTS / CRITIQUE_BATCH_TOKENS)")
+
+    print(f"\n{'mode':<10}{'requests':>10}{'input tok':>11}{'wall s':>8}{'scored':>8}")
+    for mode, batched in (("single", False), ("batched", True)):
+        calls, tokens, elapsed, scored = run(agent, drafts, batched)
+        detail = ", ".join(f"{name}={n}" for name, n in calls.items())
+        print(f"{mode:<10}{sum(calls.values()):>10}{tokens:>11,}{elapsed:>8.2f}{scored:>8}   ({detail})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: Create Post latency with stages run in a line vs. as a DAG
+
+Runs CreationChain's DAG on the load-test stubs three ways:
+- linear: the same nodes, each waiting for the one before it, as the old
+  LCEL pipeline ran them
+- dag: nodes start as soon as their inputs exist, so drafting overlaps
+  angle generation
+- rerun: an earlier run's angles and draft passed back in, so only critique
+  and formatting execute (memoization off, so nothing is served from cache)
+
+Prints latency percentiles per mode, how often each stage was on the critical
+path, and one DAG run's timeline.
+
+Usage: python -m benchmarks.dag_pipeline [--posts 20] [--latency-scale 0.1]
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from benchmarks.load_test import FILLER, BackendProfile, install_stubs, percentile
+from chains.dag import Dag, Node
+from chains.creation_chain import CreationChain
+
+
+def linear(dag: Dag) -> Dag:
+    """The same nodes, each also waiting for the previous node's outputs."""
+    nodes, previous = [], ()
+    for node in dag.nodes.values():
+        def func(_node=node, **inputs):
+            return _node.func(**{name: inputs[name] for name in _node.inputs})
+        nodes.append(Node(node.name, func, (*node.inputs, *previous), node.outputs))
+        previous = node.outputs
+    return Dag(nodes, name="linear")
+
+
+def run(dag: Dag, states: list) -> tuple:
+    latencies, critical, last = [], Counter(), None
+    for state in states:
+        start = time.perf_counter()
+        last = dag.invoke(state)["dag_run"]
+        latencies.append(time.perf_counter() - start)
+        critical.update(last.critical_path())
+    return latencies, critical, last
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create Post latency: linear stages vs. DAG scheduling")
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--latency-scale", type=float, default=0.1, help="multiplier on the backend latency medians")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    install_stubs(BackendProfile(args.latency_scale, llm_error_rate=0.0, tool_error_rate=0.0))
+    chain = CreationChain("stub")
+    # Memoization would turn every run after the first into cache hits
+    dag = Dag(chain.dag.nodes.values(), name="dag")
+
+    states = [chain._inputs({"title": f"post {i}", "full_context": f"Topic: post {i}\nWhy it matters: {FILLER[:120]}"})
+              for i in range(args.posts)]
+    rows = []
+    for mode, runner, inputs in (("linear", linear(dag), states), ("dag", dag, states)):
+        rows.append((mode, *run(runner, inputs)))
+    drafted = [{**state, "angles": "saved angles", "draft": f"saved draft {i}. {FILLER}"} for i, state in enumerate(states)]
+    rows.append(("rerun", *run(dag, drafted)))
+
+    print(f"🧪 {args.posts} posts per mode\n")
+    print(f"{'mode':<8}{'p50 s':>8}{'p95 s':>8}{'total s':>9}   critical path share")
+    for mode, latencies, critical, _ in rows:
+        share = ", ".join(f"{stage} {count / args.posts:.0%}" for stage, count in critical.most_common())
+        print(f"{mode:<8}{percentile(latencies, 50):>8.2f}{percentile(latencies, 95):>8.2f}{sum(latencies):>9.2f}   {share}")
+
+    print(f"\n📈 Last dag run (* = critical path)\n{rows[1][3].timeline()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: interactive Create Post latency while another tenant runs a large batch
+
+The stub backend serves at most --provider-slots model calls at once (the
+shared API key's concurrency), queueing the rest first come, first served.
+Interactive users each create a few posts one after another; in the contended
+modes, one tenant runs CreationChain.batch() over many topics at the same time.
+
+- alone: interactive users only
+- fifo: batch running, no scheduling (every call goes straight to the provider queue)
+- fair: batch running, calls pass through the fair-share scheduler first
+
+Prints interactive latency percentiles, batch wall time and the scheduler's
+per-class queue waits.
+
+Usage: python -m benchmarks.fair_share [--users 4] [--posts 3] [--batch 24]
+                                       [--batch-concurrency 12] [--provider-slots 6]
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.load_test import FILLER, BackendProfile, install_stubs, percentile
+from chains.checkpoints import CheckpointStore
+from chains.creation_chain import CreationChain
+from tools.fair_share import BATCH, INTERACTIVE, FairShareScheduler, set_scheduler, tenant_scope
+
+# Scheduler settings that never queue: the "fifo" mode
+UNLIMITED = 10 ** 6
+
+
+class ProviderProfile(BackendProfile):
+    """Backend with a fixed number of concurrent calls, like a shared API key's limit."""
+
+    def __init__(self, slots: int, **kwargs):
+        super().__init__(**kwargs)
+        self.slots = threading.Semaphore(slots)
+
+    def call(self, median: float, error_rate: float, what: str):
+        with self.slots:
+            super().call(median, error_rate, what)
+
+
+def topic(name: str) -> dict:
+    return {"title": name, "full_context": f"Topic: {name}\nWhy it matters: {FILLER[:120]}"}
+
+
+def interactive_user(user: int, posts: int) -> list:
+    chain = CreationChain("stub", checkpoints=CheckpointStore())
+    latencies = []
+    with tenant_scope(f"user-{user}", INTERACTIVE):
+        for post in range(posts):
+            start = time.perf_counter()
+            chain.invoke(topic(f"user {user} post {post}"))
+            latencies.append(time.perf_counter() - start)
+            time.sleep(random.uniform(0.05, 0.2))
+    return latencies
+
+
+def run(mode: str, args) -> tuple:
+    capacity, limit = (args.provider_slots, args.tenant_limit) if mode == "fair" else (UNLIMITED, UNLIMITED)
+    scheduler = FairShareScheduler("llm", capacity, tenant_limit=limit)
+    set_scheduler("llm", scheduler)
+
+    batch_seconds = [None]
+
+    def batch_job():
+        chain = CreationChain("stub", checkpoints=CheckpointStore())
+        start = time.perf_counter()
+        with tenant_scope("bulk", BATCH):
+            chain.batch([topic(f"batch {i}") for i in range(args.batch)], max_concurrency=args.batch_concurrency)
+        batch_seconds[0] = time.perf_counter() - start
+
+    batch_thread = None
+    if mode != "alone":
+        batch_thread = threading.Thread(target=batch_job)
+        batch_thread.start()
+        time.sleep(0.3)  # Let the batch fill the provider first
+    with ThreadPoolExecutor(args.users) as pool:
+        latencies = [latency for user in pool.map(interactive_user, range(args.users), [args.posts] * args.users)
+                     for latency in user]
+    if batch_thread:
+        batch_thread.join()
+    return latencies, batch_seconds[0], scheduler.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interactive latency under a concurrent batch, with and without fair share")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--posts", type=int, default=3, help="posts per interactive user")
+    parser.add_argument("--batch", type=int, default=24, help="topics in the background batch")
+    parser.add_argument("--batch-concurrency", type=int, default=12)
+    parser.add_argument("--provider-slots", type=int, default=6, help="concurrent calls the backend serves")
+    parser.add_argument("--tenant-limit", type=int, default=4)
+    parser.add_argument("--latency-scale", type=float, default=0.1, help="multiplier on the backend latency medians")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    install_stubs(ProviderProfile(args.provider_slots, latency_scale=args.latency_scale,
+                                  llm_error_rate=0.0, tool_error_rate=0.0))
+    print(f"🧪 {args.users} interactive users x {args.posts} posts, batch of {args.batch} "
+          f"({args.batch_concurrency} at a time), {args.provider_slots} provider slots\n")
+    print(f"{'mode':<7}{'int p50 s':>10}{'int p95 s':>10}{'batch s':>9}   queue wait p95 (interactive / batch)")
+    for mode in ("alone", "fifo", "fair"):
+        latencies, batch_seconds, report = run(mode, args)
+        waits = report["classes"]
+        wait = " / ".join(f"{waits.get(priority, {}).get('p95_wait_seconds', 0.0):.2f}s" for priority in (INTERACTIVE, BATCH))
+        batch = f"{batch_seconds:.2f}" if batch_seconds is not None else "-"
+        print(f"{mode:<7}{percentile(latencies, 50):>10.2f}{percentile(latencies, 95):>10.2f}{batch:>9}   {wait}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: Create Post deadlines met with and without the latency-budget planner
+
+Runs CreationChain.invoke() on the load-test stubs, first a few unbudgeted
+warm-up posts so stage_metrics has timings to plan from, then the same number
+of posts with no plan and with budget_seconds set. With no plan a post "meets"
+the budget if it happened to finish in time. Prints the share of posts within
+budget, latency percentiles and how often each stage was cut.
+
+Usage: python -m benchmarks.latency_budget [--budget 1.2] [--posts 30] [--latency-scale 0.1]
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from benchmarks.load_test import FILLER, BackendProfile, install_stubs, percentile
+from chains.checkpoints import CheckpointStore
+from chains.creation_chain import CreationChain
+
+
+def run_posts(chain: CreationChain, posts: int, budget: float, planned: bool) -> tuple:
+    latencies, cuts = [], Counter()
+    for i in range(posts):
+        # Fresh checkpoints, so no post resumes the last one's stages
+        chain.checkpoints = CheckpointStore()
+        topic = {"title": f"post {i}", "full_context": f"Topic: post {i}\nWhy it matters: {FILLER[:120]}"}
+        start = time.perf_counter()
+        result = chain.invoke(topic, budget_seconds=budget if planned else None)
+        latencies.append(time.perf_counter() - start)
+        for degradation in result.get("budget", {}).get("degradations", []):
+            cuts[f"{degradation['stage']} ({degradation['when']})"] += 1
+    met = sum(latency <= budget for latency in latencies) / posts
+    return met, percentile(latencies, 50), percentile(latencies, 95), cuts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deadline hit rate with and without latency-budget planning")
+    parser.add_argument("--budget", type=float, default=1.2, help="end-to-end budget per post in seconds")
+    parser.add_argument("--posts", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=10, help="unbudgeted posts run first to collect stage timings")
+    parser.add_argument("--latency-scale", type=float, default=0.1, help="multiplier on the backend latency medians")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    install_stubs(BackendProfile(args.latency_scale, llm_error_rate=0.0, tool_error_rate=0.0))
+    chain = CreationChain("stub")
+    print(f"🔥 Warming stage timings with {args.warmup} unbudgeted posts...")
+    run_posts(chain, args.warmup, args.budget, planned=False)
+
+    print(f"\n{'mode':<10}{'within budget':>15}{'p50 s':>8}{'p95 s':>8}   cuts")
+    for mode, planned in (("unplanned", False), ("planned", True)):
+        met, p50, p95, cuts = run_posts(chain, args.posts, args.budget, planned)
+        detail = ", ".join(f"{stage} x{count}" for stage, count in sorted(cuts.items())) or "-"
+        print(f"{mode:<10}{met:>15.0%}{p50:>8.2f}{p95:>8.2f}   {detail}")
+
+
+if __name__ == "__main__":
+    main()
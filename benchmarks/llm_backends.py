@@ -0,0 +1,140 @@
+"""
+Benchmark: Gemini vs. a local quantized CPU model, stage by stage
+
+For each stage and backend, runs the stage's agent on canned inputs:
+- latency: --calls calls one after another (p50/p95)
+- throughput: the same calls --concurrency at a time (calls per second)
+- quality proxies: share of outputs passing cheap format checks:
+  angle_generation: all 3 "Angle n" sections present
+  drafting: 150-300 words, ends on a question
+  critique: a parseable SCORE and at least one hashtag
+  formatting: at most 300 words, has hashtags, no leftover markdown headers
+- errors: outputs that came back as error strings
+
+The local backend loads LOCAL_MODEL_DIR/<--local-model> with llama-cpp-python;
+Gemini needs GOOGLE_API_KEY. A backend that can't be built is reported and
+skipped. --stub swaps both for the load-test stub models to dry-run the harness.
+
+Usage: python -m benchmarks.llm_backends --local-model qwen2.5-1.5b-instruct-q4_k_m.gguf
+                                         [--stages critique,formatting] [--backends gemini,local]
+                                         [--calls 5] [--concurrency 3] [--stub]
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+from dotenv import load_dotenv
+
+from agents.angle_generator import AngleGeneratorAgent
+from agents.critique_agent import CritiqueAgent
+from agents.drafting_agent import DraftingAgent
+from agents.formatting_agent import FormattingAgent
+from benchmarks.batch_critique import CRITIQUE, DRAFT
+from benchmarks.load_test import BackendProfile, install_stubs, percentile
+from config.settings import Settings, load_settings
+from tools.circuit_breaker import is_error_result
+
+TOPIC = ("Topic: Hospitals piloting AI triage\nWhy it matters: Low-acuity waits fell by a third in six months\n"
+         "Key angle: What trust, liability and alert fatigue taught three regional ERs")
+ANGLE = "The How-To/Practical Angle"
+
+
+def words(text: str) -> int:
+    return len(text.split())
+
+
+# stage -> (agent class, call, quality checks)
+STAGES = {
+    "angle_generation": (AngleGeneratorAgent, lambda agent: agent.generate_angles(TOPIC), (
+        lambda output: all(f"Angle {n}" in output for n in (1, 2, 3)),
+    )),
+    "drafting": (DraftingAgent, lambda agent: agent.draft_post(TOPIC, ANGLE), (
+        lambda output: 150 <= words(output) <= 300,
+        lambda output: output.rstrip().endswith("?"),
+    )),
+    "critique": (CritiqueAgent, lambda agent: agent.critique(DRAFT), (
+        lambda output: CritiqueAgent.parse_score(output) is not None,
+        lambda output: bool(CritiqueAgent.parse_hashtags(output)),
+    )),
+    "formatting": (FormattingAgent, lambda agent: agent.format_final_post(DRAFT, CRITIQUE), (
+        lambda output: words(output) <= 300,
+        lambda output: bool(re.search(r"#\w+", output)),
+        lambda output: not re.search(r"^\s*#{1,6}\s|\*\*[A-Z ]+:\*\*", output, re.MULTILINE),
+    )),
+}
+
+
+def settings_for(backend: str, stage: str, local_model: str) -> Settings:
+    """Settings running the stage (and its batched variant, e.g. critique_batch) on the backend."""
+    settings = load_settings()
+    stages = dict(settings.stages)
+    if backend != "gemini":
+        for name in (stage, f"{stage}_batch"):
+            if name in stages:
+                stages[name] = replace(stages[name], backend=backend, model=local_model)
+    return Settings(stages, f"bench-{backend}")
+
+
+def run(stage: str, backend: str, args) -> dict:
+    agent_class, call, checks = STAGES[stage]
+    agent = agent_class(os.getenv("GOOGLE_API_KEY", ""), settings=settings_for(backend, stage, args.local_model))
+    call(agent)  # Warm-up: loads the local model, opens the API connection
+
+    latencies, outputs = [], []
+    for _ in range(args.calls):
+        start = time.perf_counter()
+        outputs.append(call(agent))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        outputs += list(pool.map(lambda _: call(agent), range(args.calls)))
+    throughput = args.calls / (time.perf_counter() - start)
+
+    good = [output for output in outputs if not is_error_result(output)]
+    passed = sum(check(output) for output in good for check in checks)
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "throughput": throughput,
+        "quality": passed / (len(good) * len(checks)) if good else 0.0,
+        "errors": len(outputs) - len(good),
+        "first_error": next((output for output in outputs if is_error_result(output)), "")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency, throughput and quality: Gemini vs. local CPU model")
+    parser.add_argument("--stages", default="angle_generation,drafting,critique,formatting")
+    parser.add_argument("--backends", default="gemini,local")
+    parser.add_argument("--local-model", default=os.getenv("LOCAL_LLM_MODEL", "qwen2.5-1.5b-instruct-q4_k_m.gguf"),
+                        help="GGUF file under LOCAL_MODEL_DIR")
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--stub", action="store_true", help="use the load-test stub models for every backend")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if args.stub:
+        install_stubs(BackendProfile(0.1, llm_error_rate=0.0, tool_error_rate=0.0))
+
+    print(f"🧪 {args.calls} sequential + {args.calls} concurrent calls ({args.concurrency} at a time) per stage and backend\n")
+    print(f"{'stage':<18}{'backend':<9}{'p50 s':>8}{'p95 s':>8}{'calls/s':>9}{'quality':>9}{'errors':>8}")
+    for stage in args.stages.split(","):
+        for backend in args.backends.split(","):
+            try:
+                row = run(stage, backend, args)
+            except Exception as e:
+                print(f"{stage:<18}{backend:<9}   skipped: {e}")
+                continue
+            print(f"{stage:<18}{backend:<9}{row['p50']:>8.2f}{row['p95']:>8.2f}{row['throughput']:>9.2f}"
+                  f"{row['quality']:>9.0%}{row['errors']:>8}")
+            if row["errors"] == args.calls * 2:
+                print(f"{'':<27}{row['first_error'][:100]}")
+
+
+if __name__ == "__main__":
+    main()
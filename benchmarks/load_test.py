@@ -0,0 +1,360 @@
+"""
+Load test: concurrent sessions running find-topics then create-post
+
+Every simulated session runs AnalysisChain.stream() (Find Topics) and then
+CreationChain.invoke() (Create Post), pausing for a think time after each,
+for a number of rounds. The real pipeline code runs end to end. Only the
+backends are stubbed:
+- chat models, via set_llm_override, with StubChatModel
+- the research tools' API calls
+Both stubs sleep for a lognormal latency around a per-stage median and fail
+at a configurable rate.
+
+For each concurrency level the harness reports:
+- throughput and per-phase latency percentiles
+- queueing delay: request time not spent inside a stubbed backend, i.e. pools, locks and the GIL
+- memory per session: peak RSS growth over the level (sampled from /proc; with
+  --trace-memory, the tracemalloc peak instead, which slows every request
+  several-fold), and the session-state bytes a session keeps once its results
+  are offloaded to the shared result store
+It writes requests.csv (one row per request) and summary.csv (one row per level).
+
+Usage: python -m benchmarks.load_test [--levels 1,5,10,25] [--rounds 2] [--think 1.0]
+                                      [--latency-scale 0.1] [--llm-errors 0.02] [--tool-errors 0.05]
+                                      [--trace-memory] [--out load_test_results]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from agents.llm_factory import set_llm_override
+from chains.analysis_chain import AnalysisChain
+from chains.creation_chain import CreationChain
+from chains.result_store import deep_size, result_store
+from tools.fair_share import tenant_scope
+from tools.local_index import local_index
+from tools.gnews_tool import GNewsSearchTool
+from tools.records import ResearchRecord
+from tools.tavily_tool import TavilySearchTool
+from tools.wikipedia_tool import WikipediaSearchTool
+from tools.youtube_tool import YouTubeSearchTool
+
+# Median backend latency in seconds, roughly what production logs show
+LLM_LATENCY = {
+    "research": 1.5,
+    "topic_analysis": 4.0,
+    "angle_generation": 3.0,
+    "drafting": 5.0,
+    "critique": 3.0,
+    "formatting": 3.0
+}
+TOOL_LATENCY = {
+    "gnews_search": 0.6,
+    "tavily_search": 1.2,
+    "youtube_search": 0.8,
+    "wikipedia_search": 0.4
+}
+# How often the stub research agent picks each tool
+TOOL_MIX = (("tavily_search", 0.6), ("gnews_search", 0.2), ("youtube_search", 0.1), ("wikipedia_search", 0.1))
+TOOL_CLASSES = (GNewsSearchTool, TavilySearchTool, YouTubeSearchTool, WikipediaSearchTool)
+
+FILLER = ("Teams adopting the approach report shorter cycle times, fewer handoffs and clearer ownership, "
+          "while critics point to integration costs and the skills gap. ") * 3
+
+# Backend seconds spent on behalf of the current request; tool threads inherit it from the caller
+_service_time: ContextVar[Optional[List[float]]] = ContextVar("service_time", default=None)
+
+
+class BackendProfile:
+    """Latency and error distribution of the stubbed backends."""
+
+    def __init__(self, latency_scale: float = 1.0, sigma: float = 0.5,
+                 llm_error_rate: float = 0.02, tool_error_rate: float = 0.05):
+        self.latency_scale = latency_scale
+        self.sigma = sigma
+        self.llm_error_rate = llm_error_rate
+        self.tool_error_rate = tool_error_rate
+
+    def call(self, median: float, error_rate: float, what: str):
+        """Sleep like a backend call, credit the time to the current request, and maybe fail."""
+        seconds = median * self.latency_scale * random.lognormvariate(0, self.sigma)
+        time.sleep(seconds)
+        service = _service_time.get()
+        if service is not None:
+            service[0] += seconds
+        if random.random() < error_rate:
+            raise RuntimeError(f"429 Resource has been exhausted ({what} stub)")
+
+    async def acall(self, median: float, error_rate: float, what: str):
+        """Async version of call; waits on the event loop instead of blocking a thread."""
+        seconds = median * self.latency_scale * random.lognormvariate(0, self.sigma)
+        await asyncio.sleep(seconds)
+        service = _service_time.get()
+        if service is not None:
+            service[0] += seconds
+        if random.random() < error_rate:
+            raise RuntimeError(f"429 Resource has been exhausted ({what} stub)")
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that answers each stage with canned text after a simulated delay."""
+
+    stage: str
+    profile: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.profile.call(LLM_LATENCY.get(self.stage, 2.0), self.profile.llm_error_rate, self.stage)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await self.profile.acall(LLM_LATENCY.get(self.stage, 2.0), self.profile.llm_error_rate, self.stage)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _reply(self, messages) -> AIMessage:
+        if self.stage == "research":
+            if not any(isinstance(message, ToolMessage) for message in messages):
+                tool = random.choices([name for name, _ in TOOL_MIX], [weight for _, weight in TOOL_MIX])[0]
+                return AIMessage(content="", tool_calls=[{
+                    "name": tool, "args": {"query": messages[-1].content[-80:]}, "id": uuid.uuid4().hex
+                }])
+            return AIMessage(content="Research summary: " + FILLER)
+
+        nonce = uuid.uuid4().hex[:8]
+        if self.stage == "topic_analysis":
+            return AIMessage(content="\n\n".join(
+                f"Topic {i}: Shift number {i} ({nonce})\nWhy it matters: {FILLER[:120]}\nKey angle: Angle {i}"
+                for i in range(1, 4)
+            ))
+        if self.stage == "critique":
+            return AIMessage(content=f"**STRENGTHS:**\n- Clear hook\n\n**PRIORITY FIXES:**\n- Tighten the middle\n\n"
+                                     f"**SCORE:** {random.randint(60, 98)}\n**HASHTAGS:** #Leadership #LoadTest")
+        return AIMessage(content=f"{self.stage} output {nonce}\n\n{FILLER}")
+
+
+def install_stubs(profile: BackendProfile):
+    """Route every chat model and research tool call to the stubs."""
+    set_llm_override(lambda stage, config: StubChatModel(stage=stage, profile=profile))
+    # Keep stub records in memory, out of the on-disk local search index
+    local_index.path = None
+
+    def records(tool_name: str, query: str) -> List[ResearchRecord]:
+        return [
+            ResearchRecord(tool_name, "web", title=f"{query[:40]} result {i}",
+                           url=f"https://example.com/{tool_name}/{uuid.uuid4().hex[:8]}", text=FILLER)
+            for i in range(5)
+        ]
+
+    def stub_search(self, query: str, timeout: Optional[float] = None):
+        profile.call(TOOL_LATENCY[self.name], profile.tool_error_rate, self.name)
+        return records(self.name, query)
+
+    async def stub_asearch(self, query: str, timeout: Optional[float] = None):
+        await profile.acall(TOOL_LATENCY[self.name], profile.tool_error_rate, self.name)
+        return records(self.name, query)
+
+    for tool_class in TOOL_CLASSES:
+        tool_class._search = stub_search
+        tool_class._asearch = stub_asearch
+
+
+def measure(phase: str, fn) -> tuple:
+    """Run one request, returning its row (latency, backend time, queueing delay) and result."""
+    service = [0.0]
+    token = _service_time.set(service)
+    start = time.perf_counter()
+    try:
+        result, ok = fn()
+    except Exception:
+        result, ok = {}, False
+    finally:
+        _service_time.reset(token)
+    latency = time.perf_counter() - start
+    # Hedged tool calls can overlap, so backend time may exceed wall time
+    return {
+        "phase": phase,
+        "latency": latency,
+        "service": service[0],
+        "queue_delay": max(0.0, latency - service[0]),
+        "ok": ok
+    }, result
+
+
+def find_topics(field: str) -> tuple:
+    chain = AnalysisChain("stub", "stub", "stub")
+    chain.master_researcher.agent_executor.verbose = False
+    result = {}
+    for event in chain.stream(field):
+        if event["event"] == "done":
+            result = event["result"]
+    return result, "Error" not in result.get("topics", "Error")
+
+
+def create_post(field: str) -> tuple:
+    topic = {"title": field, "full_context": f"Topic: {field}\nWhy it matters: {FILLER[:120]}\nKey angle: What changes next"}
+    result = CreationChain("stub").invoke(topic)
+    return result, "Error" not in result.get("final_post", "Error")
+
+
+def run_session(level: int, session: int, rounds: int, think: float) -> tuple:
+    """One simulated user; returns its request rows and the session-state bytes it ended up holding."""
+    rows = []
+    kept = {}
+    session_key = f"load-{level}-{session}"
+    pause = lambda: time.sleep(random.expovariate(1 / think)) if think > 0 else None
+    # Stagger arrivals so sessions don't move in lockstep
+    time.sleep(random.uniform(0, think))
+    # Each session is its own fair-share tenant, as in app.py
+    with tenant_scope(session_key):
+        for round_number in range(rounds):
+            field = f"platform engineering {level}-{session}-{round_number}"
+            for phase, fn in (("find_topics", find_topics), ("create_post", create_post)):
+                row, result = measure(phase, lambda: fn(field))
+                row.update(concurrency=level, session=session, round=round_number)
+                rows.append(row)
+                # What app.py keeps in st.session_state
+                kept[phase] = result_store.offload(result, session_key)
+                pause()
+    kept_bytes = deep_size(kept)
+    result_store.release(session_key)
+    return rows, kept_bytes
+
+
+class RssSampler:
+    """Peak resident set size (from /proc/self/statm, Linux only) and thread count while running."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self.peak = 0
+        self.peak_threads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def rss(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self.page_size
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.rss())
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.baseline = self.peak = self.rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def run_level(level: int, rounds: int, think: float) -> tuple:
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    with RssSampler() as rss, ThreadPoolExecutor(max_workers=level) as pool:
+        sessions = list(pool.map(lambda session: run_session(level, session, rounds, think), range(level)))
+    elapsed = time.perf_counter() - start
+    if tracemalloc.is_tracing():
+        growth = tracemalloc.get_traced_memory()[1] - baseline
+    else:
+        growth = rss.peak - rss.baseline
+
+    rows = [row for session_rows, _ in sessions for row in session_rows]
+    summary = {"concurrency": level, "requests": len(rows), "errors": sum(1 for row in rows if not row["ok"]),
+               "elapsed_s": elapsed, "throughput_rps": len(rows) / elapsed}
+    for phase in ("find_topics", "create_post"):
+        latencies = [row["latency"] for row in rows if row["phase"] == phase]
+        for q in (50, 95, 99):
+            summary[f"{phase}_p{q}_s"] = percentile(latencies, q)
+    delays = [row["queue_delay"] for row in rows]
+    summary["queue_delay_mean_s"] = sum(delays) / len(delays)
+    summary["queue_delay_p95_s"] = percentile(delays, 95)
+    summary["peak_kb_per_session"] = max(0, growth) / level / 1024
+    summary["result_kb_per_session"] = sum(kept for _, kept in sessions) / level / 1024
+    return rows, summary
+
+
+def write_csv(path: str, rows: List[dict]):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test with stubbed backends")
+    parser.add_argument("--levels", default="1,5,10,25", help="comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=2, help="find-topics + create-post rounds per session")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time in seconds (exponential)")
+    parser.add_argument("--latency-scale", type=float, default=0.1, help="multiplier on the backend latency medians")
+    parser.add_argument("--llm-errors", type=float, default=0.02, help="stub LLM error rate")
+    parser.add_argument("--tool-errors", type=float, default=0.05, help="stub tool error rate")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--trace-memory", action="store_true", help="measure memory with tracemalloc (slow)")
+    parser.add_argument("--out", default="load_test_results", help="directory for requests.csv and summary.csv")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    install_stubs(BackendProfile(args.latency_scale, llm_error_rate=args.llm_errors, tool_error_rate=args.tool_errors))
+    if args.trace_memory:
+        tracemalloc.start()
+
+    all_rows, summaries = [], []
+    for level in (int(value) for value in args.levels.split(",")):
+        print(f"🚀 {level} concurrent sessions x {args.rounds} rounds...")
+        rows, summary = run_level(level, args.rounds, args.think)
+        all_rows.extend(rows)
+        summaries.append(summary)
+
+    os.makedirs(args.out, exist_ok=True)
+    write_csv(os.path.join(args.out, "requests.csv"), all_rows)
+    write_csv(os.path.join(args.out, "summary.csv"), summaries)
+
+    print(f"\n{'users':>6}{'req/s':>8}{'err':>5}{'find p50/p95 s':>17}{'post p50/p95 s':>17}"
+          f"{'queue mean/p95 s':>19}{'peak KB/user':>14}{'kept KB/user':>14}")
+    for s in summaries:
+        print(f"{s['concurrency']:>6}{s['throughput_rps']:>8.2f}{s['errors']:>5}"
+              f"{s['find_topics_p50_s']:>8.2f}/{s['find_topics_p95_s']:<8.2f}"
+              f"{s['create_post_p50_s']:>8.2f}/{s['create_post_p95_s']:<8.2f}"
+              f"{s['queue_delay_mean_s']:>9.3f}/{s['queue_delay_p95_s']:<9.3f}"
+              f"{s['peak_kb_per_session']:>14.0f}{s['result_kb_per_session']:>14.1f}")
+    print(f"\n✅ Wrote {len(all_rows)} request rows and {len(summaries)} level summaries to {args.out}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: multi_search fan-out under the fair-share tools pool
+
+One multi_search call runs every (query, tool) pair at once: 5 queries x
+Tavily and GNews is 10 searches. The research tools are stubbed as in
+benchmarks.load_test. Each mode runs --users concurrent sessions, each
+under its own tenant, calling multi_search once:
+
+- unscheduled: tools pool with no per-tenant cap
+- capped: the default pool, with the fan-out held to TENANT_MAX_CONCURRENCY
+- fan-out: the default pool, with the call's own fan-out allowed the whole pool
+
+Prints the per-call latency percentiles for each mode.
+
+Usage: python -m benchmarks.multi_search [--users 1,4] [--calls 5] [--latency-scale 1.0]
+"""
+import argparse
+import contextlib
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tools.multi_search_tool as multi_search_tool
+from benchmarks.load_test import BackendProfile, install_stubs, percentile
+from tools.fair_share import FairShareScheduler, _pool_settings, set_scheduler, tenant_scope
+from tools.gnews_tool import GNewsSearchTool
+from tools.multi_search_tool import MultiQuerySearchTool
+from tools.tavily_tool import TavilySearchTool
+
+QUERIES = ["AI agents in the enterprise", "agentic workflows", "LLM cost control",
+           "AI governance", "copilot adoption"]
+# Scheduler setting that never queues
+UNLIMITED = 10 ** 6
+FAN_OUT_SCOPE = multi_search_tool.fan_out_scope
+
+
+def session(user: int, calls: int) -> list:
+    tool = MultiQuerySearchTool([TavilySearchTool("stub"), GNewsSearchTool("stub")])
+    latencies = []
+    with tenant_scope(f"user-{user}"):
+        for _ in range(calls):
+            start = time.perf_counter()
+            tool._run(QUERIES)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run(mode: str, users: int, calls: int) -> list:
+    settings = _pool_settings("tools")
+    if mode == "unscheduled":
+        settings["tenant_limit"] = UNLIMITED
+    set_scheduler("tools", FairShareScheduler("tools", **settings))
+    # "capped" replays the tool without its fan-out scope
+    multi_search_tool.fan_out_scope = contextlib.nullcontext if mode == "capped" else FAN_OUT_SCOPE
+    try:
+        with ThreadPoolExecutor(users) as pool:
+            return [latency for user in pool.map(session, range(users), [calls] * users) for latency in user]
+    finally:
+        multi_search_tool.fan_out_scope = FAN_OUT_SCOPE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi_search latency with and without the fan-out bypass")
+    parser.add_argument("--users", default="1,4", help="comma-separated concurrent sessions")
+    parser.add_argument("--calls", type=int, default=5, help="multi_search calls per session")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier on the tool latency medians")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    install_stubs(BackendProfile(latency_scale=args.latency_scale, tool_error_rate=0.0))
+    settings = _pool_settings("tools")
+    print(f"🧪 multi_search: {len(QUERIES)} queries x 2 tools, tools pool {settings['capacity']}, "
+          f"tenant cap {settings['tenant_limit']}\n")
+    print(f"{'users':>5}  {'mode':<12}{'p50 s':>8}{'p95 s':>8}")
+    for users in (int(level) for level in args.users.split(",")):
+        for mode in ("unscheduled", "capped", "fan-out"):
+            latencies = run(mode, users, args.calls)
+            print(f"{users:>5}  {mode:<12}{percentile(latencies, 50):>8.2f}{percentile(latencies, 95):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: input tokens per post with and without cached prompt prefixes
+
+Runs the prompt-based agents against a stand-in chat model, once sending the
+system prompts inline and once through LocalPrefixCache, and prints the
+per-prefix token accounting.
+
+LocalPrefixCache still sends every prompt in full, so its numbers are
+simulated: the input tokens a provider cache would skip if it accepted each
+prefix.
+
+Usage: python -m benchmarks.prompt_prefix_savings [posts]
+"""
+import sys
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import StrOutputParser
+from agents.prompt_prefix import InlinePrefixBackend, LocalPrefixCache, prefix_usage
+from agents.topic_analyst import TopicAnalystAgent
+from agents.angle_generator import AngleGeneratorAgent
+from agents.drafting_agent import DraftingAgent
+from agents.critique_agent import CritiqueAgent
+from agents.formatting_agent import FormattingAgent
+
+SAMPLE_DRAFT = "AI is changing how hospitals triage patients. " * 30
+SAMPLE_RESEARCH = "Article: Hospitals adopt AI triage tools to cut ER wait times. " * 40
+
+
+def run_posts(backend, posts: int) -> dict:
+    """Run the prompt-based stages for the given number of posts and return the usage report."""
+    prefix_usage.reset()
+    fake_llm = FakeListChatModel(responses=[SAMPLE_DRAFT])
+    agents = [
+        TopicAnalystAgent("benchmark-key"),
+        AngleGeneratorAgent("benchmark-key"),
+        DraftingAgent("benchmark-key"),
+        CritiqueAgent("benchmark-key"),
+        FormattingAgent("benchmark-key")
+    ]
+    chains = {agent.prefix.name: agent.prefix.build_chain(fake_llm, backend) | StrOutputParser() for agent in agents}
+
+    for _ in range(posts):
+        chains["topic_analysis"].invoke({"news_data": SAMPLE_RESEARCH})
+        chains["angle_generation"].invoke({"topic": "AI triage in emergency rooms"})
+        chains["drafting"].invoke({"topic": "AI triage in emergency rooms", "angle": "How-To"})
+        chains["critique"].invoke({"draft": SAMPLE_DRAFT})
+        chains["formatting"].invoke({"draft": SAMPLE_DRAFT, "critique": SAMPLE_DRAFT})
+
+    return prefix_usage.report()
+
+
+def main():
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    inline = run_posts(InlinePrefixBackend(), posts)
+    cached = run_posts(LocalPrefixCache(), posts)
+
+    print(f"{'prefix':<18}{'static tok':>12}{'inline/post':>14}{'simulated/post':>16}")
+    for name, stats in inline["prefixes"].items():
+        simulated = (stats["tokens_sent"] - cached["prefixes"][name]["tokens_simulated"]) // posts
+        print(f"{name:<18}{stats['static_tokens']:>12}{stats['tokens_sent'] // posts:>14}{simulated:>16}")
+
+    simulated = (cached["tokens_sent"] - cached["tokens_simulated"]) // posts
+    print(f"\nInput tokens per post: {inline['tokens_sent'] // posts} inline -> {simulated} if every prefix were cached "
+          f"({cached['simulated_reduction']:.0%} simulated reduction)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark: per-stage latency for each stage-settings variant
+
+Runs CreationChain against the live Gemini API once per variant and prints
+the per-stage timings recorded in stage_metrics, so cheaper model tiers can
+be compared against the default for each stage.
+
+Usage: python -m benchmarks.stage_latency [runs] [variant ...]
+Requires GOOGLE_API_KEY and, for non-default variants, STAGE_CONFIG_FILE.
+"""
+import os
+import sys
+from dotenv import load_dotenv
+from config.settings import load_settings
+from chains.creation_chain import CreationChain
+from chains.stage_metrics import stage_metrics
+
+TOPIC = {
+    "title": "AI triage in emergency rooms",
+    "full_context": "Topic: AI triage in emergency rooms\nWhy it matters: Hospitals are cutting ER wait times with AI\nKey angle: What clinicians should demand from vendors"
+}
+
+
+def main():
+    load_dotenv()
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+    if not google_api_key:
+        print("❌ GOOGLE_API_KEY is not set")
+        return
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    variants = sys.argv[2:] or ["default"]
+
+    for variant in variants:
+        chain = CreationChain(google_api_key, settings=load_settings(variant=variant))
+        for _ in range(runs):
+            chain.invoke(TOPIC)
+
+    print(f"{'variant/stage':<36}{'model':<26}{'n':>4}{'mean s':>9}{'p50 s':>9}{'p95 s':>9}")
+    for key, stats in stage_metrics.summary().items():
+        print(f"{key:<36}{stats['model']:<26}{stats['count']:>4}"
+              f"{stats['mean']:>9.2f}{stats['p50']:>9.2f}{stats['p95']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: single-call vs map-reduce topic analysis as research payloads grow
+
+Builds synthetic research of increasing size from ResearchRecords and times
+TopicAnalystAgent's single prompt against analyze_map_reduce(). With
+GOOGLE_API_KEY set it calls Gemini; with --stub (or no key) it uses a stand-in
+model whose latency grows with prompt and output size. The stub's timings
+only show where the crossover falls under that cost model, so confirm the
+threshold against the live API.
+
+Usage: python -m benchmarks.topic_map_reduce [--stub] [size_chars ...]
+"""
+import os
+import sys
+import time
+from dotenv import load_dotenv
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from agents.llm_factory import set_llm_override
+from agents.topic_analyst import TopicAnalystAgent
+from config.settings import load_settings
+from tools.records import ResearchRecord, records_to_prompt
+
+ARTICLE = ("Regional hospitals piloting AI triage report shorter waits for low-acuity patients, "
+           "but clinicians warn about opaque scoring, liability and alert fatigue. ") * 8
+
+
+class SizedStubModel(BaseChatModel):
+    """Latency = first-token delay + prompt tokens at prefill speed + output tokens at decode speed."""
+
+    first_token: float = 0.5
+    prefill_tokens_per_s: float = 25000
+    decode_tokens_per_s: float = 150
+
+    @property
+    def _llm_type(self) -> str:
+        return "sized-stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt_tokens = sum(len(str(message.content)) for message in messages) / 4
+        output_tokens = 120 if "batch of research" in str(messages[-1].content) else 350
+        time.sleep(self.first_token + prompt_tokens / self.prefill_tokens_per_s + output_tokens / self.decode_tokens_per_s)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(
+            content="Topic 1: AI triage\nWhy it matters: Wait times\nKey angle: Vendor questions"
+        ))])
+
+
+def research_payload(chars: int) -> str:
+    records = []
+    while sum(len(record.text) + 60 for record in records) < chars:
+        i = len(records)
+        records.append(ResearchRecord("tavily_search", "web", title=f"Hospital AI triage report {i}",
+                                      url=f"https://example.com/triage/{i}", text=ARTICLE))
+    return records_to_prompt(records, text_limit=len(ARTICLE))
+
+
+def main():
+    load_dotenv()
+    args = [arg for arg in sys.argv[1:] if arg != "--stub"]
+    google_api_key = os.getenv("GOOGLE_API_KEY")
+    stub = "--stub" in sys.argv or not google_api_key
+    if stub:
+        set_llm_override(lambda stage, config: SizedStubModel())
+        print("🧪 Using the size-aware stub model (pass GOOGLE_API_KEY and omit --stub for live timings)")
+
+    sizes = [int(arg) for arg in args] or [24000, 60000, 150000, 400000, 1000000]
+    agent = TopicAnalystAgent(google_api_key or "benchmark-key", settings=load_settings())
+
+    print(f"\n{'research chars':>15}{'single s':>10}{'map-reduce s':>14}{'speedup':>9}")
+    for size in sizes:
+        research = research_payload(size)
+
+        start = time.perf_counter()
+        agent.chain.invoke({"news_data": research})
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        agent.analyze_map_reduce(research)
+        map_reduce = time.perf_counter() - start
+
+        print(f"{len(research):>15,}{single:>10.2f}{map_reduce:>14.2f}{single / map_reduce:>8.2f}x")
+
+    print(f"\nCurrent switch-over threshold: {agent.map_reduce_chars:,} chars "
+          f"(STAGE_TOPIC_ANALYSIS_MAP_REDUCE_CHARS)")
+
+
+if __name__ == "__main__":
+    main()
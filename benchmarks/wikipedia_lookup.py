@@ -0,0 +1,61 @@
+"""
+Benchmark: offline Wikipedia abstracts index vs. the live Wikipedia API
+
+Usage: python -m benchmarks.wikipedia_lookup <index.idx> [--live] [query ...]
+"""
+import resource
+import sys
+import time
+from tools.wikipedia_index import WikipediaAbstractIndex
+from tools.wikipedia_tool import WikipediaSearchTool
+
+DEFAULT_QUERIES = [
+    "machine learning", "artificial intelligence", "blockchain", "renewable energy",
+    "digital marketing", "supply chain", "cloud computing", "venture capital",
+    "electric vehicle", "telemedicine"
+]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def time_calls(fn, queries, repeat=1):
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            fn(query)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label, timings):
+    print(f"{label:<10} n={len(timings):<5} mean={sum(timings) / len(timings) * 1000:9.2f} ms"
+          f"  p50={percentile(timings, 50) * 1000:9.2f} ms  p95={percentile(timings, 95) * 1000:9.2f} ms")
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__)
+        return
+    index_path = args.pop(0)
+    live = "--live" in args
+    queries = [arg for arg in args if arg != "--live"] or DEFAULT_QUERIES
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    index = WikipediaAbstractIndex(index_path)
+    hits = sum(1 for query in queries if index.search(query))
+    report("offline", time_calls(index.search, queries, repeat=20))
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"offline hit rate: {hits}/{len(queries)}, peak RSS growth: {(rss_after - rss_before) / 1024:.1f} MB")
+
+    if live:
+        tool = WikipediaSearchTool(index_path=None)
+        report("live", time_calls(tool._search, queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,287 @@
 """
 Analysis Chain - Orchestrates MasterResearch and TopicAnalyst agents
 """
-from langchain_core.runnables import RunnableLambda
-from agents.master_research_agent import MasterResearchAgent
+import time
+from typing import AsyncIterator, Iterator, Optional
+from agents.master_research_agent import MAX_ITERATIONS, MasterResearchAgent
 from agents.topic_analyst import TopicAnalystAgent
+from config.settings import load_settings
+from chains.dag import Dag, Node, NodeResult
+from chains.latency_budget import LatencyPlanner, current_plan, latency_plan
+from chains.stage_metrics import stage_metrics
+from chains.topic_history import TopicRefresh, compact_topics, topic_history
+from tools.deadline import deadline_scope
+from tools.fair_share import current_tenant
+from tools.research_window import research_window
+from tools.circuit_breaker import breaker_states, is_error_result
+
+# Outputs of the research node
+RESEARCH_FIELDS = ("research_data", "sources", "tool_used", "reasoning", "breakers")
 
 
 class AnalysisChain:
     """Chain that links MasterResearchAgent and TopicAnalystAgent."""
     
-    def __init__(self, google_api_key: str, gnews_api_key: str, tavily_api_key: str):
-        self.master_researcher = MasterResearchAgent(google_api_key, gnews_api_key, tavily_api_key)
-        self.topic_analyst = TopicAnalystAgent(google_api_key)
+    def __init__(self, google_api_key: str, gnews_api_key: str, tavily_api_key: str, prefix_backend=None, settings=None,
+                 history=None, planner=None):
+        self.settings = settings or load_settings()
+        self.history = history if history is not None else topic_history
+        self.planner = planner or LatencyPlanner(variant=self.settings.variant)
+        self.master_researcher = MasterResearchAgent(google_api_key, gnews_api_key, tavily_api_key, self.settings)
+        self.topic_analyst = TopicAnalystAgent(google_api_key, prefix_backend, self.settings)
         
-        # Create the chain using LCEL
-        self.chain = (
-            RunnableLambda(self._research_news) |
-            RunnableLambda(self._analyze_topics)
-        )
+        # Research is never memoized: it is only worth running for what is new since the last run
+        self.dag = Dag([
+            Node("research", self._research_news, ["professional_field", "refresh"], RESEARCH_FIELDS,
+                 afunc=self._aresearch_news),
+            Node("topic_analysis", self._analyze_topics, ["research_data", "sources", "refresh"], ["topics"],
+                 afunc=self._aanalyze_topics)
+        ], name="analysis")
+    
+    def _timed(self, stage: str):
+        """Time a stage under the active settings variant."""
+        return stage_metrics.time(stage, self.settings.variant, self.settings.stage(stage).model_label)
     
-    def _research_news(self, input_data: dict) -> dict:
+    def _research_news(self, professional_field: str, refresh: TopicRefresh) -> dict:
         """Research information for the given professional field."""
-        professional_field = input_data["professional_field"]
-        research_result = self.master_researcher.research(professional_field)
-        
+        start = time.perf_counter()
+        with research_window(refresh.window), self._timed("research"):
+            research_result = self.master_researcher.research(professional_field, self._research_iterations())
+        self._record_iterations(start, research_result)
+        return self._research_outputs(research_result)
+    
+    async def _aresearch_news(self, professional_field: str, refresh: TopicRefresh) -> dict:
+        start = time.perf_counter()
+        with research_window(refresh.window), self._timed("research"):
+            research_result = await self.master_researcher.aresearch(professional_field, self._research_iterations())
+        self._record_iterations(start, research_result)
+        return self._research_outputs(research_result)
+    
+    @staticmethod
+    def _research_iterations():
+        plan = current_plan()
+        return plan.research_iterations if plan else None
+    
+    def _record_iterations(self, start: float, research_result: dict):
+        """Time per agent iteration, which the latency planner sizes research budgets with."""
+        iterations = research_result.get("iterations")
+        if iterations is not None:
+            stage_metrics.record("research_iteration", (time.perf_counter() - start) / max(1, iterations),
+                                 self.settings.variant, self.settings.stage("research").model_label)
+    
+    @staticmethod
+    def _research_outputs(research_result: dict) -> dict:
         return {
-            "professional_field": professional_field,
             "research_data": research_result["research_data"],
+            "sources": research_result.get("sources", ""),
             "tool_used": research_result["tool_used"],
-            "reasoning": research_result["reasoning"]
+            "reasoning": research_result["reasoning"],
+            "breakers": research_result.get("breakers", {})
         }
     
-    def _analyze_topics(self, input_data: dict) -> dict:
-        """Analyze research data to identify compelling topics."""
-        research_data = input_data["research_data"]
-        topics = self.topic_analyst.analyze(research_data)
+    def _analyze_topics(self, research_data: str, sources: str, refresh: TopicRefresh):
+        """Analyze research data to identify compelling topics, or update the last run's topics with new research."""
+        if self._nothing_new(research_data, refresh):
+            return NodeResult("skipped", topics=refresh.previous["topics"])
         
-        return {
-            "professional_field": input_data["professional_field"],
-            "research_data": research_data,
-            "tool_used": input_data["tool_used"],
-            "reasoning": input_data["reasoning"],
-            "topics": topics
+        with self._timed("topic_analysis"):
+            if refresh.incremental:
+                return self.topic_analyst.analyze_incremental(research_data, compact_topics(refresh.previous["topics"]),
+                                                              sources)
+            return self.topic_analyst.analyze(research_data, sources)
+    
+    async def _aanalyze_topics(self, research_data: str, sources: str, refresh: TopicRefresh):
+        if self._nothing_new(research_data, refresh):
+            return NodeResult("skipped", topics=refresh.previous["topics"])
+        
+        with self._timed("topic_analysis"):
+            if refresh.incremental:
+                return await self.topic_analyst.aanalyze_incremental(research_data,
+                                                                     compact_topics(refresh.previous["topics"]), sources)
+            return await self.topic_analyst.aanalyze(research_data, sources)
+    
+    @staticmethod
+    def _nothing_new(research_data: str, refresh: TopicRefresh) -> bool:
+        # An incremental run whose research found no new records (with or without URLs) keeps the last run's topics
+        return refresh.incremental and not refresh.window.kept and not is_error_result(research_data)
+    
+    def _topics_result(self, state: dict) -> dict:
+        refresh, topics = state["refresh"], state["topics"]
+        if not is_error_result(topics):
+            self.history.put(state["professional_field"], refresh.started_at, topics, refresh.urls(),
+                             tenant=current_tenant()[0])
+        
+        result = {
+            "professional_field": state["professional_field"],
+            "research_data": state["research_data"],
+            "tool_used": state["tool_used"],
+            "reasoning": state["reasoning"],
+            "breakers": state["breakers"],
+            "refresh": refresh.summary(),
+            "topics": topics,
+            "trace": state["dag_run"].report()
         }
+        plan = current_plan()
+        if plan:
+            result["budget"] = plan.report()
+        return result
+    
+    def _plan(self, deadline_seconds: Optional[float]):
+        """Split the budget between research and topic analysis; None without a deadline."""
+        if deadline_seconds is None:
+            return None
+        return self.planner.plan_analysis(deadline_seconds, MAX_ITERATIONS)
+    
+    @staticmethod
+    def _research_seconds(plan) -> Optional[float]:
+        # Only research reads the deadline scope; topic analysis keeps the rest of the budget
+        return plan.research_seconds if plan else None
+    
+    def _refresh(self, professional_field: str, incremental: bool) -> TopicRefresh:
+        """Start a run, building on this tenant's last run of the field when incremental and one is recent enough."""
+        previous = self.history.get(professional_field, tenant=current_tenant()[0]) if incremental else None
+        return TopicRefresh(professional_field, previous)
+    
+    def invoke(self, professional_field: str, deadline_seconds: float = 90, incremental: bool = False) -> dict:
+        """Execute the analysis chain within `deadline_seconds` end to end.
+        
+        The latency planner gives research the part of the budget that recent
+        topic analysis timings leave, and fewer agent iterations when they do
+        not fit; the plan's report is under "budget". Every research tool call
+        shares the research deadline.
+        
+        With `incremental`, research is limited to items published since the
+        field's last run and the analyst updates that run's topics.
+        """
+        try:
+            plan = self._plan(deadline_seconds)
+            with deadline_scope(self._research_seconds(plan)), latency_plan(plan):
+                return self._topics_result(self.dag.invoke({
+                    "professional_field": professional_field,
+                    "refresh": self._refresh(professional_field, incremental)
+                }))
+        except Exception as e:
+            return self._error_result(professional_field, e)
+    
+    async def ainvoke(self, professional_field: str, deadline_seconds: float = 90, incremental: bool = False) -> dict:
+        """Async version of invoke; the deadline and plan are scoped to this task's context."""
+        try:
+            plan = self._plan(deadline_seconds)
+            with deadline_scope(self._research_seconds(plan)), latency_plan(plan):
+                return self._topics_result(await self.dag.ainvoke({
+                    "professional_field": professional_field,
+                    "refresh": self._refresh(professional_field, incremental)
+                }))
+        except Exception as e:
+            return self._error_result(professional_field, e)
+    
+    def stream(self, professional_field: str, deadline_seconds: float = 90,
+               early_analysis_chars: int = 800, incremental: bool = False) -> Iterator[dict]:
+        """Stream research events as each tool returns, then the analysis result.
+        
+        Once at least `early_analysis_chars` of usable tool output has arrived,
+        research stops and topic analysis starts on the raw tool results instead
+        of waiting for the research agent's final write-up. Yields the research
+        agent's events, then {"event": "analysis_start", "early": bool} and
+        finally {"event": "done", "result": <same dict as invoke()>}.
+        """
+        try:
+            refresh = self._refresh(professional_field, incremental)
+            plan = self._plan(deadline_seconds)
+            with deadline_scope(self._research_seconds(plan)), research_window(refresh.window), latency_plan(plan):
+                start = time.perf_counter()
+                research_events = self.master_researcher.research_stream(professional_field, self._research_iterations())
+                observations = []
+                tools_used = []
+                research_result = None
+                
+                for event in research_events:
+                    if event["event"] == "research_done":
+                        research_result = event["result"]
+                        break
+                    yield event
+                    
+                    if self._collect(event, observations, tools_used, early_analysis_chars):
+                        research_events.close()
+                        break
+                
+                self._record_research(start)
+                early = research_result is None
+                if early:
+                    research_result = self._early_research(observations, tools_used)
+                
+                yield {"event": "analysis_start", "early": early}
+                # Research outputs are provided, so the DAG runs only topic analysis
+                state = {"professional_field": professional_field, "refresh": refresh,
+                         **self._research_outputs(research_result)}
+                yield {"event": "done", "result": self._topics_result(self.dag.invoke(state))}
+        except Exception as e:
+            yield {"event": "done", "result": self._error_result(professional_field, e)}
     
-    def invoke(self, professional_field: str) -> dict:
-        """Execute the analysis chain."""
+    async def astream(self, professional_field: str, deadline_seconds: float = 90,
+                      early_analysis_chars: int = 800, incremental: bool = False) -> AsyncIterator[dict]:
+        """Async version of stream, with the same events and early hand-off."""
         try:
-            result = self.chain.invoke({"professional_field": professional_field})
-            return result
+            refresh = self._refresh(professional_field, incremental)
+            plan = self._plan(deadline_seconds)
+            with deadline_scope(self._research_seconds(plan)), research_window(refresh.window), latency_plan(plan):
+                start = time.perf_counter()
+                research_events = self.master_researcher.aresearch_stream(professional_field, self._research_iterations())
+                observations = []
+                tools_used = []
+                research_result = None
+                
+                async for event in research_events:
+                    if event["event"] == "research_done":
+                        research_result = event["result"]
+                        break
+                    yield event
+                    
+                    if self._collect(event, observations, tools_used, early_analysis_chars):
+                        break
+                await research_events.aclose()
+                
+                self._record_research(start)
+                early = research_result is None
+                if early:
+                    research_result = self._early_research(observations, tools_used)
+                
+                yield {"event": "analysis_start", "early": early}
+                state = {"professional_field": professional_field, "refresh": refresh,
+                         **self._research_outputs(research_result)}
+                yield {"event": "done", "result": self._topics_result(await self.dag.ainvoke(state))}
         except Exception as e:
-            return {
-                "professional_field": professional_field,
-                "research_data": f"Error during research: {str(e)}",
-                "tool_used": "None",
-                "reasoning": f"Failed to complete research: {str(e)}",
-                "topics": f"Error during topic analysis: {str(e)}"
-            }
+            yield {"event": "done", "result": self._error_result(professional_field, e)}
+    
+    @staticmethod
+    def _collect(event: dict, observations: list, tools_used: list, early_analysis_chars: int) -> bool:
+        """Keep usable tool output; True once enough has arrived to start analysis early."""
+        if event["event"] != "tool_result" or is_error_result(event["observation"]):
+            return False
+        observations.append(event["observation"])
+        tools_used.append(event["tool"])
+        return sum(len(observation) for observation in observations) >= early_analysis_chars
+    
+    def _record_research(self, start: float):
+        stage_metrics.record("research", time.perf_counter() - start, self.settings.variant,
+                             self.settings.stage("research").model_label)
+    
+    @staticmethod
+    def _early_research(observations: list, tools_used: list) -> dict:
+        return {
+            "research_data": "\n\n".join(observations),
+            "sources": MasterResearchAgent.sources(observations),
+            "tool_used": ", ".join(dict.fromkeys(tools_used)),
+            "reasoning": f"Started topic analysis as soon as {len(observations)} tool result(s) arrived",
+            "breakers": breaker_states()
+        }
+    
+    @staticmethod
+    def _error_result(professional_field: str, e: Exception) -> dict:
+        return {
+            "professional_field": professional_field,
+            "research_data": f"Error during research: {str(e)}",
+            "tool_used": "None",
+            "reasoning": f"Failed to complete research: {str(e)}",
+            "topics": f"Error during topic analysis: {str(e)}"
+        }
@@ -0,0 +1,109 @@
+"""
+Stage Checkpoints - Content-addressed storage of successful stage outputs
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def checkpoint_key(stage: str, *inputs) -> str:
+    """SHA-256 of the stage name and its inputs; equal inputs always map to the same checkpoint."""
+    payload = json.dumps([stage, *inputs], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """LRU of stage outputs with a TTL, optionally mirrored to one JSON file per key on disk."""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """Saved output for the key, or None when missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+
+        entry = self._load(key)
+        with self._lock:
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                self._remember(key, entry)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def put(self, key: str, output: str):
+        """Save a successful stage output."""
+        entry = (time.time(), output)
+        with self._lock:
+            self._remember(key, entry)
+        if self.directory:
+            try:
+                tmp_path = self._path(key) + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"saved_at": entry[0], "output": output}, f)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                pass
+
+    def _remember(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[tuple]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                data = json.load(f)
+            return data["saved_at"], data["output"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class StageFailed(Exception):
+    """A stage returned an error; carries the outputs of the stages that finished before it."""
+
+    def __init__(self, stage: str, output: str, partial: dict):
+        super().__init__(f"{stage} failed: {output}")
+        self.stage = stage
+        self.output = output
+        self.partial = partial
+
+
+# Process-wide store so a rerun from a new chain instance can resume
+checkpoint_store = CheckpointStore(
+    ttl_seconds=float(os.getenv("CHECKPOINT_TTL_SECONDS", "3600")),
+    directory=os.getenv("CHECKPOINT_DIR") or None
+)
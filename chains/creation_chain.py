@@ -1,116 +1,445 @@
 """
 Creation Chain - Orchestrates content creation agents for LinkedIn posts
 """
-from langchain_core.runnables import RunnableLambda
+import time
+from functools import partial
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
 from agents.angle_generator import AngleGeneratorAgent
 from agents.drafting_agent import DraftingAgent
 from agents.critique_agent import CritiqueAgent
 from agents.formatting_agent import FormattingAgent
+from agents.prompt_prefix import estimate_tokens
+from config.settings import load_settings
+from chains.checkpoints import StageFailed, checkpoint_store
+from chains.dag import Dag, Node, NodeFailed, NodeResult
+from chains.latency_budget import LatencyPlanner, current_plan, latency_plan
+from chains.quality_gate import quality_gate_stats
+from chains.stage_metrics import stage_metrics
+from tools.circuit_breaker import is_error_result
+from tools.fair_share import current_tenant
+from tools.local_index import local_index
+from tools.records import ResearchRecord
+
+# Result field each stage fills in, in pipeline order
+STAGE_FIELDS = (
+    ("angle_generation", "angles"),
+    ("drafting", "draft"),
+    ("critique", "critique"),
+    ("formatting", "final_post")
+)
+
+# How DAG node statuses read in a result's "stages"
+STAGE_STATUS = {"memoized": "resumed"}
+
+# Stands in for the critique in results when the latency budget leaves no time for it; never sent to a model
+BUDGET_SKIPPED_CRITIQUE = "Critique skipped to stay within the time budget."
 
 
 class CreationChain:
-    """Chain that links content creation agents for LinkedIn post generation."""
+    """Chain that links content creation agents for LinkedIn post generation.
     
-    def __init__(self, google_api_key: str):
-        self.angle_generator = AngleGeneratorAgent(google_api_key)
-        self.drafting_agent = DraftingAgent(google_api_key)
-        self.critique_agent = CritiqueAgent(google_api_key)
-        self.formatting_agent = FormattingAgent(google_api_key)
-        
-        # Create the chain using LCEL
-        self.chain = (
-            RunnableLambda(self._generate_angles) |
-            RunnableLambda(self._draft_post) |
-            RunnableLambda(self._critique_draft) |
-            RunnableLambda(self._format_final_post)
-        )
-    
-    def _generate_angles(self, input_data: dict) -> dict:
-        """Generate content angles for the selected topic."""
-        topic = input_data["selected_topic"]
-        # Handle both string and dict topic formats
-        if isinstance(topic, dict):
-            topic_text = topic.get("full_context", topic.get("title", ""))
-        else:
-            topic_text = topic
-            
-        angles = self.angle_generator.generate_angles(topic_text)
-        
-        return {
-            "selected_topic": topic,
-            "angles": angles,
-            "selected_angle": input_data.get("selected_angle", "")
-        }
+    The stages are DAG nodes wired by the values they read. Drafting reads
+    only the topic and the chosen angle (the prompt never sees the generated
+    angles), so it runs alongside angle generation instead of after it.
+    """
     
-    def _draft_post(self, input_data: dict) -> dict:
-        """Draft the LinkedIn post based on topic and angle."""
-        topic = input_data["selected_topic"]
-        selected_angle = input_data["selected_angle"]
+    def __init__(self, google_api_key: str, prefix_backend=None, settings=None, checkpoints=None, planner=None):
+        self.settings = settings or load_settings()
+        self.planner = planner or LatencyPlanner(variant=self.settings.variant)
+        self.angle_generator = AngleGeneratorAgent(google_api_key, prefix_backend, self.settings)
+        self.drafting_agent = DraftingAgent(google_api_key, prefix_backend, self.settings)
+        self.critique_agent = CritiqueAgent(google_api_key, prefix_backend, self.settings)
+        self.formatting_agent = FormattingAgent(google_api_key, prefix_backend, self.settings)
         
+        # Each node's memo key covers its inputs, model and system prompt, so any change to them reruns it.
+        # Error outputs are never memoized; a rerun resumes at the failed stage.
+        self.dag = Dag([
+            Node("angle_generation", partial(self._call_stage, "angle_generation", self.angle_generator.generate_angles),
+                 ["topic_text"], ["angles"], memo=True, version=self._version("angle_generation", self.angle_generator),
+                 afunc=partial(self._acall_stage, "angle_generation", self.angle_generator.agenerate_angles)),
+            Node("drafting", partial(self._call_stage, "drafting", self.drafting_agent.draft_post),
+                 ["topic_text", "draft_angle"], ["draft"], memo=True, version=self._version("drafting", self.drafting_agent),
+                 afunc=partial(self._acall_stage, "drafting", self.drafting_agent.adraft_post)),
+            Node("critique", self._critique, ["draft"], ["critique"], afunc=self._acritique,
+                 memo=True, version=self._version("critique", self.critique_agent)),
+            Node("formatting", self._format, ["draft", "critique"], ["final_post"], afunc=self._aformat,
+                 memo=True, version=self._version("formatting", self.formatting_agent))
+        ], memo=checkpoints if checkpoints is not None else checkpoint_store, name="creation")
+        # Batched critique runs the stages before critique on their own
+        self.draft_dag = self.dag.select(["angle_generation", "drafting"])
+        # Batch critiques come from another model and prompt, so they are memoized under their own key
+        self.batch_critique = Node("critique_batch", self.critique_agent.critique_batch, ["draft"], ["critique"], memo=True,
+                                   version=(self.settings.stage("critique_batch").model_label,
+                                            self.critique_agent.batch_prefix.key))
+    
+    @property
+    def checkpoints(self):
+        return self.dag.memo
+    
+    @checkpoints.setter
+    def checkpoints(self, store):
+        self.dag.memo = store
+        self.draft_dag.memo = store
+    
+    def _version(self, stage: str, agent) -> tuple:
+        return self.settings.stage(stage).model_label, agent.prefix.key
+    
+    def _timed(self, stage: str):
+        """Time a stage under the active settings variant."""
+        return stage_metrics.time(stage, self.settings.variant, self.settings.stage(stage).model_label)
+    
+    def _call_stage(self, stage: str, fn, **inputs) -> str:
+        """Run an agent call as a node: timed, and raising StageFailed on an error output."""
+        with self._timed(stage):
+            output = fn(*inputs.values())
+        return self._checked(stage, output)
+    
+    async def _acall_stage(self, stage: str, afn, **inputs) -> str:
+        """Async version of _call_stage, awaiting the agent's async method."""
+        with self._timed(stage):
+            output = await afn(*inputs.values())
+        return self._checked(stage, output)
+    
+    @staticmethod
+    def _checked(stage: str, output: str) -> str:
+        if is_error_result(output):
+            raise StageFailed(stage, output, {})
+        return output
+    
+    @staticmethod
+    def _topic_text(topic) -> str:
         # Handle both string and dict topic formats
         if isinstance(topic, dict):
-            topic_text = topic.get("full_context", topic.get("title", ""))
-        else:
-            topic_text = topic
-        
+            return topic.get("full_context", topic.get("title", ""))
+        return topic
+    
+    @staticmethod
+    def _draft_angle(selected_angle: str) -> str:
         # If no specific angle is selected, use the first generated angle
-        if not selected_angle and input_data["angles"]:
-            # Extract first angle from the generated angles
-            angles_text = input_data["angles"]
-            # Simple extraction - in a real implementation, you might want more sophisticated parsing
-            selected_angle = "Use the first angle from the generated options"
-        
-        draft = self.drafting_agent.draft_post(topic_text, selected_angle)
-        
+        # Simple extraction - in a real implementation, you might want more sophisticated parsing
+        return selected_angle or "Use the first angle from the generated options"
+    
+    def _inputs(self, selected_topic, selected_angle: str = "") -> dict:
         return {
-            "selected_topic": topic,
-            "angles": input_data["angles"],
+            "selected_topic": selected_topic,
             "selected_angle": selected_angle,
-            "draft": draft
+            "topic_text": self._topic_text(selected_topic),
+            "draft_angle": self._draft_angle(selected_angle)
         }
     
-    def _critique_draft(self, input_data: dict) -> dict:
-        """Provide critique feedback on the draft."""
-        draft = input_data["draft"]
-        critique = self.critique_agent.critique(draft)
+    def _critique(self, draft: str):
+        """Provide critique feedback on the draft, unless the latency budget has no room for it."""
+        if not self._affordable("critique"):
+            return NodeResult("over_budget", critique=BUDGET_SKIPPED_CRITIQUE)
+        return self._call_stage("critique", self.critique_agent.critique, draft=draft)
+    
+    async def _acritique(self, draft: str):
+        if not self._affordable("critique"):
+            return NodeResult("over_budget", critique=BUDGET_SKIPPED_CRITIQUE)
+        return await self._acall_stage("critique", self.critique_agent.acritique, draft=draft)
+    
+    def _format(self, draft: str, critique: str):
+        """Create the final formatted post, or tidy the draft locally when the critique scores it highly
+        or the latency budget has no room for the rewrite."""
+        score, threshold, start = self._gate(critique)
+        if self._passes_gate(score, threshold) or not self._affordable("formatting"):
+            return self._tidy(draft, critique, score, threshold, start)
+        final_post = self._call_stage("formatting", self.formatting_agent.format_final_post, draft=draft,
+                                      critique=self._feedback(critique))
+        quality_gate_stats.record(self.settings.variant, score, threshold, False, time.perf_counter() - start)
+        return final_post
+    
+    async def _aformat(self, draft: str, critique: str):
+        score, threshold, start = self._gate(critique)
+        if self._passes_gate(score, threshold) or not self._affordable("formatting"):
+            return self._tidy(draft, critique, score, threshold, start)
+        final_post = await self._acall_stage("formatting", self.formatting_agent.aformat_final_post,
+                                             draft=draft, critique=self._feedback(critique))
+        quality_gate_stats.record(self.settings.variant, score, threshold, False, time.perf_counter() - start)
+        return final_post
+    
+    @staticmethod
+    def _feedback(critique: str) -> Optional[str]:
+        """Critique text for the formatter; None when the critique was skipped for the budget."""
+        return None if critique == BUDGET_SKIPPED_CRITIQUE else critique
+    
+    def _gate(self, critique: str) -> Tuple[Optional[int], Optional[float], float]:
+        score = self.critique_agent.parse_score(critique)
+        return score, self.settings.stage("formatting").skip_score, time.perf_counter()
+    
+    @staticmethod
+    def _passes_gate(score: Optional[int], threshold: Optional[float]) -> bool:
+        return score is not None and threshold is not None and score >= threshold
+    
+    @staticmethod
+    def _affordable(stage: str) -> bool:
+        """False when the request's latency plan skips this optional stage, up front or for lack of time left."""
+        plan = current_plan()
+        return plan is None or plan.allow(stage)
+    
+    def _tidy(self, draft: str, critique: str, score: Optional[int], threshold: Optional[float], start: float) -> NodeResult:
+        final_post = self.formatting_agent.tidy(draft, self.critique_agent.parse_hashtags(critique))
+        if not self._passes_gate(score, threshold):
+            return NodeResult("over_budget", final_post=final_post)
+        # Budget cuts are not gate decisions, so only gate skips are recorded
+        quality_gate_stats.record(self.settings.variant, score, threshold, True, time.perf_counter() - start)
+        return NodeResult("skipped", final_post=final_post)
+    
+    @staticmethod
+    def _stages(state: dict, run) -> dict:
+        """Per-stage status: ran, resumed (memoized), failed, skipped or over_budget; earlier runs' for provided stages."""
+        stages = dict(state.get("stages") or {})
+        for stage, _ in STAGE_FIELDS:
+            status = run.status(stage)
+            if status and status != "provided":
+                stages[stage] = STAGE_STATUS.get(status, status)
+        return stages
+    
+    def _final_result(self, state: dict) -> dict:
+        # Finished posts become searchable by local_search in the same tenant's later research
+        topic = state["selected_topic"]
+        title = topic.get("title", "") if isinstance(topic, dict) else str(topic)[:120]
+        local_index.add([ResearchRecord("linkedin_post", "post", title=title, text=state["final_post"], published=time.time())],
+                        tenant=current_tenant()[0])
         
-        return {
-            "selected_topic": input_data["selected_topic"],
-            "angles": input_data["angles"],
-            "selected_angle": input_data["selected_angle"],
-            "draft": draft,
-            "critique": critique
+        result = {
+            "selected_topic": state["selected_topic"],
+            "angles": state["angles"],
+            "selected_angle": state["draft_angle"],
+            "draft": state["draft"],
+            "critique": state["critique"],
+            "final_post": state["final_post"],
+            "critique_score": self.critique_agent.parse_score(state["critique"]),
+            "stages": self._stages(state, state["dag_run"]),
+            "trace": state["dag_run"].report()
         }
+        plan = current_plan()
+        if plan:
+            result["budget"] = plan.report()
+        return result
     
-    def _format_final_post(self, input_data: dict) -> dict:
-        """Create the final formatted post."""
-        draft = input_data["draft"]
-        critique = input_data["critique"]
-        final_post = self.formatting_agent.format_final_post(draft, critique)
+    def invoke(self, selected_topic, selected_angle: str = "", budget_seconds: Optional[float] = None,
+               regenerate: bool = False) -> dict:
+        """Execute the creation chain, resuming from checkpointed stages when possible.
         
-        return {
-            "selected_topic": input_data["selected_topic"],
-            "angles": input_data["angles"],
-            "selected_angle": input_data["selected_angle"],
-            "draft": draft,
-            "critique": critique,
-            "final_post": final_post
-        }
+        With `regenerate`, every stage runs again instead of reusing this
+        tenant's saved outputs for the same inputs. With `budget_seconds`, critique and the formatting rewrite are dropped
+        (up front from recent stage timings, or mid-run once time runs short)
+        so the post is ready within the budget; the result's "budget" reports
+        what was cut. The result's "trace" has each stage's timing and the
+        run's critical path.
+        """
+        try:
+            with latency_plan(self._plan(budget_seconds)):
+                return self._final_result(self.dag.invoke(self._inputs(selected_topic, selected_angle),
+                                                          refresh=self._refresh(regenerate)))
+        except NodeFailed as e:
+            return self._failed_result(e)
+        except Exception as e:
+            return self._error_result(selected_topic, selected_angle, e)
     
-    def invoke(self, selected_topic, selected_angle: str = "") -> dict:
-        """Execute the creation chain."""
+    async def ainvoke(self, selected_topic, selected_angle: str = "", budget_seconds: Optional[float] = None,
+                      regenerate: bool = False) -> dict:
+        """Async version of invoke; every agent call is awaited on the event loop."""
         try:
-            result = self.chain.invoke({
-                "selected_topic": selected_topic,
-                "selected_angle": selected_angle
-            })
-            return result
+            with latency_plan(self._plan(budget_seconds)):
+                return self._final_result(await self.dag.ainvoke(self._inputs(selected_topic, selected_angle),
+                                                                 refresh=self._refresh(regenerate)))
+        except NodeFailed as e:
+            return self._failed_result(e)
         except Exception as e:
-            return {
-                "selected_topic": selected_topic,
-                "selected_angle": selected_angle,
-                "angles": f"Error generating angles: {str(e)}",
-                "draft": f"Error drafting post: {str(e)}",
-                "critique": f"Error during critique: {str(e)}",
-                "final_post": f"Error creating final post: {str(e)}"
-            }
+            return self._error_result(selected_topic, selected_angle, e)
+    
+    def batch_as_completed(self, selected_topics: list, max_concurrency: int = 3,
+                           batch_critique: bool = False) -> Iterator[Tuple[int, dict]]:
+        """Create a post for every topic concurrently, yielding (index, result) as each one finishes.
+        
+        With batch_critique, finished drafts are gathered into packs of about
+        max_concurrency drafts; each pack is critiqued in one packed call and
+        formatted, and its posts are yielded while later drafts are written.
+        """
+        if batch_critique:
+            yield from self._batch_staged(selected_topics, max_concurrency)
+            return
+        
+        inputs = [self._inputs(topic) for topic in selected_topics]
+        for index, result in self.dag.batch_as_completed(
+            inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True
+        ):
+            yield index, self._batch_item(selected_topics, index, result)
+    
+    async def abatch_as_completed(self, selected_topics: list, max_concurrency: int = 3,
+                                  batch_critique: bool = False) -> AsyncIterator[Tuple[int, dict]]:
+        """Async version of batch_as_completed."""
+        if batch_critique:
+            async for index, result in self._abatch_staged(selected_topics, max_concurrency):
+                yield index, result
+            return
+        
+        inputs = [self._inputs(topic) for topic in selected_topics]
+        async for index, result in self.dag.abatch_as_completed(
+            inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True
+        ):
+            yield index, self._batch_item(selected_topics, index, result)
+    
+    def _batch_staged(self, selected_topics: list, max_concurrency: int) -> Iterator[Tuple[int, dict]]:
+        config = {"max_concurrency": max_concurrency}
+        inputs = [self._inputs(topic) for topic in selected_topics]
+        drafted = {}
+        # Drafting keeps running on the batch's threads while a pack is critiqued and formatted
+        for index, result in self.draft_dag.batch_as_completed(inputs, config=config, return_exceptions=True):
+            if isinstance(result, Exception):
+                yield index, self._batch_item(selected_topics, index, result)
+                continue
+            drafted[index] = result
+            if self._pack_full(drafted, max_concurrency):
+                yield from self._finish_pack(selected_topics, drafted, config)
+                drafted = {}
+        if drafted:
+            yield from self._finish_pack(selected_topics, drafted, config)
+    
+    def _finish_pack(self, selected_topics: list, drafted: dict, config: dict) -> Iterator[Tuple[int, dict]]:
+        pending = self._pending_critiques(drafted)
+        if pending:
+            with self._timed("critique_batch"):
+                critiques = self.critique_agent.critique_batch([drafted[index]["draft"] for index in pending])
+        else:
+            critiques = []
+        yield from self._critiqued(drafted, pending, critiques)
+        
+        # Draft and critique are in each state already, so only formatting runs
+        order = list(drafted)
+        for position, result in self.dag.batch_as_completed(
+            [drafted[index] for index in order], config=config, return_exceptions=True
+        ):
+            yield order[position], self._batch_item(selected_topics, order[position], result)
+    
+    async def _abatch_staged(self, selected_topics: list, max_concurrency: int) -> AsyncIterator[Tuple[int, dict]]:
+        config = {"max_concurrency": max_concurrency}
+        inputs = [self._inputs(topic) for topic in selected_topics]
+        drafted = {}
+        async for index, result in self.draft_dag.abatch_as_completed(inputs, config=config, return_exceptions=True):
+            if isinstance(result, Exception):
+                yield index, self._batch_item(selected_topics, index, result)
+                continue
+            drafted[index] = result
+            if self._pack_full(drafted, max_concurrency):
+                async for item in self._afinish_pack(selected_topics, drafted, config):
+                    yield item
+                drafted = {}
+        if drafted:
+            async for item in self._afinish_pack(selected_topics, drafted, config):
+                yield item
+    
+    async def _afinish_pack(self, selected_topics: list, drafted: dict, config: dict) -> AsyncIterator[Tuple[int, dict]]:
+        pending = self._pending_critiques(drafted)
+        if pending:
+            with self._timed("critique_batch"):
+                critiques = await self.critique_agent.acritique_batch([drafted[index]["draft"] for index in pending])
+        else:
+            critiques = []
+        for item in self._critiqued(drafted, pending, critiques):
+            yield item
+        
+        order = list(drafted)
+        async for position, result in self.dag.abatch_as_completed(
+            [drafted[index] for index in order], config=config, return_exceptions=True
+        ):
+            yield order[position], self._batch_item(selected_topics, order[position], result)
+    
+    def _pack_full(self, drafted: dict, max_concurrency: int) -> bool:
+        """Critique a pack once it holds about one wave of drafts, so posts finish while others are still drafting."""
+        size = min(self.critique_agent.batch_max_drafts, max(2, max_concurrency))
+        tokens = sum(estimate_tokens(state["draft"]) for state in drafted.values())
+        return len(drafted) >= size or tokens >= self.critique_agent.batch_input_tokens
+    
+    def _pending_critiques(self, drafted: dict) -> List[int]:
+        """Drafts still needing a critique; memoized single or batch critiques are filled in."""
+        pending = []
+        for index, state in drafted.items():
+            state["stages"] = self._stages(state, state["dag_run"])
+            memoized = self.dag.lookup("critique", state) or self._batch_lookup(state)
+            if memoized is None:
+                pending.append(index)
+            else:
+                state.update(memoized)
+                state["stages"]["critique"] = "resumed"
+        return pending
+    
+    def _batch_lookup(self, state: dict) -> Optional[dict]:
+        if self.checkpoints is None:
+            return None
+        critique = self.checkpoints.get(self.batch_critique.key(state))
+        return self.batch_critique.wrap(critique) if critique is not None else None
+    
+    def _critiqued(self, drafted: dict, pending: List[int], critiques: List[str]) -> List[Tuple[int, dict]]:
+        """Memoize the batch's critiques under the batch key; failed ones leave `drafted` as partial results."""
+        failed = []
+        for index, critique in zip(pending, critiques):
+            state = drafted[index]
+            if is_error_result(critique):
+                state["stages"]["critique"] = "failed"
+                failed.append((index, self._partial_result(drafted.pop(index), "critique", critique)))
+                continue
+            state["critique"] = critique
+            state["stages"]["critique"] = "ran"
+            if self.checkpoints is not None:
+                self.checkpoints.put(self.batch_critique.key(state), critique)
+        return failed
+    
+    def _batch_item(self, selected_topics: list, index: int, result) -> dict:
+        if isinstance(result, NodeFailed):
+            return self._failed_result(result)
+        if isinstance(result, Exception):
+            return self._error_result(selected_topics[index], "", result)
+        return self._final_result(result)
+    
+    def batch(self, selected_topics: list, max_concurrency: int = 3, batch_critique: bool = False) -> List[dict]:
+        """Create a post for every topic concurrently; results are in input order."""
+        results = [None] * len(selected_topics)
+        for index, result in self.batch_as_completed(selected_topics, max_concurrency, batch_critique):
+            results[index] = result
+        return results
+    
+    def _refresh(self, regenerate: bool) -> tuple:
+        """Stages that skip the memo: all of them when regenerating."""
+        return tuple(self.dag.nodes) if regenerate else ()
+    
+    def _plan(self, budget_seconds: Optional[float]):
+        return self.planner.plan_creation(budget_seconds) if budget_seconds is not None else None
+    
+    def _failed_result(self, failure: NodeFailed) -> dict:
+        """Partial result for a stage that returned an error; the full error result for anything else."""
+        state = failure.state
+        if not isinstance(failure.error, StageFailed):
+            return self._error_result(state["selected_topic"], state["selected_angle"], failure.error)
+        state["stages"] = self._stages(state, failure.run)
+        return self._partial_result(state, failure.error.stage, failure.error.output)
+    
+    @staticmethod
+    def _partial_result(state: dict, failed_stage: str, output: str) -> dict:
+        """Outputs of the stages that finished, the failed stage's error, and skip notes for the rest."""
+        result = {
+            "selected_topic": state["selected_topic"],
+            "selected_angle": state.get("draft_angle", state.get("selected_angle", "")),
+            "stages": state.get("stages", {})
+        }
+        for stage, field in STAGE_FIELDS:
+            if stage == failed_stage:
+                result[field] = output
+            elif field in state:
+                result[field] = state[field]
+            else:
+                result[field] = f"Error: skipped because {failed_stage} failed"
+        return result
+    
+    def _error_result(self, selected_topic, selected_angle: str, e: Exception) -> dict:
+        """Result dict with every field replaced by the error."""
+        return {
+            "selected_topic": selected_topic,
+            "selected_angle": selected_angle,
+            "angles": f"Error generating angles: {str(e)}",
+            "draft": f"Error drafting post: {str(e)}",
+            "critique": f"Error during critique: {str(e)}",
+            "final_post": f"Error creating final post: {str(e)}"
+        }
@@ -0,0 +1,298 @@
+"""
+DAG - Stages declared by their inputs and outputs, run as soon as their inputs exist
+
+A Dag is an LCEL Runnable: invoke() takes a state dict and returns it with
+every node's outputs added, so batch(), batch_as_completed() and the async
+variants work as for any other chain.
+
+- Independent nodes run concurrently: on a shared thread pool under invoke(),
+  as tasks under ainvoke(). A lone ready node runs inline.
+- A node whose outputs are already in the input state is not run, so passing
+  an earlier result back in re-executes only what is missing.
+- Memoized nodes store their outputs in a CheckpointStore under a hash of the
+  node name, the current tenant, its version and its input values, so one
+  tenant never reads another's outputs. `refresh` names nodes that skip the
+  memo for one run (their new outputs are still saved).
+- Every run is traced; DagRun.report() includes the critical path and a
+  text timeline of the run.
+"""
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from langchain_core.runnables import Runnable
+
+from chains.checkpoints import checkpoint_key
+from tools.fair_share import current_tenant
+
+# Shared by every Dag; nodes mostly wait on model and API calls
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="dag")
+
+
+class NodeResult(dict):
+    """Outputs of a node that took a shortcut (e.g. "skipped"); traced under that status and never memoized."""
+
+    def __init__(self, status: str, **outputs):
+        super().__init__(outputs)
+        self.status = status
+
+
+class Node:
+    """One stage: func(**inputs) returns its outputs, a dict when it declares several or the bare value when one."""
+
+    def __init__(self, name: str, func: Callable, inputs: Sequence[str], outputs: Sequence[str],
+                 afunc: Optional[Callable] = None, memo: bool = False, version: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.afunc = afunc
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.memo = memo
+        # Extra key parts, e.g. model and prompt hash, so changing them misses the memo
+        self.version = tuple(version)
+
+    def key(self, state: dict) -> str:
+        # Memoized outputs are private to the tenant whose request produced them
+        return checkpoint_key(self.name, current_tenant()[0], *self.version, *(state[name] for name in self.inputs))
+
+    def wrap(self, value) -> dict:
+        """Outputs as a dict; a single-output node may return (and memoize) the bare value."""
+        if isinstance(value, NodeResult) or len(self.outputs) > 1:
+            return value
+        return {self.outputs[0]: value}
+
+
+class NodeFailed(Exception):
+    """A node raised; carries the state with every output that finished, and the run trace."""
+
+    def __init__(self, node: str, error: Exception, state: dict, run: "DagRun"):
+        super().__init__(f"{node} failed: {error}")
+        self.node = node
+        self.error = error
+        self.state = state
+        self.run = run
+
+
+class DagRun:
+    """Start, end and status of every node in one run."""
+
+    def __init__(self, dag: "Dag"):
+        self.dag = dag
+        self.started = time.perf_counter()
+        self.nodes: Dict[str, dict] = {}
+
+    def begin(self, name: str):
+        self.nodes[name] = {"status": "running", "start": time.perf_counter() - self.started, "end": None}
+
+    def finish(self, name: str, status: str):
+        entry = self.nodes.setdefault(name, {"start": time.perf_counter() - self.started})
+        entry["status"] = status
+        entry["end"] = time.perf_counter() - self.started
+
+    def provided(self, name: str):
+        self.nodes[name] = {"status": "provided", "start": 0.0, "end": 0.0}
+
+    def status(self, name: str) -> Optional[str]:
+        entry = self.nodes.get(name)
+        return entry["status"] if entry else None
+
+    def critical_path(self) -> List[str]:
+        """Nodes on the longest chain: from the last node to finish, back through the input that arrived last."""
+        finished = {name: entry for name, entry in self.nodes.items()
+                    if entry.get("end") is not None and entry["status"] != "provided"}
+        if not finished:
+            return []
+        path = [max(finished, key=lambda name: finished[name]["end"])]
+        while True:
+            parents = [parent for parent in self.dag.parents(path[-1]) if parent in finished]
+            if not parents:
+                break
+            path.append(max(parents, key=lambda name: finished[name]["end"]))
+        return path[::-1]
+
+    def timeline(self, width: int = 40) -> str:
+        """One bar per node over the run's wall time; critical-path nodes are marked with *."""
+        total = max((entry["end"] or 0.0 for entry in self.nodes.values()), default=0.0) or 1e-9
+        critical = set(self.critical_path())
+        label = max((len(name) for name in self.nodes), default=4)
+        lines = []
+        for name, entry in sorted(self.nodes.items(), key=lambda item: (item[1]["start"], item[1]["end"] or 0.0)):
+            end = entry["end"] or entry["start"]
+            first = int(entry["start"] / total * width)
+            bar = "#" * max(1, int(end / total * width) - first) if entry["status"] != "provided" else ""
+            mark = "*" if name in critical else " "
+            lines.append(f"{mark} {name:<{label}} |{' ' * first}{bar:<{width - first}}| "
+                         f"{end - entry['start']:6.2f}s {entry['status']}")
+        return "\n".join(lines)
+
+    def report(self) -> dict:
+        path = self.critical_path()
+        return {
+            "nodes": {name: {"status": entry["status"], "start": round(entry["start"], 3),
+                             "seconds": round((entry["end"] or entry["start"]) - entry["start"], 3)}
+                      for name, entry in self.nodes.items()},
+            "critical_path": path,
+            "critical_seconds": round(sum((self.nodes[name]["end"] or 0.0) - self.nodes[name]["start"] for name in path), 3),
+            "wall_seconds": round(time.perf_counter() - self.started, 3),
+            "timeline": self.timeline()
+        }
+
+
+class Dag(Runnable[dict, dict]):
+    """A set of nodes wired together by the names of their inputs and outputs."""
+
+    def __init__(self, nodes: Iterable[Node], memo=None, name: str = "dag"):
+        self.nodes: Dict[str, Node] = {node.name: node for node in nodes}
+        self.memo = memo
+        self.name = name
+        self._producers = {output: node.name for node in self.nodes.values() for output in node.outputs}
+
+    def parents(self, name: str) -> List[str]:
+        return [self._producers[i] for i in self.nodes[name].inputs if i in self._producers]
+
+    def select(self, targets: Iterable[str]) -> "Dag":
+        """The sub-DAG that produces the given nodes' outputs: those nodes and everything upstream of them."""
+        keep, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in keep:
+                keep.add(name)
+                stack.extend(self.parents(name))
+        return Dag([node for name, node in self.nodes.items() if name in keep], self.memo, self.name)
+
+    def lookup(self, name: str, state: dict) -> Optional[dict]:
+        """Memoized outputs of a node for these inputs, or None."""
+        node = self.nodes[name]
+        if not (node.memo and self.memo is not None):
+            return None
+        value = self.memo.get(node.key(state))
+        return node.wrap(value) if value is not None else None
+
+    def remember(self, name: str, state: dict, outputs: dict):
+        """Memoize a node's outputs, e.g. ones computed outside the DAG."""
+        node = self.nodes[name]
+        if node.memo and self.memo is not None:
+            self.memo.put(node.key(state), outputs[node.outputs[0]] if len(node.outputs) == 1 else outputs)
+
+    def _pending(self, state: dict, run: DagRun) -> List[str]:
+        pending = []
+        for name, node in self.nodes.items():
+            if all(output in state for output in node.outputs):
+                run.provided(name)
+            else:
+                pending.append(name)
+        return pending
+
+    def _ready(self, pending: List[str], state: dict) -> List[str]:
+        return [name for name in pending if all(i in state for i in self.nodes[name].inputs)]
+
+    def _start(self, name: str, state: dict, run: DagRun, refresh: frozenset) -> Optional[dict]:
+        """Begin a node; returns its memoized outputs if there are any and it is not being refreshed."""
+        run.begin(name)
+        return self.lookup(name, state) if name not in refresh else None
+
+    def _complete(self, name: str, state: dict, run: DagRun, outputs: dict, memoized: bool):
+        if not memoized:
+            outputs = self.nodes[name].wrap(outputs)
+        status = "memoized" if memoized else getattr(outputs, "status", "ran")
+        if status == "ran":
+            self.remember(name, state, outputs)
+        state.update(outputs)
+        run.finish(name, status)
+
+    def _call(self, name: str, inputs: dict):
+        return self.nodes[name].func(**inputs)
+
+    def invoke(self, input: dict, config=None, refresh: Iterable[str] = (), **kwargs) -> dict:
+        """Run every node whose outputs are missing; returns the state with all outputs and "dag_run".
+
+        Nodes named in `refresh` run even when their outputs are memoized.
+        """
+        state, run, refresh = dict(input), DagRun(self), frozenset(refresh)
+        pending = self._pending(state, run)
+        futures, failure = {}, None
+
+        while pending or futures:
+            ready = self._ready(pending, state) if failure is None else []
+            for name in ready:
+                pending.remove(name)
+                memoized = self._start(name, state, run, refresh)
+                if memoized is not None:
+                    self._complete(name, state, run, memoized, True)
+                    continue
+                inputs = {i: state[i] for i in self.nodes[name].inputs}
+                if len(ready) == 1 and not futures:
+                    try:
+                        self._complete(name, state, run, self._call(name, inputs), False)
+                    except Exception as e:
+                        run.finish(name, "failed")
+                        failure = failure or (name, e)
+                else:
+                    futures[_executor.submit(copy_context().run, self._call, name, inputs)] = name
+            if ready and not futures:
+                continue
+            if not futures:
+                if failure is None and pending:
+                    raise ValueError(f"{self.name}: no inputs for {', '.join(pending)}")
+                break
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures.pop(future)
+                try:
+                    self._complete(name, state, run, future.result(), False)
+                except Exception as e:
+                    run.finish(name, "failed")
+                    failure = failure or (name, e)
+
+        if failure is not None:
+            raise NodeFailed(failure[0], failure[1], state, run)
+        state["dag_run"] = run
+        return state
+
+    async def ainvoke(self, input: dict, config=None, refresh: Iterable[str] = (), **kwargs) -> dict:
+        """Async version of invoke; nodes with an afunc are awaited, the others run on a worker thread."""
+        state, run, refresh = dict(input), DagRun(self), frozenset(refresh)
+        pending = self._pending(state, run)
+        tasks, failure = {}, None
+
+        while pending or tasks:
+            ready = self._ready(pending, state) if failure is None else []
+            for name in ready:
+                pending.remove(name)
+                memoized = self._start(name, state, run, refresh)
+                if memoized is not None:
+                    self._complete(name, state, run, memoized, True)
+                    continue
+                tasks[asyncio.ensure_future(self._acall(name, {i: state[i] for i in self.nodes[name].inputs}))] = name
+            if not tasks:
+                if ready:
+                    continue
+                if failure is None and pending:
+                    raise ValueError(f"{self.name}: no inputs for {', '.join(pending)}")
+                break
+
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = tasks.pop(task)
+                try:
+                    self._complete(name, state, run, task.result(), False)
+                except Exception as e:
+                    run.finish(name, "failed")
+                    failure = failure or (name, e)
+
+        if failure is not None:
+            raise NodeFailed(failure[0], failure[1], state, run)
+        state["dag_run"] = run
+        return state
+
+    async def _acall(self, name: str, inputs: dict):
+        node = self.nodes[name]
+        if node.afunc is not None:
+            return await node.afunc(**inputs)
+        return await asyncio.to_thread(node.func, **inputs)
+
+    def __repr__(self) -> str:
+        return f"Dag({self.name}: {', '.join(self.nodes)})"
@@ -0,0 +1,168 @@
+"""
+Latency Budget - Plans which optional stages a request can afford, from recent stage timings
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+
+from chains.stage_metrics import stage_metrics
+
+# Seconds assumed for a stage until it has recorded timings of its own
+DEFAULT_SECONDS = {
+    "research_iteration": 12.0,
+    "topic_analysis": 20.0,
+    "angle_generation": 8.0,
+    "drafting": 10.0,
+    "critique": 8.0,
+    "formatting": 8.0
+}
+
+CREATION_STAGES = ("angle_generation", "drafting", "critique", "formatting")
+# Creation stages that run side by side; they take as long as the slower one
+CONCURRENT_CREATION_STAGES = ("angle_generation", "drafting")
+# Optional creation stages, least valuable first: formatting falls back to a local tidy,
+# and critique only feeds formatting and the score gate
+OPTIONAL_CREATION_STAGES = ("formatting", "critique")
+
+
+class LatencyPlan:
+    """One request's time budget, the stage estimates it was planned with, and every degradation applied.
+
+    Stages planned away up front are in `skipped`. `allow()` makes the same
+    call mid-run against the time actually left, using the more pessimistic
+    `guards` estimates, since by then only one stage's tail is at stake.
+    """
+
+    def __init__(self, budget_seconds: float, estimates: Dict[str, float], guards: Optional[Dict[str, float]] = None):
+        self.budget_seconds = budget_seconds
+        self.estimates = estimates
+        self.guards = guards or estimates
+        self.started = time.perf_counter()
+        self.skipped = set()
+        self.research_iterations: Optional[int] = None
+        self.research_seconds: Optional[float] = None
+        self.degradations: List[dict] = []
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def remaining(self) -> float:
+        return max(0.0, self.budget_seconds - self.elapsed())
+
+    def needs(self, stages: Iterable[str], guard: bool = False) -> float:
+        estimates = self.guards if guard else self.estimates
+        return sum(estimates.get(stage, 0.0) for stage in stages)
+
+    def degrade(self, stage: str, action: str, reason: str, when: str = "planned"):
+        with self._lock:
+            self.degradations.append({"stage": stage, "action": action, "reason": reason, "when": when})
+
+    def skip(self, stage: str, reason: str, when: str = "planned"):
+        self.skipped.add(stage)
+        self.degrade(stage, "skipped", reason, when)
+
+    def allow(self, stage: str) -> bool:
+        """Whether the optional `stage` should run now.
+
+        False if the plan skipped it up front, or if its estimated time (with
+        the guard margin) no longer fits in the time left; that mid-run skip
+        is recorded as a degradation. Only the stage's own estimate is
+        checked: no time is reserved for the stages after it.
+        """
+        if stage in self.skipped:
+            return False
+        remaining, needed = self.remaining(), self.needs((stage,), guard=True)
+        if needed <= remaining:
+            return True
+        self.skip(stage, f"{remaining:.1f}s left, needs ~{needed:.1f}s", when="mid-run")
+        return False
+
+    def report(self) -> dict:
+        """Budget, time used, whether the deadline was met, and the degradations applied."""
+        elapsed = self.elapsed()
+        return {
+            "budget_seconds": self.budget_seconds,
+            "elapsed_seconds": round(elapsed, 2),
+            "met": elapsed <= self.budget_seconds,
+            "degradations": list(self.degradations),
+            "estimates": {stage: round(seconds, 2) for stage, seconds in self.estimates.items()}
+        }
+
+
+class LatencyPlanner:
+    """Builds LatencyPlans from each stage's recent latency.
+
+    Up-front plans add up `plan_quantile` latencies: summing per-stage p90s
+    would assume every stage hits its tail at once and cut far too often.
+    Mid-run checks use `guard_quantile`.
+    """
+
+    def __init__(self, metrics=None, plan_quantile: float = 50, guard_quantile: float = 90,
+                 variant: Optional[str] = None, defaults: Optional[Dict[str, float]] = None):
+        self.metrics = metrics if metrics is not None else stage_metrics
+        self.plan_quantile = plan_quantile
+        self.guard_quantile = guard_quantile
+        self.variant = variant
+        self.defaults = defaults or DEFAULT_SECONDS
+
+    def estimate(self, stage: str, quantile: Optional[float] = None) -> float:
+        """Recent latency percentile of the stage (plan_quantile by default), or its default before any samples exist."""
+        seconds = self.metrics.percentile(stage, quantile if quantile is not None else self.plan_quantile, self.variant)
+        return seconds if seconds is not None else self.defaults.get(stage, 0.0)
+
+    def _estimates(self, stages: Iterable[str]) -> tuple:
+        stages = tuple(stages)
+        return ({stage: self.estimate(stage) for stage in stages},
+                {stage: self.estimate(stage, self.guard_quantile) for stage in stages})
+
+    def plan_creation(self, budget_seconds: float) -> LatencyPlan:
+        """Plan (angles | draft) -> critique -> format, dropping optional stages until the rest fit."""
+        plan = LatencyPlan(budget_seconds, *self._estimates(CREATION_STAGES))
+        first = max(plan.estimates[stage] for stage in CONCURRENT_CREATION_STAGES)
+        kept = list(OPTIONAL_CREATION_STAGES)
+        for stage in OPTIONAL_CREATION_STAGES:
+            needed = first + plan.needs(kept)
+            if needed <= budget_seconds:
+                break
+            kept.remove(stage)
+            plan.skip(stage, f"planned stages need ~{needed:.1f}s of a {budget_seconds:.1f}s budget")
+        return plan
+
+    def plan_analysis(self, budget_seconds: float, max_iterations: int) -> LatencyPlan:
+        """Plan research then topic analysis: research gets what analysis leaves, in as many agent iterations as fit."""
+        plan = LatencyPlan(budget_seconds, *self._estimates(("research_iteration", "topic_analysis")))
+        iteration = plan.estimates["research_iteration"]
+        # Analysis must run after research, so its tail is reserved; research always gets
+        # at least one iteration, even if that eats into the reserve
+        plan.research_seconds = max(budget_seconds - plan.guards["topic_analysis"], min(budget_seconds, iteration))
+        fitting = int(plan.research_seconds // iteration) if iteration else max_iterations
+        plan.research_iterations = max(1, min(max_iterations, fitting))
+        if plan.research_iterations < max_iterations:
+            plan.degrade("research", f"shortened to {plan.research_iterations} of {max_iterations} agent iterations",
+                         f"~{plan.research_seconds:.1f}s left for research after topic analysis")
+        return plan
+
+
+_current_plan: ContextVar[Optional[LatencyPlan]] = ContextVar("latency_plan", default=None)
+
+
+@contextmanager
+def latency_plan(plan: Optional[LatencyPlan]):
+    """Apply the plan to every stage run inside the block."""
+    token = _current_plan.set(plan)
+    try:
+        yield plan
+    finally:
+        _current_plan.reset(token)
+
+
+def current_plan() -> Optional[LatencyPlan]:
+    """The active latency plan, or None when the request has no budget."""
+    return _current_plan.get()
+
+
+# Process-wide planner reading the shared stage timings
+latency_planner = LatencyPlanner()
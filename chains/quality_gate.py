@@ -0,0 +1,64 @@
+"""
+Quality Gate - Skip-rate and latency reporting for the critique score gate
+"""
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# Thresholds the report shows "what if" skip rates for, to help tune skip_score
+WHAT_IF_THRESHOLDS = (70, 80, 85, 90, 95)
+
+
+class QualityGateStats:
+    """Recent gate decisions per settings variant: score, whether formatting was skipped, and its cost."""
+
+    def __init__(self, max_samples: int = 500):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._decisions: Dict[str, deque] = {}
+
+    def record(self, variant: str, score: Optional[int], threshold: Optional[float],
+               skipped: bool, seconds: float):
+        """Record one gate decision and the time spent on the rewrite or the local cleanup."""
+        with self._lock:
+            self._decisions.setdefault(variant, deque(maxlen=self.max_samples)).append((score, threshold, skipped, seconds))
+
+    def report(self, variant: Optional[str] = None) -> dict:
+        """Skip rate, unscored critiques, mean rewrite vs cleanup time and estimated seconds saved."""
+        with self._lock:
+            decisions = [
+                decision
+                for name, values in self._decisions.items()
+                if variant is None or name == variant
+                for decision in values
+            ]
+
+        total = len(decisions)
+        ran = [seconds for _, _, skipped, seconds in decisions if not skipped]
+        skipped = [seconds for _, _, was_skipped, seconds in decisions if was_skipped]
+        scores = [score for score, _, _, _ in decisions if score is not None]
+        rewrite_seconds = sum(ran) / len(ran) if ran else 0.0
+        cleanup_seconds = sum(skipped) / len(skipped) if skipped else 0.0
+
+        return {
+            "decisions": total,
+            "skipped": len(skipped),
+            "skip_rate": len(skipped) / total if total else 0.0,
+            "unscored": total - len(scores),
+            "mean_score": sum(scores) / len(scores) if scores else None,
+            "mean_rewrite_seconds": rewrite_seconds,
+            "mean_cleanup_seconds": cleanup_seconds,
+            "estimated_seconds_saved": len(skipped) * max(0.0, rewrite_seconds - cleanup_seconds),
+            "skip_rate_at": {
+                threshold: sum(1 for score in scores if score >= threshold) / total if total else 0.0
+                for threshold in WHAT_IF_THRESHOLDS
+            }
+        }
+
+    def reset(self):
+        with self._lock:
+            self._decisions.clear()
+
+
+# Process-wide gate statistics shared by every CreationChain
+quality_gate_stats = QualityGateStats()
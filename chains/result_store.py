@@ -0,0 +1,236 @@
+"""
+Result Store - Compressed, disk-backed storage for large chain outputs shared by all sessions
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Set
+
+from tools.local_index import local_index
+
+# Evicted session keys remembered so their next visit can be told why it was reset
+MAX_EVICTED = 10000
+
+
+class BlobRef:
+    """Small stand-in kept in session state for a string stored in the ResultStore."""
+
+    __slots__ = ("key", "chars")
+
+    def __init__(self, key: str, chars: int):
+        self.key = key
+        self.chars = chars
+
+    def __repr__(self):
+        return f"BlobRef({self.key[:12]}, {self.chars} chars)"
+
+
+class ResultStore:
+    """Content-addressed zlib blobs on disk, owned by sessions and freed when they go idle.
+
+    Identical outputs from different sessions share one blob. A small LRU of
+    decompressed text avoids disk reads on Streamlit reruns. Total disk use is
+    capped by evicting the least recently used blobs no session references;
+    referenced blobs are only freed when their sessions are released or go idle.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 512 * 1024 * 1024,
+                 cache_bytes: int = 16 * 1024 * 1024, min_chars: int = 2048,
+                 idle_seconds: float = 1800, sweep_interval: float = 60):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "content-strategist-results")
+        self.max_bytes = max_bytes
+        self.cache_bytes = cache_bytes
+        self.min_chars = min_chars
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+
+        self._lock = threading.Lock()
+        self._blobs: "OrderedDict[str, int]" = OrderedDict()  # key -> compressed bytes, LRU order
+        self._disk_bytes = 0
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cached_bytes = 0
+        self._owners: Dict[str, Set[str]] = {}  # session -> blob keys
+        self._refs: Dict[str, int] = {}  # blob key -> owning sessions
+        self._last_seen: Dict[str, float] = {}
+        # Evicted session keys: the set answers is_evicted, the deque drops the oldest past MAX_EVICTED
+        self._evicted: Set[str] = set()
+        self._evicted_order: deque = deque()
+        self._last_sweep = 0.0
+
+        os.makedirs(self.directory, exist_ok=True)
+        # Blobs left by an earlier process count toward the cap and age out first
+        entries = sorted(os.scandir(self.directory), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if entry.name.endswith(".z"):
+                size = entry.stat().st_size
+                self._blobs[entry.name[:-2]] = size
+                self._disk_bytes += size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.z")
+
+    def put(self, text: str, session_key: Optional[str] = None) -> BlobRef:
+        """Store text (once per distinct content) and return its reference."""
+        data = text.encode("utf-8")
+        key = hashlib.sha256(data).hexdigest()[:32]
+        with self._lock:
+            known = key in self._blobs
+            if known:
+                self._blobs.move_to_end(key)
+            owned = self._owners.setdefault(session_key, set()) if session_key else None
+            if owned is not None and key not in owned:
+                owned.add(key)
+                self._refs[key] = self._refs.get(key, 0) + 1
+
+        if not known:
+            compressed = zlib.compress(data, 6)
+            tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, self._path(key))
+            with self._lock:
+                if key not in self._blobs:
+                    self._blobs[key] = len(compressed)
+                    self._disk_bytes += len(compressed)
+                self._evict_over_cap(keep=key)
+        return BlobRef(key, len(text))
+
+    def get(self, ref: BlobRef) -> Optional[str]:
+        """Text for a reference, or None if its blob was evicted."""
+        with self._lock:
+            text = self._cache.get(ref.key)
+            if text is not None:
+                self._cache.move_to_end(ref.key)
+                return text
+        try:
+            with open(self._path(ref.key), "rb") as f:
+                text = zlib.decompress(f.read()).decode("utf-8")
+        except (OSError, zlib.error):
+            return None
+        with self._lock:
+            if ref.key in self._blobs:
+                self._blobs.move_to_end(ref.key)
+            self._cache[ref.key] = text
+            self._cached_bytes += len(text)
+            while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+                _, dropped = self._cache.popitem(last=False)
+                self._cached_bytes -= len(dropped)
+        return text
+
+    def offload(self, result: Optional[dict], session_key: str) -> Optional[dict]:
+        """Copy of a chain result with every long string replaced by a BlobRef."""
+        if not result:
+            return result
+        return {
+            name: self.put(value, session_key) if isinstance(value, str) and len(value) >= self.min_chars else value
+            for name, value in result.items()
+        }
+
+    def resolve(self, value, default: str = "") -> str:
+        """The text behind a BlobRef (default if evicted); plain values pass through."""
+        if isinstance(value, BlobRef):
+            text = self.get(value)
+            return default if text is None else text
+        return value if value is not None else default
+
+    def touch(self, session_key: str):
+        """Mark a session as active, and sweep idle ones at most once per sweep_interval."""
+        now = time.time()
+        with self._lock:
+            self._last_seen[session_key] = now
+            due = now - self._last_sweep >= self.sweep_interval
+            if due:
+                self._last_sweep = now
+        if due:
+            self.sweep(now)
+
+    def release(self, session_key: str):
+        """Drop a session's blobs, e.g. when it starts over."""
+        with self._lock:
+            self._release_locked(session_key)
+
+    def sweep(self, now: Optional[float] = None) -> List[str]:
+        """Evict sessions idle longer than idle_seconds, with their private local-index posts; returns their keys."""
+        now = now or time.time()
+        with self._lock:
+            idle = [key for key, seen in self._last_seen.items() if now - seen > self.idle_seconds]
+            for session_key in idle:
+                self._release_locked(session_key)
+                del self._last_seen[session_key]
+                self._evicted.add(session_key)
+                self._evicted_order.append(session_key)
+                if len(self._evicted_order) > MAX_EVICTED:
+                    self._evicted.discard(self._evicted_order.popleft())
+        # Sessions are the tenants their posts were indexed under
+        for session_key in idle:
+            local_index.purge_tenant(session_key)
+        return idle
+
+    def is_evicted(self, session_key: str) -> bool:
+        with self._lock:
+            return session_key in self._evicted
+
+    def _release_locked(self, session_key: str):
+        for key in self._owners.pop(session_key, ()):
+            self._refs[key] -= 1
+            if not self._refs[key]:
+                del self._refs[key]
+                self._delete_locked(key)
+
+    def _delete_locked(self, key: str):
+        size = self._blobs.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+        dropped = self._cache.pop(key, None)
+        if dropped is not None:
+            self._cached_bytes -= len(dropped)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict_over_cap(self, keep: str):
+        # Blobs a live session still references stay, even if that leaves the store over its cap
+        if self._disk_bytes <= self.max_bytes:
+            return
+        for key in [key for key in self._blobs if key not in self._refs and key != keep]:
+            if self._disk_bytes <= self.max_bytes:
+                break
+            self._delete_locked(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "blobs": len(self._blobs),
+                "disk_bytes": self._disk_bytes,
+                "cached_bytes": self._cached_bytes,
+                "sessions": len(self._last_seen)
+            }
+
+
+def deep_size(obj, _seen: Optional[set] = None) -> int:
+    """Approximate bytes held by obj and everything it contains."""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_size(getattr(obj, name), seen) for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+# Process-wide store shared by every Streamlit session
+result_store = ResultStore(
+    directory=os.getenv("RESULT_STORE_DIR") or None,
+    idle_seconds=float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+)
@@ -0,0 +1,78 @@
+"""
+Stage Metrics - Latency samples per pipeline stage and settings variant
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class StageMetrics:
+    """Keeps a bounded window of recent latencies for every (variant, stage) pair."""
+
+    def __init__(self, max_samples: int = 500):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[tuple, deque] = {}
+        self._models: Dict[tuple, str] = {}
+
+    def record(self, stage: str, seconds: float, variant: str = "default", model: str = ""):
+        """Record one stage execution."""
+        key = (variant, stage)
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.max_samples)).append(seconds)
+            if model:
+                self._models[key] = model
+
+    @contextmanager
+    def time(self, stage: str, variant: str = "default", model: str = ""):
+        """Context manager that records the wall time of the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, variant, model)
+
+    def percentile(self, stage: str, q: float, variant: Optional[str] = None) -> Optional[float]:
+        """Latency percentile (0-100) for a stage, across all variants unless one is given."""
+        with self._lock:
+            samples = [
+                value
+                for (sample_variant, sample_stage), values in self._samples.items()
+                if sample_stage == stage and (variant is None or sample_variant == variant)
+                for value in values
+            ]
+        if not samples:
+            return None
+        samples.sort()
+        index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def summary(self) -> Dict[str, dict]:
+        """Per "variant/stage" count, mean, p50 and p95 latency in seconds."""
+        with self._lock:
+            snapshot = {key: sorted(values) for key, values in self._samples.items()}
+            models = dict(self._models)
+
+        summary = {}
+        for (variant, stage), values in sorted(snapshot.items()):
+            count = len(values)
+            summary[f"{variant}/{stage}"] = {
+                "model": models.get((variant, stage), ""),
+                "count": count,
+                "mean": sum(values) / count,
+                "p50": values[int(0.5 * (count - 1))],
+                "p95": values[int(round(0.95 * (count - 1)))]
+            }
+        return summary
+
+    def reset(self):
+        """Drop all samples."""
+        with self._lock:
+            self._samples.clear()
+            self._models.clear()
+
+
+# Process-wide stage timings shared by both chains
+stage_metrics = StageMetrics()
@@ -0,0 +1,138 @@
+"""
+Topic History - Last Find Topics run per tenant and professional field, for incremental refreshes
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from tools.fair_share import DEFAULT_TENANT
+from tools.research_window import ResearchWindow
+
+
+def field_key(professional_field: str, tenant: str = DEFAULT_TENANT) -> str:
+    """Key for a tenant's professional field; the field is compared case- and whitespace-insensitively."""
+    normalized = " ".join(professional_field.lower().split())
+    return hashlib.sha256(f"{tenant}\n{normalized}".encode("utf-8")).hexdigest()[:32]
+
+
+def compact_topics(topics: str, why_chars: int = 120) -> str:
+    """One line per topic, title plus the start of its "Why it matters", for the analyst prompt."""
+    lines = []
+    for line in topics.splitlines():
+        line = line.strip().strip("*").strip()
+        if re.match(r"Topic\s*\d*\s*:", line):
+            lines.append("- " + line.split(":", 1)[1].strip().strip("*").strip())
+        elif line.startswith("Why it matters:") and lines:
+            lines[-1] += f" ({line.split(':', 1)[1].strip()[:why_chars]})"
+    return "\n".join(lines)
+
+
+class TopicHistory:
+    """LRU of the last successful run per tenant and field, optionally mirrored to one JSON file each.
+
+    A run is stored with the time its research started, its topics and the
+    URLs it analyzed. Runs are private to the tenant (session) that made
+    them, so one session never starts from another's window or topics. Runs older than max_age_seconds are ignored, so a
+    stale field gets a full refresh.
+    """
+
+    def __init__(self, max_fields: int = 256, max_age_seconds: float = 86400,
+                 max_urls: int = 500, directory: Optional[str] = None):
+        self.max_fields = max_fields
+        self.max_age_seconds = max_age_seconds
+        self.max_urls = max_urls
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._runs: "OrderedDict[str, dict]" = OrderedDict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, professional_field: str, tenant: str = DEFAULT_TENANT) -> Optional[dict]:
+        """The tenant's last run for the field: {"started_at", "topics", "urls"}, or None."""
+        key = field_key(professional_field, tenant)
+        with self._lock:
+            run = self._runs.get(key)
+        if run is None:
+            run = self._load(key)
+        if run is None or time.time() - run["started_at"] > self.max_age_seconds:
+            return None
+        return run
+
+    def put(self, professional_field: str, started_at: float, topics: str, urls: Iterable[str],
+            tenant: str = DEFAULT_TENANT):
+        """Record a tenant's successful run; keeps the most recent max_urls analyzed URLs."""
+        key = field_key(professional_field, tenant)
+        run = {"started_at": started_at, "topics": topics, "urls": list(urls)[-self.max_urls:]}
+        with self._lock:
+            self._runs[key] = run
+            self._runs.move_to_end(key)
+            while len(self._runs) > self.max_fields:
+                self._runs.popitem(last=False)
+        if self.directory:
+            try:
+                tmp_path = self._path(key) + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(run, f)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                pass
+
+    def _load(self, key: str) -> Optional[dict]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                run = json.load(f)
+            return {"started_at": float(run["started_at"]), "topics": run["topics"], "urls": list(run["urls"])}
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._runs.clear()
+
+
+class TopicRefresh:
+    """One Find Topics run: the earlier run it builds on (if incremental) and its research window."""
+
+    def __init__(self, professional_field: str, previous: Optional[dict] = None):
+        self.professional_field = professional_field
+        self.previous = previous
+        self.started_at = time.time()
+        if previous:
+            self.window = ResearchWindow(previous["started_at"], previous["urls"])
+        else:
+            self.window = ResearchWindow()
+
+    @property
+    def incremental(self) -> bool:
+        return self.previous is not None
+
+    def urls(self) -> list:
+        """URLs to remember for the next run: earlier ones, then this run's."""
+        earlier = self.previous["urls"] if self.previous else []
+        return list(dict.fromkeys(earlier + sorted(self.window.collected)))
+
+    def summary(self) -> dict:
+        """What the refresh covered, for logging."""
+        return {
+            "mode": "incremental" if self.incremental else "full",
+            "since": self.window.since_iso(),
+            "new_records": self.window.kept,
+            "skipped_records": self.window.dropped
+        }
+
+
+# Process-wide store; each session refreshing a field builds on its own last run
+topic_history = TopicHistory(
+    max_age_seconds=float(os.getenv("TOPIC_HISTORY_MAX_AGE_HOURS", "24")) * 3600,
+    directory=os.getenv("TOPIC_HISTORY_DIR") or None
+)
@@ -0,0 +1,6 @@
+"""
+Config package for LinkedIn Content Strategist
+"""
+from .settings import StageConfig, Settings, load_settings, STAGES
+
+__all__ = ['StageConfig', 'Settings', 'load_settings', 'STAGES']
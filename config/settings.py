@@ -0,0 +1,154 @@
+"""
+Stage Settings - Per-agent model tier, output length, timeout and retry policy
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass, fields, replace
+from typing import Dict, Optional
+
+
+@dataclass(frozen=True)
+class StageConfig:
+    """LLM settings for a single pipeline stage."""
+    model: str = "gemini-2.5-flash"
+    # "gemini", or "local" for a quantized GGUF model on CPU (`model` is then the file name)
+    backend: str = "gemini"
+    temperature: float = 0.3
+    max_output_tokens: Optional[int] = None
+    timeout: Optional[float] = None
+    max_retries: int = 2
+    thinking_budget: Optional[int] = None
+    # Critique score (0-100) at or above which the stage is skipped; None always runs it
+    skip_score: Optional[float] = None
+    # Input size (characters) above which the stage switches to map-reduce; None disables it
+    map_reduce_chars: Optional[int] = None
+
+    @property
+    def model_label(self) -> str:
+        """Model name for metrics and checkpoint keys, qualified when it is not a Gemini model."""
+        return self.model if self.backend == "gemini" else f"{self.backend}:{self.model}"
+
+
+# Built-in defaults; temperatures match the values the agents always used
+STAGES: Dict[str, StageConfig] = {
+    "research": StageConfig(temperature=0.3, max_output_tokens=4096, timeout=60),
+    # map_reduce_chars is compared with the raw tool output behind the research write-up,
+    # as rendered by the tools (at most MAX_ITERATIONS=3 calls). Without article enrichment,
+    # a call renders at most ~4.5k chars (multi_search, 10 records), so a run stays under ~14k.
+    # With ARTICLE_ENRICHMENT_TOP set, a call renders ~8k (tavily) to ~16.5k (multi_search), so
+    # a run reaches ~50k. The write-up is capped at 4096 tokens (~16k chars). Above 24k, then,
+    # the write-up has dropped at least a third of what the tools found. Reading the sources in
+    # one parallel map wave plus a reduce costs about one extra round trip (about 1s more than a
+    # single call on the stub, benchmarks/topic_map_reduce.py), and no article is dropped.
+    "topic_analysis": StageConfig(temperature=0.4, max_output_tokens=4096, timeout=45, map_reduce_chars=24000),
+    "angle_generation": StageConfig(temperature=0.6, max_output_tokens=4096, timeout=45),
+    "drafting": StageConfig(temperature=0.5, max_output_tokens=4096, timeout=45),
+    # Gemini 2.5 thinking tokens count against max_output_tokens, so the short-output
+    # stages cap thinking to keep room for the answer on long drafts
+    "critique": StageConfig(temperature=0.3, max_output_tokens=2048, timeout=30, thinking_budget=512),
+    # One call critiquing several drafts; output room caps how many fit
+    "critique_batch": StageConfig(temperature=0.3, max_output_tokens=8192, timeout=90, thinking_budget=1024),
+    "formatting": StageConfig(temperature=0.2, max_output_tokens=2048, timeout=30, thinking_budget=512, skip_score=90),
+}
+
+_FIELDS = tuple(f.name for f in fields(StageConfig))
+# Optional fields (those defaulting to None) are the only ones "none" or "" may clear
+_OPTIONAL = frozenset(f.name for f in fields(StageConfig) if f.default is None)
+
+
+def _coerce(stage: str, name: str, value):
+    """Convert a raw file/env value to the type of the StageConfig field."""
+    if value is None or value == "" or str(value).lower() == "none":
+        if name in _OPTIONAL:
+            return None
+        raise ValueError(f"Stage setting {stage}.{name} cannot be empty")
+    try:
+        if name in ("model", "backend"):
+            return str(value)
+        if name in ("temperature", "timeout", "skip_score"):
+            return float(value)
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Stage setting {stage}.{name} has an invalid value: {value!r}") from None
+
+
+def _apply(stage: str, config: StageConfig, overrides: dict) -> StageConfig:
+    """Return a copy of config with known fields overridden."""
+    values = {key: _coerce(stage, key, value) for key, value in overrides.items() if key in _FIELDS}
+    return replace(config, **values)
+
+
+class Settings:
+    """Resolved stage configuration for one A/B variant."""
+
+    def __init__(self, stages: Dict[str, StageConfig], variant: str = "default"):
+        self.stages = stages
+        self.variant = variant
+
+    def stage(self, name: str) -> StageConfig:
+        """Return the configuration for a stage, falling back to the defaults."""
+        return self.stages.get(name) or STAGES.get(name) or StageConfig()
+
+    def as_dict(self) -> dict:
+        """Plain-dict view, e.g. for logging which settings a run used."""
+        return {
+            "variant": self.variant,
+            "stages": {name: config.__dict__.copy() for name, config in self.stages.items()}
+        }
+
+
+def _choose_variant(data: dict, variant: Optional[str], assignment_key: Optional[str]) -> str:
+    """Pick the variant: explicit name, then STAGE_CONFIG_VARIANT, then the weighted A/B split."""
+    variant = variant or os.getenv("STAGE_CONFIG_VARIANT")
+    if variant:
+        return variant
+
+    split = data.get("ab_split") or {}
+    if not split or not assignment_key:
+        return "default"
+
+    # Deterministic bucket in [0, 1) so a session always lands in the same variant
+    digest = hashlib.sha256(assignment_key.encode("utf-8")).hexdigest()
+    bucket = int(digest[:8], 16) / 0x100000000
+    total = sum(split.values())
+    cumulative = 0.0
+    for name, weight in split.items():
+        cumulative += weight / total
+        if bucket < cumulative:
+            return name
+    return list(split)[-1]
+
+
+def load_settings(path: Optional[str] = None, variant: Optional[str] = None,
+                  assignment_key: Optional[str] = None) -> Settings:
+    """Load stage settings.
+
+    Precedence (lowest to highest): built-in defaults, the JSON file's "stages",
+    the selected variant's overrides, then STAGE_<NAME>_<FIELD> environment
+    variables (e.g. STAGE_FORMATTING_MODEL=gemini-2.5-flash-lite).
+    """
+    path = path or os.getenv("STAGE_CONFIG_FILE")
+    data = {}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    chosen = _choose_variant(data, variant, assignment_key)
+    variant_overrides = data.get("variants", {}).get(chosen, {})
+
+    stages = {}
+    for name in set(STAGES) | set(data.get("stages", {})) | set(variant_overrides):
+        config = STAGES.get(name, StageConfig())
+        config = _apply(name, config, data.get("stages", {}).get(name, {}))
+        config = _apply(name, config, variant_overrides.get(name, {}))
+
+        prefix = f"STAGE_{name.upper()}_"
+        env_overrides = {
+            field: os.getenv(prefix + field.upper())
+            for field in _FIELDS
+            if os.getenv(prefix + field.upper()) is not None
+        }
+        stages[name] = _apply(name, config, env_overrides)
+
+    return Settings(stages, chosen)
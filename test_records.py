@@ -0,0 +1,17 @@
+"""
+Tests for research record keys and dedupe
+"""
+from tools.records import ResearchRecord, dedupe, normalize_url
+
+
+def test_watch_urls_stay_distinct():
+    first = ResearchRecord("youtube_search", "video", title="One", url="https://www.youtube.com/watch?v=abc123")
+    second = ResearchRecord("youtube_search", "video", title="Two", url="https://www.youtube.com/watch?v=xyz789")
+    assert first.key != second.key
+    assert len(dedupe([first, second])) == 2
+
+
+def test_tracking_params_are_ignored():
+    assert normalize_url("https://www.example.com/post/?utm_source=x&id=7&fbclid=y") == \
+        normalize_url("http://example.com/post?id=7")
+    assert normalize_url("https://example.com/a?p=1") != normalize_url("https://example.com/a?p=2")
@@ -0,0 +1,64 @@
+"""
+Tests for the topic analyst's single-call and map-reduce paths
+"""
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from agents.llm_factory import set_llm_override
+from agents.master_research_agent import MasterResearchAgent
+from agents.topic_analyst import TopicAnalystAgent
+from tools.base import ENRICHED_TEXT_LIMIT
+from tools.records import ResearchRecord, records_to_prompt
+
+ARTICLE = "Analysts expect the rollout to reshape procurement, hiring and vendor strategy across the sector. " * 40
+REPLY = "Topic 1: Agentic AI in procurement\nWhy it matters: Budgets move.\nKey angle: Who owns the agents"
+
+
+class RecordingModel(BaseChatModel):
+    """Answers every call with the same topics and keeps the prompts it was sent."""
+
+    prompts: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.prompts.append(messages[-1].content)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=REPLY))])
+
+
+def tool_output(records: int, text_limit: int) -> str:
+    """One search rendered the way the research tools hand it to the agent."""
+    return records_to_prompt([
+        ResearchRecord("tavily_search", "web", title=f"How enterprises are adopting agentic AI, part {i}",
+                       url=f"https://example.com/agentic-ai?id={i}", text=ARTICLE)
+        for i in range(records)
+    ], text_limit=text_limit)
+
+
+def analyze(sources: str) -> list:
+    model = RecordingModel(prompts=[])
+    set_llm_override(lambda stage, config: model)
+    try:
+        # The research write-up is capped by the research stage's 4096 output tokens
+        assert TopicAnalystAgent("test").analyze("Research summary. " * 900, sources) == REPLY
+    finally:
+        set_llm_override(None)
+    return model.prompts
+
+
+def test_enriched_research_is_map_reduced():
+    # Three multi_search calls with article enrichment on
+    prompts = analyze(MasterResearchAgent.sources([tool_output(10, ENRICHED_TEXT_LIMIT)] * 3))
+    maps = [prompt for prompt in prompts if prompt.startswith("Extract candidate LinkedIn topics")]
+    assert len(maps) > 1
+    assert len(prompts) == len(maps) + 1
+
+
+def test_plain_research_uses_one_call():
+    # Three multi_search calls with snippets only
+    prompts = analyze(MasterResearchAgent.sources([tool_output(10, 300)] * 3))
+    assert len(prompts) == 1
+    assert prompts[0].startswith("Analyze this news data")
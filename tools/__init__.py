@@ -5,5 +5,16 @@ from .gnews_tool import GNewsSearchTool
 from .tavily_tool import TavilySearchTool
 from .youtube_tool import YouTubeSearchTool
 from .wikipedia_tool import WikipediaSearchTool
+from .multi_search_tool import MultiQuerySearchTool
+from .local_search_tool import LocalSearchTool
+from .deadline import Deadline, deadline_scope, remaining_time
+from .records import ResearchRecord, records_to_prompt, records_to_bytes, records_from_bytes
+from .research_window import ResearchWindow, research_window, current_window
 
-__all__ = ['GNewsSearchTool', 'TavilySearchTool', 'YouTubeSearchTool', 'WikipediaSearchTool']
+__all__ = [
+    'GNewsSearchTool', 'TavilySearchTool', 'YouTubeSearchTool', 'WikipediaSearchTool', 'MultiQuerySearchTool',
+    'LocalSearchTool',
+    'Deadline', 'deadline_scope', 'remaining_time',
+    'ResearchRecord', 'records_to_prompt', 'records_to_bytes', 'records_from_bytes',
+    'ResearchWindow', 'research_window', 'current_window'
+]
@@ -0,0 +1,144 @@
+"""
+Article Text - Concurrent full-text fetching for article and web records
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional
+
+import lxml.html
+import requests
+from lxml import etree
+from requests.adapters import HTTPAdapter
+
+from tools.deadline import remaining_time
+from tools.records import ResearchRecord, normalize_url
+
+MAX_WORKERS = 8
+MAX_DOWNLOAD_BYTES = 2 * 1024 * 1024
+MAX_TEXT_CHARS = 4000
+MIN_PARAGRAPH_CHARS = 40
+# Elements whose text is never article body
+_BOILERPLATE = "//script|//style|//noscript|//nav|//header|//footer|//aside|//form|//figure"
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS))
+_session.mount("http://", HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS))
+_session.headers["User-Agent"] = "Mozilla/5.0 (compatible; LinkedInContentStrategist/1.0)"
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="article-fetch")
+
+
+class TextCache:
+    """LRU of extracted article text keyed by normalized URL, capped by entries and total characters."""
+
+    def __init__(self, max_entries: int = 512, max_chars: int = 4 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._chars = 0
+
+    def get(self, url: str) -> Optional[str]:
+        key = normalize_url(url)
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def put(self, url: str, text: str):
+        """Cache text for a URL; an empty string records a page with no usable text."""
+        key = normalize_url(url)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._chars -= len(previous)
+            self._entries[key] = text
+            self._chars += len(text)
+            while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+                _, dropped = self._entries.popitem(last=False)
+                self._chars -= len(dropped)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+text_cache = TextCache()
+
+
+def extract_text(html: bytes, max_chars: int = MAX_TEXT_CHARS) -> str:
+    """Main text of a page: paragraphs inside <article> (else <main>, else the body), boilerplate removed."""
+    try:
+        document = lxml.html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        return ""
+    for element in document.xpath(_BOILERPLATE):
+        element.drop_tree()
+    root = (document.xpath("//article") or document.xpath("//main") or [document])[0]
+
+    paragraphs, length = [], 0
+    for paragraph in root.iter("p"):
+        text = " ".join(paragraph.text_content().split())
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        paragraphs.append(text)
+        length += len(text) + 1
+        if length >= max_chars:
+            break
+    return "\n".join(paragraphs)[:max_chars]
+
+
+def _fetch(url: str, timeout: float) -> Optional[str]:
+    """Extracted text of a page, "" when it has none, or None when the request failed."""
+    try:
+        with _session.get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            if "html" not in response.headers.get("Content-Type", "html"):
+                return ""
+            body = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                body += chunk
+                if len(body) >= MAX_DOWNLOAD_BYTES:
+                    break
+        text = extract_text(bytes(body))
+    except requests.exceptions.RequestException:
+        return None
+    text_cache.put(url, text)
+    return text
+
+
+def fetch_texts(urls: Iterable[str], timeout: float = 4.0) -> Dict[str, str]:
+    """Full text for each URL, fetched concurrently; pages not done within the timeout are left out."""
+    texts, pending = {}, {}
+    for url in dict.fromkeys(url for url in urls if url):
+        cached = text_cache.get(url)
+        if cached is not None:
+            texts[url] = cached
+        else:
+            pending[_executor.submit(_fetch, url, timeout)] = url
+
+    if pending:
+        # Pages that finish after the wait are still cached for the next search
+        done, _ = wait(pending, timeout=remaining_time(timeout))
+        for future in done:
+            texts[pending[future]] = future.result()
+    return {url: text for url, text in texts.items() if text}
+
+
+def enrich_records(records: List[ResearchRecord], top: int, timeout: float = 4.0) -> int:
+    """Replace the snippet of the first `top` article/web records with page text; returns how many changed."""
+    targets = [record for record in records if record.kind in ("article", "web") and record.url][:top]
+    texts = fetch_texts((record.url for record in targets), timeout)
+    enriched = 0
+    for record in targets:
+        text = texts.get(record.url)
+        if text and len(text) > len(record.text):
+            record.text = text
+            enriched += 1
+    return enriched
+
+
+def enrichment_top() -> int:
+    """How many records per search to enrich (ARTICLE_ENRICHMENT_TOP; 0 disables enrichment)."""
+    return int(os.getenv("ARTICLE_ENRICHMENT_TOP", "0"))
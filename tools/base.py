@@ -0,0 +1,136 @@
+"""
+Base class shared by the research tools
+"""
+import asyncio
+from typing import Any, List, Optional, Union
+from langchain.tools import BaseTool
+from pydantic import Field
+from tools.deadline import acall_with_deadline, call_with_deadline
+from tools.circuit_breaker import get_breaker, is_error_result
+from tools.fair_share import SchedulerRejected, get_scheduler
+from tools.records import ResearchRecord, records_to_prompt
+from tools.article_text import enrich_records, enrichment_top
+from tools.research_window import current_window
+from tools.local_index import local_index
+
+# Per-record text budget in the prompt once records carry full article text
+ENRICHED_TEXT_LIMIT = 1500
+
+
+class ResearchTool(BaseTool):
+    """Research tool whose calls run under the current deadline and a per-tool circuit breaker.
+
+    Subclasses implement `_search(query, timeout)` returning a list of
+    ResearchRecord, or a message string when there is nothing to return.
+    While the breaker is open, calls are rerouted to `fallback` (another
+    ResearchTool) without touching the failing API. With `enrich_top` set,
+    the top article/web records get their page text fetched concurrently.
+    Inside a research window, records published before it or already
+    analyzed are dropped before enrichment. Whatever is returned is added
+    to the local BM25 index for `local_search`. Each attempt holds a slot
+    in the fair-share "tools" pool.
+    Tools with an async client override `_asearch`; the rest run `_search`
+    in a worker thread when called through `ainvoke`.
+    """
+
+    default_timeout: float = 15
+    fallback: Optional[Any] = Field(default=None, exclude=True)
+    enrich_top: int = Field(default_factory=enrichment_top)
+    index_results: bool = True
+
+    def _search(self, query: str, timeout: Optional[float] = None) -> Union[List[ResearchRecord], str]:
+        raise NotImplementedError
+
+    async def _asearch(self, query: str, timeout: Optional[float] = None) -> Union[List[ResearchRecord], str]:
+        return await asyncio.to_thread(self._search, query, timeout=timeout)
+
+    def _run(self, query: str) -> str:
+        """Execute the search and render the records as compact prompt text."""
+        result = self._windowed(query, self.search_records(query))
+        if isinstance(result, str):
+            return result
+        
+        enriched = enrich_records(result, self.enrich_top) if self.enrich_top else 0
+        if self.index_results:
+            local_index.add(result)
+        return self._render(result, enriched)
+
+    async def _arun(self, query: str) -> str:
+        """Async version of the tool."""
+        result = self._windowed(query, await self.asearch_records(query))
+        if isinstance(result, str):
+            return result
+        
+        enriched = await asyncio.to_thread(enrich_records, result, self.enrich_top) if self.enrich_top else 0
+        if self.index_results:
+            await asyncio.to_thread(local_index.add, result)
+        return self._render(result, enriched)
+
+    @staticmethod
+    def _windowed(query: str, result: Union[List[ResearchRecord], str]) -> Union[List[ResearchRecord], str]:
+        window = current_window()
+        if window is None or isinstance(result, str):
+            return result
+        records = window.keep(result)
+        if result and not records:
+            return f"No new results since {window.since_iso() or 'the last run'} for query: {query}"
+        return records
+
+    def _render(self, records: List[ResearchRecord], enriched: int) -> str:
+        text = records_to_prompt(records, text_limit=ENRICHED_TEXT_LIMIT if enriched else 300)
+        if records and records[0].source != self.name:
+            return f"[{self.name} unavailable - results from {records[0].source}]\n{text}"
+        return text
+
+    def search_records(self, query: str, allow_fallback: bool = True) -> Union[List[ResearchRecord], str]:
+        """Records for the query, failing over to the fallback tool once when this one is unavailable."""
+        try:
+            with get_scheduler("tools").slot():
+                result = self._attempt(query)
+        except SchedulerRejected as e:
+            return f"Error: {self.name} not run: {e}"
+        if not is_error_result(result) or not allow_fallback or self.fallback is None:
+            return result
+
+        # The slot is released first: the fallback queues for its own
+        get_breaker(self.name).record_reroute()
+        fallback_result = self.fallback.search_records(query, allow_fallback=False)
+        return result if is_error_result(fallback_result) else fallback_result
+
+    async def asearch_records(self, query: str, allow_fallback: bool = True) -> Union[List[ResearchRecord], str]:
+        """Async version of search_records, sharing its breaker, latency history and scheduler."""
+        try:
+            async with get_scheduler("tools").aslot():
+                result = await self._aattempt(query)
+        except SchedulerRejected as e:
+            return f"Error: {self.name} not run: {e}"
+        if not is_error_result(result) or not allow_fallback or self.fallback is None:
+            return result
+
+        get_breaker(self.name).record_reroute()
+        fallback_result = await self.fallback.asearch_records(query, allow_fallback=False)
+        return result if is_error_result(fallback_result) else fallback_result
+
+    def _attempt(self, query: str) -> Union[List[ResearchRecord], str]:
+        """One call of this tool under its circuit breaker."""
+        breaker = get_breaker(self.name)
+        if not breaker.allow():
+            return f"Error: {self.name} circuit breaker is open"
+        result = call_with_deadline(self.name, self._search, query, default_timeout=self.default_timeout)
+        self._record(breaker, result)
+        return result
+
+    async def _aattempt(self, query: str) -> Union[List[ResearchRecord], str]:
+        breaker = get_breaker(self.name)
+        if not breaker.allow():
+            return f"Error: {self.name} circuit breaker is open"
+        result = await acall_with_deadline(self.name, self._asearch, query, default_timeout=self.default_timeout)
+        self._record(breaker, result)
+        return result
+
+    @staticmethod
+    def _record(breaker, result):
+        if is_error_result(result):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
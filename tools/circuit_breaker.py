@@ -0,0 +1,121 @@
+"""
+Circuit breakers for research tools
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Where a tool's calls go while its breaker is open
+TOOL_FALLBACKS: Dict[str, str] = {
+    "gnews_search": "tavily_search",
+    "youtube_search": "tavily_search",
+    "wikipedia_search": "tavily_search",
+    "tavily_search": "gnews_search"
+}
+
+
+def is_error_result(result) -> bool:
+    """True for the error strings tools return instead of raising."""
+    return isinstance(result, str) and (result.startswith("Error") or result.startswith("Unexpected error"))
+
+
+class CircuitBreaker:
+    """Failure-rate breaker over a sliding window of recent calls, with half-open probing."""
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5,
+                 failure_threshold: float = 0.5, open_seconds: float = 30.0, half_open_probes: int = 1):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self.rejected = 0
+        self.rerouted = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+
+    def _failure_rate(self) -> float:
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; rejected calls are counted."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            self._outcomes.append(False)
+            if self._state == HALF_OPEN or (
+                len(self._outcomes) >= self.min_calls and self._failure_rate() >= self.failure_threshold
+            ):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def record_reroute(self):
+        with self._lock:
+            self.rerouted += 1
+
+    def snapshot(self) -> dict:
+        """Current state and counters, for metrics and the workflow log."""
+        with self._lock:
+            self._maybe_half_open()
+            return {
+                "state": self._state,
+                "failure_rate": round(self._failure_rate(), 3),
+                "window_calls": len(self._outcomes),
+                "rejected": self.rejected,
+                "rerouted": self.rerouted
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(tool_name: str) -> CircuitBreaker:
+    """Breaker shared by every instance of the named tool."""
+    with _breakers_lock:
+        if tool_name not in _breakers:
+            _breakers[tool_name] = CircuitBreaker(tool_name)
+        return _breakers[tool_name]
+
+
+def breaker_states() -> Dict[str, dict]:
+    """Snapshot of every breaker, keyed by tool name."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
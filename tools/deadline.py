@@ -0,0 +1,247 @@
+"""
+Deadlines and hedged calls for research tools
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Awaitable, Callable, Dict, Optional
+
+from tools.circuit_breaker import is_error_result
+
+
+class Deadline:
+    """An absolute point in time by which a request must finish."""
+
+    def __init__(self, seconds: Optional[float]):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None when there is no deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """True once the deadline has passed."""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("research_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Set the deadline for everything called inside the block (nested scopes keep the earlier one)."""
+    outer = _current_deadline.get()
+    deadline = Deadline(seconds)
+    if outer is not None and (deadline.expires_at is None or
+                              (outer.expires_at is not None and outer.expires_at < deadline.expires_at)):
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining_time(default: Optional[float] = None) -> Optional[float]:
+    """Seconds left on the current deadline, or `default` if none is set."""
+    deadline = _current_deadline.get()
+    remaining = deadline.remaining() if deadline else None
+    if remaining is None:
+        return default
+    return remaining if default is None else min(remaining, default)
+
+
+class LatencyTracker:
+    """Recent successful-call latencies and hedge counts for one tool.
+
+    Calls still running at the deadline are recorded as lasting the whole
+    budget (a censored sample), so hung calls push p95 up instead of vanishing.
+    """
+
+    def __init__(self, max_samples: int = 200):
+        self._lock = threading.Lock()
+        self.samples = deque(maxlen=max_samples)
+        self.calls = 0
+        self.hedges = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))]
+
+
+class HedgePolicy:
+    """When to send a duplicate request for a slow tool call."""
+
+    def __init__(self, percentile: float = 95, min_samples: int = 20,
+                 min_delay: float = 0.25, max_hedge_ratio: float = 0.1):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        # Cap on hedges as a fraction of calls, so API spend grows by at most this much
+        self.max_hedge_ratio = max_hedge_ratio
+
+    def hedge_delay(self, tracker: LatencyTracker) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is not allowed."""
+        if len(tracker.samples) < self.min_samples:
+            return None
+        if tracker.hedges >= self.max_hedge_ratio * tracker.calls:
+            return None
+        return max(self.min_delay, tracker.percentile(self.percentile))
+
+
+hedge_policy = HedgePolicy()
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="tool-call")
+
+
+def get_tracker(tool_name: str) -> LatencyTracker:
+    """Latency tracker shared by every instance of the named tool."""
+    with _trackers_lock:
+        return _trackers.setdefault(tool_name, LatencyTracker())
+
+
+def _submit(tracker: LatencyTracker, fn: Callable, args: tuple, timeout: Optional[float], expired: threading.Event):
+    """Run the attempt on the pool with the caller's context variables (deadline, request state)."""
+    return _executor.submit(copy_context().run, _timed, tracker, fn, args, timeout, expired)
+
+
+def _timed(tracker: LatencyTracker, fn: Callable, args: tuple, timeout: Optional[float], expired: threading.Event):
+    start = time.monotonic()
+    result = fn(*args, timeout=timeout)
+    # Error strings are failures, and attempts outliving the deadline already have a censored sample
+    if not is_error_result(result) and not expired.is_set():
+        tracker.record(time.monotonic() - start)
+    return result
+
+
+def _failure(tool_name: str, future) -> str:
+    """Error string for an attempt that raised or returned one."""
+    error = future.exception()
+    return f"Error calling {tool_name}: {error}" if error is not None else future.result()
+
+
+def call_with_deadline(tool_name: str, fn: Callable, *args, default_timeout: Optional[float] = None):
+    """Run `fn(*args, timeout=...)` within the current deadline, hedging calls slower than p95.
+
+    The first attempt to return a non-error result wins; an error from one
+    attempt waits for the other. Losers are cancelled if they have not
+    started, otherwise their result is discarded; every attempt is passed
+    the time left, so none runs past the deadline. Returns an error string
+    when the deadline passes, matching how the tools report other failures.
+    """
+    budget = remaining_time(default_timeout)
+    if budget is not None and budget <= 0:
+        return f"Error: deadline exceeded before {tool_name} could run"
+
+    tracker = get_tracker(tool_name)
+    with tracker._lock:
+        tracker.calls += 1
+
+    start = time.monotonic()
+    expired = threading.Event()
+    pending = {_submit(tracker, fn, args, budget, expired)}
+    hedge_after = hedge_policy.hedge_delay(tracker)
+    failure = None
+
+    if hedge_after is not None and (budget is None or hedge_after < budget):
+        done, pending = wait(pending, timeout=hedge_after)
+        if not done:
+            with tracker._lock:
+                tracker.hedges += 1
+            left = None if budget is None else budget - (time.monotonic() - start)
+            pending.add(_submit(tracker, fn, args, left, expired))
+        else:
+            pending = done
+
+    while pending:
+        left = None if budget is None else budget - (time.monotonic() - start)
+        if left is not None and left <= 0:
+            break
+        done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None and not is_error_result(future.result()):
+                for loser in pending:
+                    loser.cancel()
+                return future.result()
+            failure = _failure(tool_name, future)
+        if not pending and failure is not None:
+            return failure
+
+    expired.set()
+    tracker.record(time.monotonic() - start)
+    for loser in pending:
+        loser.cancel()
+    return f"Error: {tool_name} timed out after {time.monotonic() - start:.1f}s"
+
+
+async def _atimed(tracker: LatencyTracker, afn: Callable[..., Awaitable], args: tuple, timeout: Optional[float]):
+    start = time.monotonic()
+    result = await afn(*args, timeout=timeout)
+    if not is_error_result(result):
+        tracker.record(time.monotonic() - start)
+    return result
+
+
+async def acall_with_deadline(tool_name: str, afn: Callable[..., Awaitable], *args,
+                              default_timeout: Optional[float] = None):
+    """Async version of call_with_deadline: attempts are tasks on the running loop, not pool threads.
+
+    Uses the same tracker and hedge policy, so sync and async callers share
+    latency history and the hedge budget. Losing attempts are cancelled.
+    """
+    budget = remaining_time(default_timeout)
+    if budget is not None and budget <= 0:
+        return f"Error: deadline exceeded before {tool_name} could run"
+
+    tracker = get_tracker(tool_name)
+    with tracker._lock:
+        tracker.calls += 1
+
+    start = time.monotonic()
+    pending = {asyncio.ensure_future(_atimed(tracker, afn, args, budget))}
+    hedge_after = hedge_policy.hedge_delay(tracker)
+    failure = None
+
+    try:
+        if hedge_after is not None and (budget is None or hedge_after < budget):
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if not done:
+                with tracker._lock:
+                    tracker.hedges += 1
+                left = None if budget is None else budget - (time.monotonic() - start)
+                pending.add(asyncio.ensure_future(_atimed(tracker, afn, args, left)))
+            else:
+                pending = done
+
+        while pending:
+            left = None if budget is None else budget - (time.monotonic() - start)
+            if left is not None and left <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=left, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and not is_error_result(task.result()):
+                    return task.result()
+                failure = _failure(tool_name, task)
+            if not pending and failure is not None:
+                return failure
+    finally:
+        for loser in pending:
+            loser.cancel()
+
+    # Cancelled tasks never record, so the censored sample is the only one for this call
+    tracker.record(time.monotonic() - start)
+    return f"Error: {tool_name} timed out after {time.monotonic() - start:.1f}s"
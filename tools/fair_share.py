@@ -0,0 +1,309 @@
+"""
+Fair Share - Weighted fair queuing of LLM and tool calls across tenants and priority classes
+
+Every session shares one set of API keys, so calls are granted a limited
+number of slots per pool ("llm", "tools"). Requests are tagged with a tenant
+and a priority class through tenant_scope(); calls made inside the scope
+(including on DAG, LCEL batch and tool threads, which copy the context)
+queue under that tag. A request that fans out on purpose (map-reduce chunks,
+multi_search sub-queries) wraps the fan-out in fan_out_scope() so it runs
+as one wave instead of being split by the per-tenant cap.
+"""
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from tools.deadline import remaining_time
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# Share of contended slots each class gets while both have calls waiting
+DEFAULT_WEIGHTS = {INTERACTIVE: 8.0, BATCH: 1.0}
+DEFAULT_TENANT = "default"
+# Concurrent calls per pool; a local CPU model serves one call at a time
+DEFAULT_CAPACITY = {"llm": 8, "tools": 16, "local_llm": 1}
+# Flow tags and quota windows kept before idle tenants' entries are dropped
+MAX_IDLE_FLOWS = 1024
+
+
+class SchedulerRejected(Exception):
+    """A call was not given a slot: over its tenant's quota, or still queued when the deadline passed."""
+
+
+class _Ticket:
+    """One call waiting for, or holding, a slot."""
+
+    __slots__ = ("tenant", "priority", "fan_out", "tag", "seq", "enqueued", "granted", "event", "future", "loop")
+
+    def __init__(self, tenant: str, priority: str, tag: float, seq: int, fan_out: bool = False):
+        self.tenant = tenant
+        self.priority = priority
+        self.fan_out = fan_out
+        self.tag = tag
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.event: Optional[threading.Event] = None
+        self.future: Optional[asyncio.Future] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class FairShareScheduler:
+    """Grants `capacity` concurrent call slots in start-time fair queuing order.
+
+    Each (tenant, priority) pair is a flow weighted by its class. A queued
+    call is tagged max(virtual time, its flow's last tag + 1/weight), and the
+    lowest eligible tag gets the next free slot. Backlogged flows therefore
+    share slots in proportion to their weights, and a tenant with a hundred
+    queued calls cannot crowd out one with a single call.
+
+    A call is eligible while its tenant holds fewer than `tenant_limit`
+    slots; calls inside fan_out_scope() may use the whole pool, so one
+    request's deliberate fan-out runs in a single wave. Batch calls also leave `interactive_reserve` slots free, so an
+    interactive call never waits for a long batch call to finish. A tenant
+    may start at most `quota_per_minute` calls per minute (0 = no quota);
+    calls over it fail at once instead of queueing.
+    """
+
+    def __init__(self, name: str, capacity: int, tenant_limit: int = 4, quota_per_minute: int = 0,
+                 weights: Optional[Dict[str, float]] = None, interactive_reserve: Optional[int] = None):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.tenant_limit = max(1, tenant_limit)
+        self.quota_per_minute = quota_per_minute
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.interactive_reserve = (interactive_reserve if interactive_reserve is not None
+                                    else max(1, self.capacity // 4) if self.capacity > 1 else 0)
+
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiting: list = []
+        self._virtual = 0.0
+        self._last_tag: Dict[Tuple[str, str], float] = {}
+        self._running: Counter = Counter()
+        self._in_flight = 0
+        self._starts: Dict[str, deque] = {}
+        self._waits: Dict[str, deque] = {}
+        self.granted: Counter = Counter()
+        self.rejected: Counter = Counter()
+
+    def _enqueue(self, tenant: str, priority: str, fan_out: bool = False) -> _Ticket:
+        with self._lock:
+            self._check_quota(tenant)
+            flow = (tenant, priority)
+            tag = max(self._virtual, self._last_tag.get(flow, 0.0))
+            self._last_tag[flow] = tag + 1.0 / self.weights.get(priority, 1.0)
+            if len(self._last_tag) > MAX_IDLE_FLOWS:
+                self._prune()
+            ticket = _Ticket(tenant, priority, tag, next(self._seq), fan_out)
+            self._waiting.append(ticket)
+            self._dispatch()
+            return ticket
+
+    def _prune(self):
+        # A flow whose last tag is behind virtual time starts from virtual time anyway
+        self._last_tag = {flow: tag for flow, tag in self._last_tag.items() if tag > self._virtual}
+        now = time.monotonic()
+        self._starts = {tenant: starts for tenant, starts in self._starts.items() if starts and now - starts[-1] < 60}
+
+    def _check_quota(self, tenant: str):
+        if not self.quota_per_minute:
+            return
+        starts = self._starts.setdefault(tenant, deque())
+        now = time.monotonic()
+        while starts and now - starts[0] >= 60:
+            starts.popleft()
+        if len(starts) >= self.quota_per_minute:
+            self.rejected["quota"] += 1
+            raise SchedulerRejected(f"tenant is over its {self.name} quota of {self.quota_per_minute} calls per minute")
+        starts.append(now)
+
+    def _eligible(self, ticket: _Ticket) -> bool:
+        if self._running[ticket.tenant] >= (self.capacity if ticket.fan_out else self.tenant_limit):
+            return False
+        return ticket.priority != BATCH or self.capacity - self._in_flight > self.interactive_reserve
+
+    def _dispatch(self):
+        """Hand free slots to the lowest-tagged eligible waiters; caller holds the lock."""
+        while self._in_flight < self.capacity:
+            eligible = [ticket for ticket in self._waiting if self._eligible(ticket)]
+            if not eligible:
+                return
+            ticket = min(eligible, key=lambda t: (t.tag, t.seq))
+            self._waiting.remove(ticket)
+            self._virtual = max(self._virtual, ticket.tag)
+            self._in_flight += 1
+            self._running[ticket.tenant] += 1
+            ticket.granted = True
+            self.granted[ticket.priority] += 1
+            self._waits.setdefault(ticket.priority, deque(maxlen=500)).append(time.monotonic() - ticket.enqueued)
+            if ticket.event is not None:
+                ticket.event.set()
+            elif ticket.future is not None:
+                ticket.loop.call_soon_threadsafe(_resolve, ticket.future)
+
+    def _release(self, ticket: _Ticket):
+        with self._lock:
+            self._in_flight -= 1
+            self._running[ticket.tenant] -= 1
+            if not self._running[ticket.tenant]:
+                del self._running[ticket.tenant]
+            self._dispatch()
+
+    def _abandon(self, ticket: _Ticket) -> bool:
+        """Drop a waiter that gave up; False if it was granted a slot meanwhile."""
+        with self._lock:
+            if ticket.granted:
+                return False
+            self._waiting.remove(ticket)
+            self.rejected["deadline"] += 1
+            return True
+
+    def acquire(self, tenant: str, priority: str, timeout: Optional[float] = None, fan_out: bool = False) -> _Ticket:
+        """Block until the call gets a slot; raises SchedulerRejected on quota or timeout."""
+        ticket = self._enqueue(tenant, priority, fan_out)
+        with self._lock:
+            if ticket.granted:
+                return ticket
+            ticket.event = threading.Event()
+        if not ticket.event.wait(timeout) and self._abandon(ticket):
+            raise SchedulerRejected(f"no {self.name} slot free within {timeout:.1f}s")
+        return ticket
+
+    async def aacquire(self, tenant: str, priority: str, timeout: Optional[float] = None,
+                       fan_out: bool = False) -> _Ticket:
+        """Async version of acquire; waits on the event loop."""
+        ticket = self._enqueue(tenant, priority, fan_out)
+        with self._lock:
+            if ticket.granted:
+                return ticket
+            ticket.loop = asyncio.get_running_loop()
+            ticket.future = ticket.loop.create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if not self._abandon(ticket):
+                self._release(ticket)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise SchedulerRejected(f"no {self.name} slot free within {timeout:.1f}s") from None
+        return ticket
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for the current tenant while the block runs, queueing at most until the deadline."""
+        tenant, priority = current_tenant()
+        ticket = self.acquire(tenant, priority, remaining_time(), _fan_out.get())
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    @asynccontextmanager
+    async def aslot(self):
+        """Async version of slot."""
+        tenant, priority = current_tenant()
+        ticket = await self.aacquire(tenant, priority, remaining_time(), _fan_out.get())
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    def report(self) -> dict:
+        """Slots in use, queue length, and per-class grants and queue-wait percentiles."""
+        with self._lock:
+            waits = {priority: sorted(samples) for priority, samples in self._waits.items()}
+            report = {
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiting),
+                "rejected": dict(self.rejected),
+                "classes": {}
+            }
+            for priority, count in self.granted.items():
+                samples = waits.get(priority) or [0.0]
+                report["classes"][priority] = {
+                    "granted": count,
+                    "p50_wait_seconds": round(samples[len(samples) // 2], 3),
+                    "p95_wait_seconds": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 3)
+                }
+        return report
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+_current_tenant: ContextVar[Tuple[str, str]] = ContextVar("tenant", default=(DEFAULT_TENANT, INTERACTIVE))
+
+
+@contextmanager
+def tenant_scope(tenant: str, priority: str = INTERACTIVE):
+    """Queue every LLM and tool call made inside the block as this tenant and priority class."""
+    token = _current_tenant.set((tenant or DEFAULT_TENANT, priority))
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+
+def current_tenant() -> Tuple[str, str]:
+    """(tenant, priority) of the current request."""
+    return _current_tenant.get()
+
+
+_fan_out: ContextVar[bool] = ContextVar("fan_out", default=False)
+
+
+@contextmanager
+def fan_out_scope():
+    """Let the calls a request fans out inside the block use the whole pool instead of the per-tenant cap.
+
+    They still queue in fair order with every other tenant's calls, and batch
+    calls still leave the interactive reserve free.
+    """
+    token = _fan_out.set(True)
+    try:
+        yield
+    finally:
+        _fan_out.reset(token)
+
+
+_schedulers: Dict[str, FairShareScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def _pool_settings(name: str) -> dict:
+    # e.g. LLM_CONCURRENCY / LOCAL_LLM_CONCURRENCY and TENANT_LLM_CALLS_PER_MINUTE
+    return {
+        "capacity": int(os.getenv(f"{name.upper()}_CONCURRENCY", str(DEFAULT_CAPACITY.get(name, 8)))),
+        "tenant_limit": int(os.getenv("TENANT_MAX_CONCURRENCY", "4")),
+        "quota_per_minute": int(os.getenv(f"TENANT_{name.upper()}_CALLS_PER_MINUTE", "0"))
+    }
+
+
+def get_scheduler(name: str) -> FairShareScheduler:
+    """Scheduler shared by every call in the named pool, configured from the environment."""
+    with _schedulers_lock:
+        if name not in _schedulers:
+            _schedulers[name] = FairShareScheduler(name, **_pool_settings(name))
+        return _schedulers[name]
+
+
+def set_scheduler(name: str, scheduler: FairShareScheduler):
+    """Replace a pool's scheduler, e.g. with different capacity in a benchmark."""
+    with _schedulers_lock:
+        _schedulers[name] = scheduler
+
+
+def scheduler_report() -> Dict[str, dict]:
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+    return {name: scheduler.report() for name, scheduler in schedulers.items()}
@@ -1,78 +1,93 @@
 """
 Custom LangChain tool for fetching news from GNews API
 """
-from typing import Optional, Type
-from langchain.tools import BaseTool
+from typing import List, Optional, Type, Union
 from pydantic import BaseModel, Field
+from tools.base import ResearchTool
+from tools.records import ResearchRecord, parse_timestamp
+from tools.research_window import current_window
+import httpx
 import requests
 import os
 
+# GNews API endpoint
+SEARCH_URL = "https://gnews.io/api/v4/search"
+
 
 class GNewsSearchInput(BaseModel):
     """Input for GNews search tool."""
     query: str = Field(description="Search keywords for news articles")
 
 
-class GNewsSearchTool(BaseTool):
+class GNewsSearchTool(ResearchTool):
     """Tool for searching news articles using GNews API."""
     
     name: str = "gnews_search"
     description: str = "Search for recent news articles using keywords. Returns top 3-5 relevant articles with titles and summaries."
     args_schema: Type[BaseModel] = GNewsSearchInput
+    default_timeout: float = 10
     api_key: str
     
     def __init__(self, api_key: str):
         super().__init__(api_key=api_key)
     
-    def _run(self, query: str) -> str:
-        """Execute the news search."""
+    def _params(self, query: str) -> dict:
+        params = {
+            'q': query,
+            'token': self.api_key,
+            'lang': 'en',
+            'country': 'us',
+            'max': 5,  # Get top 5 articles
+            'sortby': 'relevance'
+        }
+        # Only articles published since the last run for this field
+        window = current_window()
+        if window is not None and window.since:
+            params['from'] = window.since_iso()
+            params['sortby'] = 'publishedAt'
+        return params
+    
+    def _search(self, query: str, timeout: Optional[float] = None) -> Union[List[ResearchRecord], str]:
+        """Search GNews with a per-attempt timeout."""
         try:
-            # GNews API endpoint
-            url = "https://gnews.io/api/v4/search"
-            
-            params = {
-                'q': query,
-                'token': self.api_key,
-                'lang': 'en',
-                'country': 'us',
-                'max': 5,  # Get top 5 articles
-                'sortby': 'relevance'
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
+            response = requests.get(SEARCH_URL, params=self._params(query), timeout=timeout or 10)
             response.raise_for_status()
-            
-            data = response.json()
-            articles = data.get('articles', [])
-            
-            if not articles:
-                return f"No news articles found for query: {query}"
-            
-            # Format the results
-            formatted_results = []
-            for i, article in enumerate(articles[:5], 1):
-                title = article.get('title', 'No title')
-                description = article.get('description', 'No description')
-                url = article.get('url', '')
-                published_at = article.get('publishedAt', '')
-                
-                formatted_article = f"""
-Article {i}:
-Title: {title}
-Description: {description}
-Published: {published_at}
-URL: {url}
-"""
-                formatted_results.append(formatted_article)
-            
-            return "\n".join(formatted_results)
+            return self._parse(query, response.json())
             
         except requests.exceptions.RequestException as e:
             return f"Error fetching news: {str(e)}"
         except Exception as e:
             return f"Unexpected error: {str(e)}"
     
-    async def _arun(self, query: str) -> str:
-        """Async version of the tool."""
-        # For simplicity, we'll use the sync version
-        return self._run(query)
+    async def _asearch(self, query: str, timeout: Optional[float] = None) -> Union[List[ResearchRecord], str]:
+        """Search GNews without holding a thread while the request is in flight."""
+        try:
+            async with httpx.AsyncClient(timeout=timeout or 10) as client:
+                response = await client.get(SEARCH_URL, params=self._params(query))
+                response.raise_for_status()
+            return self._parse(query, response.json())
+            
+        except httpx.HTTPError as e:
+            return f"Error fetching news: {str(e)}"
+        except Exception as e:
+            return f"Unexpected error: {str(e)}"
+    
+    def _parse(self, query: str, data: dict) -> Union[List[ResearchRecord], str]:
+        articles = data.get('articles', [])
+        
+        if not articles:
+            return f"No news articles found for query: {query}"
+        
+        records = []
+        for article in articles[:5]:
+            records.append(ResearchRecord(
+                source=self.name,
+                kind="article",
+                title=article.get('title', 'No title'),
+                url=article.get('url', ''),
+                text=article.get('description') or '',
+                author=(article.get('source') or {}).get('name', ''),
+                published=parse_timestamp(article.get('publishedAt', ''))
+            ))
+        
+        return records
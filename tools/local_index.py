@@ -0,0 +1,232 @@
+"""
+Local Index - BM25 search over everything earlier research runs fetched, persisted as an append-only log
+
+    python -m tools.local_index stats
+    python -m tools.local_index search "ai triage hospitals"
+
+Log layout: a sequence of segments, each a u32 length followed by a
+zlib-compressed records_to_bytes() payload. Replaying the log rebuilds the
+in-memory postings; a later copy of a document replaces the earlier one.
+
+Documents added with a tenant (finished posts) are private to it: only
+searches for that tenant see them, they stay in memory, out of the log, and
+they are dropped with purge_tenant() when the tenant's session is evicted.
+"""
+import hashlib
+import heapq
+import math
+import os
+import struct
+import sys
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tools.records import ResearchRecord, records_from_bytes, records_to_bytes
+from tools.wikipedia_index import tokenize
+
+_SEGMENT = struct.Struct("<I")
+# Records per segment when the log is rewritten
+COMPACT_SEGMENT_RECORDS = 500
+
+
+def document_key(record: ResearchRecord) -> str:
+    """URL/title key, or a digest of the text for records with neither (e.g. search answers)."""
+    return record.key or "text:" + hashlib.sha1(record.text.encode("utf-8")).hexdigest()[:16]
+
+
+class LocalIndex:
+    """In-memory BM25 inverted index over ResearchRecords, mirrored to an append-only log on disk.
+
+    Title tokens count `title_weight` times. The oldest shared documents are
+    dropped past `max_docs`, and the log is rewritten without superseded or
+    dropped copies once they outnumber the live ones. Tenant-owned documents
+    are keyed per tenant, never logged, filtered out of other tenants'
+    searches, and not counted toward `max_docs`; they live until purge_tenant().
+    """
+
+    def __init__(self, path: Optional[str] = None, max_docs: int = 20000,
+                 k1: float = 1.2, b: float = 0.75, title_weight: int = 2):
+        self.path = path
+        self.max_docs = max_docs
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._docs: "OrderedDict[str, ResearchRecord]" = OrderedDict()
+        self._terms: Dict[str, tuple] = {}  # key -> distinct terms, for removal
+        self._lengths: Dict[str, int] = {}
+        self._owners: Dict[str, str] = {}  # key -> tenant, for tenant-private documents
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._logged = 0
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + _SEGMENT.size <= len(data):
+            (length,) = _SEGMENT.unpack_from(data, offset)
+            offset += _SEGMENT.size
+            try:
+                records = records_from_bytes(zlib.decompress(data[offset:offset + length]))
+            except (zlib.error, ValueError, struct.error, IndexError):
+                break  # A torn write at the end of the log
+            offset += length
+            for record in records:
+                # Posts logged before they became tenant-private have no owner left to match
+                if record.kind != "post":
+                    self._insert(record)
+            self._logged += len(records)
+
+    def _insert(self, record: ResearchRecord, tenant: Optional[str] = None) -> bool:
+        """Index one record; False if an identical copy is already indexed."""
+        key = document_key(record)
+        if tenant is not None:
+            key = f"{tenant}|{key}"
+        existing = self._docs.get(key)
+        if existing is not None:
+            if existing.text == record.text and existing.title == record.title:
+                self._docs.move_to_end(key)
+                return False
+            self._remove(key)
+
+        terms = Counter(tokenize(record.text))
+        for token in tokenize(record.title):
+            terms[token] += self.title_weight
+        self._docs[key] = record
+        if tenant is not None:
+            self._owners[key] = tenant
+        self._terms[key] = tuple(terms)
+        self._lengths[key] = sum(terms.values())
+        self._total_length += self._lengths[key]
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[key] = count
+
+        while self._shared_count() > self.max_docs:
+            self._remove(next(key for key in self._docs if key not in self._owners))
+        return True
+
+    def _shared_count(self) -> int:
+        return len(self._docs) - len(self._owners)
+
+    def _remove(self, key: str):
+        self._docs.pop(key)
+        self._owners.pop(key, None)
+        terms = self._terms.pop(key)
+        self._total_length -= self._lengths.pop(key)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+
+    def add(self, records: Iterable[ResearchRecord], tenant: Optional[str] = None) -> int:
+        """Index new or changed records and append them to the log; returns how many were added.
+
+        With a tenant the records are private to it and are not logged.
+        """
+        records = [record for record in records if record.text or record.title]
+        with self._lock:
+            self._ensure_loaded()
+            added = [record for record in records if self._insert(record, tenant)]
+            if added and self.path and tenant is None:
+                self._append(added)
+                if self._logged > 2 * self._shared_count() + COMPACT_SEGMENT_RECORDS:
+                    self._compact()
+        return len(added)
+
+    def purge_tenant(self, tenant: str) -> int:
+        """Drop every document private to the tenant, e.g. once its session is evicted; returns how many."""
+        with self._lock:
+            keys = [key for key, owner in self._owners.items() if owner == tenant]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def _append(self, records: List[ResearchRecord]):
+        payload = zlib.compress(records_to_bytes(records), 6)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(_SEGMENT.pack(len(payload)) + payload)
+            self._logged += len(records)
+        except OSError:
+            pass
+
+    def _compact(self):
+        """Rewrite the log with only the live, shared documents."""
+        docs = [record for key, record in self._docs.items() if key not in self._owners]
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                for start in range(0, len(docs), COMPACT_SEGMENT_RECORDS):
+                    payload = zlib.compress(records_to_bytes(docs[start:start + COMPACT_SEGMENT_RECORDS]), 6)
+                    f.write(_SEGMENT.pack(len(payload)) + payload)
+            os.replace(tmp_path, self.path)
+            self._logged = len(docs)
+        except OSError:
+            pass
+
+    def search(self, query: str, limit: int = 5, min_coverage: float = 0.0,
+               tenant: Optional[str] = None) -> List[Tuple[float, ResearchRecord]]:
+        """Top documents by BM25 score, best first, among those containing at least
+        `min_coverage` of the query's distinct terms. Shared documents and the
+        given tenant's own are searched; other tenants' are skipped."""
+        terms = set(tokenize(query))
+        with self._lock:
+            self._ensure_loaded()
+            count = len(self._docs)
+            if not count or not terms:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[str, float] = {}
+            matched: Counter = Counter()
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[key] / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    matched[key] += 1
+            needed = min_coverage * len(terms)
+            candidates = ((key, score) for key, score in scores.items()
+                          if matched[key] >= needed and self._owners.get(key, tenant) == tenant)
+            best = heapq.nlargest(limit, candidates, key=lambda item: item[1])
+            return [(score, self._docs[key]) for key, score in best]
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._ensure_loaded()
+            size = os.path.getsize(self.path) if self.path and os.path.exists(self.path) else 0
+            return {"documents": len(self._docs), "private_documents": len(self._owners), "terms": len(self._postings),
+                    "logged_records": self._logged, "log_bytes": size}
+
+
+# Process-wide index fed by every research tool, plus each tenant's finished posts
+local_index = LocalIndex(path=os.getenv("LOCAL_INDEX_PATH", ".local_index/records.log") or None)
+
+
+def main(argv: List[str]):
+    if len(argv) >= 2 and argv[0] == "search":
+        for score, record in local_index.search(" ".join(argv[1:]), limit=10):
+            print(f"{score:6.2f}  [{record.kind}] {record.title[:70]}  {record.url}")
+    elif argv[:1] == ["stats"]:
+        print(local_index.stats())
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,46 @@
+"""
+Local Search Tool - BM25 search over articles, summaries and posts saved from earlier runs
+"""
+from typing import List, Optional, Type, Union
+from pydantic import BaseModel, Field
+from tools.base import ResearchTool
+from tools.fair_share import current_tenant
+from tools.local_index import local_index
+from tools.records import ResearchRecord
+
+
+class LocalSearchInput(BaseModel):
+    """Input for local search tool."""
+    query: str = Field(description="Search query for previously researched content")
+
+
+class LocalSearchTool(ResearchTool):
+    """Tool that answers from the local index of earlier research, with no API call."""
+    
+    name: str = "local_search"
+    description: str = "Search articles, summaries and LinkedIn posts saved from earlier research runs. Instant and free, but only covers what was fetched before; best for repeat or closely related queries."
+    args_schema: Type[BaseModel] = LocalSearchInput
+    default_timeout: float = 2
+    # Share of the query's terms a saved document must contain to count as a hit
+    min_coverage: float = 0.6
+    max_results: int = 5
+    # Its hits are already in the index
+    index_results: bool = False
+    
+    def _search(self, query: str, timeout: Optional[float] = None) -> Union[List[ResearchRecord], str]:
+        """Search the local index (shared research plus this tenant's own posts); a miss says so,
+        so the agent can fall back to a live tool."""
+        tenant, _ = current_tenant()
+        hits = [record for _, record in local_index.search(query, self.max_results, self.min_coverage, tenant)]
+        if not hits:
+            return f"No local results for query: {query}. Use a live search tool."
+        
+        return [
+            ResearchRecord(self.name, record.kind, record.title, record.url, record.text,
+                           record.author or record.source, record.published, record.duration, record.views, record.score)
+            for record in hits
+        ]
+    
+    async def _asearch(self, query: str, timeout: Optional[float] = None) -> Union[List[ResearchRecord], str]:
+        # In-memory lookup; no need for a worker thread
+        return self._search(query, timeout)
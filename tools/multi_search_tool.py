@@ -0,0 +1,99 @@
+"""
+Multi-Query Search Tool - Runs several focused sub-queries across tools at once and fuses the hits
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, List, Type
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field
+from tools.article_text import enrich_records, enrichment_top
+from tools.base import ENRICHED_TEXT_LIMIT, ResearchTool
+from tools.fair_share import fan_out_scope
+from tools.local_index import local_index
+from tools.records import records_to_prompt, reciprocal_rank_fusion
+
+MAX_QUERIES = 5
+MAX_RESULTS = 10
+
+# Outer fan-out only; each search still runs under its own tool's deadline pool and breaker
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="multi-search")
+
+
+class MultiQuerySearchInput(BaseModel):
+    """Input for multi-query search tool."""
+    queries: List[str] = Field(description=f"2-{MAX_QUERIES} short, focused search queries, each covering a different aspect")
+
+
+class MultiQuerySearchTool(BaseTool):
+    """Search every sub-query on every underlying tool concurrently, then merge with reciprocal-rank fusion.
+
+    One (tool, query) pair is one ranked list; results found by several
+    pairs rank highest and duplicate URLs collapse into one record. The
+    sub-queries come from the research agent's own tool call, so expansion
+    costs no extra model round trip.
+    """
+
+    name: str = "multi_search"
+    description: str = ("Search several focused sub-queries at once across web and news search and merge the results. "
+                        "Best for broad or vague fields (e.g. \"Finance\") where one literal query returns shallow, overlapping hits.")
+    args_schema: Type[BaseModel] = MultiQuerySearchInput
+    tools: List[Any] = Field(default_factory=list, exclude=True)
+    max_results: int = MAX_RESULTS
+    enrich_top: int = Field(default_factory=enrichment_top)
+
+    def __init__(self, tools: List[ResearchTool]):
+        super().__init__(tools=tools)
+
+    def _pairs(self, queries: List[str]) -> list:
+        queries = list(dict.fromkeys(query.strip() for query in queries if query and query.strip()))[:MAX_QUERIES]
+        return [(tool, query) for query in queries for tool in self.tools]
+
+    def _run(self, queries: List[str]) -> str:
+        """Run every (tool, query) search on the fan-out pool and render the fused records."""
+        pairs = self._pairs(queries)
+        # One deliberate wave: the searches may use the whole tools pool, not just this tenant's share
+        with fan_out_scope():
+            futures = [
+                _executor.submit(copy_context().run, lambda tool=tool, query=query: tool._windowed(query, tool.search_records(query)))
+                for tool, query in pairs
+            ]
+        results = [future.result() for future in futures]
+
+        fused = self._fuse(results)
+        if isinstance(fused, str):
+            return fused
+        enriched = enrich_records(fused, self.enrich_top) if self.enrich_top else 0
+        local_index.add(fused)
+        return self._render(pairs, results, fused, enriched)
+
+    async def _arun(self, queries: List[str]) -> str:
+        """Async version of the tool."""
+        pairs = self._pairs(queries)
+        with fan_out_scope():
+            results = await asyncio.gather(*(self._asearch(tool, query) for tool, query in pairs))
+
+        fused = self._fuse(results)
+        if isinstance(fused, str):
+            return fused
+        enriched = await asyncio.to_thread(enrich_records, fused, self.enrich_top) if self.enrich_top else 0
+        await asyncio.to_thread(local_index.add, fused)
+        return self._render(pairs, results, fused, enriched)
+
+    @staticmethod
+    async def _asearch(tool: ResearchTool, query: str):
+        return tool._windowed(query, await tool.asearch_records(query))
+
+    def _fuse(self, results: list):
+        ranked = [result for result in results if not isinstance(result, str)]
+        if not ranked:
+            # Every search failed or found nothing; pass on the first reason
+            return results[0] if results else "Error: multi_search needs at least one query"
+        return reciprocal_rank_fusion(ranked, limit=self.max_results)
+
+    def _render(self, pairs: list, results: list, fused: list, enriched: int) -> str:
+        queries = list(dict.fromkeys(query for _, query in pairs))
+        hits = sum(len(result) for result in results if not isinstance(result, str))
+        header = (f"[multi_search: {len(queries)} queries x {len(self.tools)} tools, "
+                  f"{hits} hits fused into {len(fused)} unique results]\nQueries: {'; '.join(queries)}")
+        return f"{header}\n{records_to_prompt(fused, text_limit=ENRICHED_TEXT_LIMIT if enriched else 300)}"
@@ -0,0 +1,239 @@
+"""
+Research Records - Compact typed results shared by every research tool
+"""
+import re
+import struct
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+KINDS = ("article", "web", "answer", "video", "wiki", "post")
+_NUMERIC_FIELDS = ("published", "duration", "views", "score")
+# Query parameters that only track the click, dropped from URL keys
+_TRACKING_PREFIXES = ("utm_",)
+_TRACKING_PARAMS = frozenset(("fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "ref_src"))
+
+
+class ResearchRecord:
+    """One search hit. Slots keep each record to a few hundred bytes."""
+
+    __slots__ = ("source", "kind", "title", "url", "text", "author", "published", "duration", "views", "score")
+
+    def __init__(self, source: str, kind: str, title: str = "", url: str = "", text: str = "",
+                 author: str = "", published: float = 0.0, duration: int = 0, views: int = 0, score: float = 0.0):
+        self.source = source
+        self.kind = kind
+        self.title = title
+        self.url = url
+        self.text = text
+        self.author = author
+        self.published = published
+        self.duration = duration
+        self.views = views
+        self.score = score
+
+    @property
+    def key(self) -> str:
+        """Identity used for dedupe: normalized URL, else the lowercased title."""
+        return normalize_url(self.url) or self.title.strip().lower()
+
+    @property
+    def numeric(self) -> array:
+        """(published, duration, views, score) as a float array."""
+        return array("d", (self.published, self.duration, self.views, self.score))
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"ResearchRecord({self.source!r}, {self.kind!r}, {self.title[:40]!r})"
+
+
+def normalize_url(url: str) -> str:
+    """Scheme-, www- and tracking-parameter-insensitive URL key.
+
+    The rest of the query is kept: it often names the page itself
+    (YouTube's watch?v=, ?id=, ?p=).
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(_TRACKING_PREFIXES) and name.lower() not in _TRACKING_PARAMS
+    )
+    key = host + parts.path.rstrip("/")
+    return f"{key}?{urlencode(query)}" if query else key
+
+
+def dedupe(records: Iterable[ResearchRecord]) -> List[ResearchRecord]:
+    """Drop later records whose key was already seen."""
+    seen = set()
+    unique = []
+    for record in records:
+        key = record.key
+        if key and key in seen:
+            continue
+        seen.add(key)
+        unique.append(record)
+    return unique
+
+
+def reciprocal_rank_fusion(ranked_lists: Iterable[List[ResearchRecord]], k: int = 60,
+                           limit: Optional[int] = None) -> List[ResearchRecord]:
+    """Merge ranked hit lists: each record scores sum(1 / (k + rank)) over the lists it appears in.
+
+    Duplicates (by key) collapse into one record, the copy with the longest
+    text. Records found by several lists rise to the top; ties keep the
+    order in which they were first seen.
+    """
+    scores: Dict[str, float] = {}
+    best: Dict[str, ResearchRecord] = {}
+    for records in ranked_lists:
+        for rank, record in enumerate(records, 1):
+            key = record.key
+            if not key:
+                continue
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            if key not in best or len(record.text) > len(best[key].text):
+                best[key] = record
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return [best[key] for key in fused[:limit]]
+
+
+def numeric_columns(records: List[ResearchRecord]) -> Dict[str, array]:
+    """Column-wise float arrays of the numeric fields, for ranking and stats."""
+    return {name: array("d", (getattr(record, name) for record in records)) for name in _NUMERIC_FIELDS}
+
+
+# --- Parsing helpers used by the tools ---
+
+def parse_timestamp(value: str) -> float:
+    """ISO-8601 timestamp to epoch seconds (0.0 if missing or unparseable)."""
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+_AGE_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 604800,
+              "month": 2629800, "year": 31557600}
+
+
+def parse_relative_age(value: str, now: Optional[float] = None) -> float:
+    """'3 weeks ago' style ages to an approximate epoch timestamp."""
+    match = re.search(r"(\d+)\s+(second|minute|hour|day|week|month|year)", value or "")
+    if not match:
+        return 0.0
+    return (now or time.time()) - int(match.group(1)) * _AGE_UNITS[match.group(2)]
+
+
+def parse_duration(value) -> int:
+    """'1:02:03' / '12:34' / 754 to seconds."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    seconds = 0
+    for part in str(value or "").split(":"):
+        if not part.strip().isdigit():
+            return 0
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def parse_count(value) -> int:
+    """'1,234,567 views' to 1234567."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = re.sub(r"[^\d]", "", str(value or ""))
+    return int(digits) if digits else 0
+
+
+# --- Serializers ---
+
+def _format_date(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d") if timestamp else ""
+
+
+def _format_duration(seconds: int) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def records_to_prompt(records: List[ResearchRecord], text_limit: int = 300) -> str:
+    """Compact prompt text: one short block per record, with labels only where they carry meaning."""
+    lines = []
+    index = 0
+    for record in records:
+        if record.kind == "answer":
+            lines.append(f"Summary: {record.text}")
+            continue
+
+        index += 1
+        meta = [part for part in (
+            record.author,
+            _format_date(record.published),
+            _format_duration(record.duration) if record.duration else "",
+            f"{record.views:,} views" if record.views else ""
+        ) if part]
+        header = f"[{index}] {record.title}" + (f" ({', '.join(meta)})" if meta else "")
+        lines.append(header)
+
+        text = record.text
+        if text:
+            lines.append(text[:text_limit] + ("..." if len(text) > text_limit else ""))
+        if record.url:
+            lines.append(record.url)
+    return "\n".join(lines)
+
+
+_RECORD_HEADER = struct.Struct("<BBdIQd")
+_MAGIC = b"RR1"
+
+
+def records_to_bytes(records: List[ResearchRecord]) -> bytes:
+    """Binary encoding for caches: fixed numeric header plus length-prefixed UTF-8 strings."""
+    parts = [_MAGIC, struct.pack("<I", len(records))]
+    for record in records:
+        source = record.source.encode("utf-8")
+        parts.append(_RECORD_HEADER.pack(
+            len(source), KINDS.index(record.kind), record.published, record.duration, record.views, record.score
+        ))
+        parts.append(source)
+        for value in (record.title, record.url, record.text, record.author):
+            encoded = value.encode("utf-8")
+            parts.append(struct.pack("<I", len(encoded)))
+            parts.append(encoded)
+    return b"".join(parts)
+
+
+def records_from_bytes(data: bytes) -> List[ResearchRecord]:
+    """Inverse of records_to_bytes."""
+    if data[:3] != _MAGIC:
+        raise ValueError("Not a research record payload")
+    view = memoryview(data)
+    (count,) = struct.unpack_from("<I", view, 3)
+    offset = 7
+    records = []
+    for _ in range(count):
+        source_length, kind, published, duration, views, score = _RECORD_HEADER.unpack_from(view, offset)
+        offset += _RECORD_HEADER.size
+        source = bytes(view[offset:offset + source_length]).decode("utf-8")
+        offset += source_length
+        strings = []
+        for _ in range(4):
+            (length,) = struct.unpack_from("<I", view, offset)
+            offset += 4
+            strings.append(bytes(view[offset:offset + length]).decode("utf-8"))
+            offset += length
+        title, url, text, author = strings
+        records.append(ResearchRecord(source, KINDS[kind], title, url, text, author,
+                                      published, duration, views, score))
+    return records
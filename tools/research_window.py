@@ -0,0 +1,73 @@
+"""
+Research Window - Limit research to items published after a point in time
+"""
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from tools.records import ResearchRecord, normalize_url
+
+
+class ResearchWindow:
+    """Lower bound on publish time plus the URLs already analyzed.
+
+    Tools pass it to APIs that filter by date, and every tool drops records
+    that fall outside it. The URLs of the records let through are collected
+    so the next run can skip them too; `kept` counts every record let
+    through, including URL-less ones such as answers and wiki summaries.
+    """
+
+    def __init__(self, since: Optional[float] = None, seen_urls: Iterable[str] = ()):
+        self.since = since
+        self.seen = {normalize_url(url) for url in seen_urls if url}
+        self.collected = set()
+        self.kept = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def keep(self, records: List[ResearchRecord]) -> List[ResearchRecord]:
+        """Records not seen before and not published before `since`; undated records pass."""
+        kept = []
+        with self._lock:
+            for record in records:
+                url = normalize_url(record.url)
+                if (url and url in self.seen) or (self.since and record.published and record.published < self.since):
+                    self.dropped += 1
+                    continue
+                if url:
+                    self.collected.add(url)
+                kept.append(record)
+            self.kept += len(kept)
+        return kept
+
+    def since_iso(self) -> Optional[str]:
+        """`since` as an ISO-8601 UTC timestamp, e.g. for GNews' `from` parameter."""
+        if not self.since:
+            return None
+        return datetime.fromtimestamp(self.since, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def since_date(self) -> Optional[str]:
+        """`since` as a YYYY-MM-DD date, for APIs that filter by day."""
+        if not self.since:
+            return None
+        return datetime.fromtimestamp(self.since, timezone.utc).strftime("%Y-%m-%d")
+
+
+_current_window: ContextVar[Optional[ResearchWindow]] = ContextVar("research_window", default=None)
+
+
+@contextmanager
+def research_window(window: ResearchWindow):
+    """Apply the window to every research tool called inside the block."""
+    token = _current_window.set(window)
+    try:
+        yield window
+    finally:
+        _current_window.reset(token)
+
+
+def current_window() -> Optional[ResearchWindow]:
+    """The active research window, or None outside any window."""
+    return _current_window.get()
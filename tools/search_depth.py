@@ -0,0 +1,134 @@
+"""
+Search Depth - Local quality score for basic-depth results and a log of depth decisions
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+# Words that say nothing about whether a result covers the query
+_STOPWORDS = frozenset("""
+a an and are as at be by for from how in into is it of on or the to what when where which who why with
+latest new news recent trends trend top best vs
+""".split())
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.-]*")
+
+# Weights of the three signals in the quality score
+COVERAGE_WEIGHT = 0.5
+ANSWER_WEIGHT = 0.2
+COUNT_WEIGHT = 0.3
+MIN_ANSWER_CHARS = 40
+
+# Tavily bills advanced searches at twice the credits of basic ones
+CREDITS = {"basic": 1, "advanced": 2}
+
+
+def query_terms(query: str) -> set:
+    """Lowercased content words of a query."""
+    return {word.strip(".") for word in _WORD.findall(query.lower()) if word not in _STOPWORDS and len(word) > 2}
+
+
+def score_response(query: str, response: Optional[dict], max_results: int = 5) -> dict:
+    """How good a search response looks without asking a model, from 0 to 1.
+
+    - coverage: share of the query's content words found in the result titles and snippets
+    - answer: whether a usable summary answer came back
+    - count: results returned, relative to the number asked for
+    """
+    results = (response or {}).get("results") or []
+    terms = query_terms(query)
+    text = " ".join(f"{result.get('title', '')} {result.get('content', '')}" for result in results).lower()
+    found = set(word.strip(".") for word in _WORD.findall(text))
+    coverage = len(terms & found) / len(terms) if terms else (1.0 if results else 0.0)
+    answer = 1.0 if len((response or {}).get("answer") or "") >= MIN_ANSWER_CHARS else 0.0
+    count = min(1.0, len(results) / max_results) if max_results else 0.0
+    return {
+        "coverage": coverage,
+        "answer": answer,
+        "count": count,
+        "score": COVERAGE_WEIGHT * coverage + ANSWER_WEIGHT * answer + COUNT_WEIGHT * count
+    }
+
+
+class DepthDecisions:
+    """Recent per-query depth decisions: the basic result's score, whether it escalated, and what each call cost."""
+
+    def __init__(self, max_samples: int = 500):
+        self._lock = threading.Lock()
+        self._decisions = deque(maxlen=max_samples)
+
+    def record(self, query: str, depth: str, score: Optional[float], basic_seconds: Optional[float],
+               advanced_seconds: Optional[float], adaptive: bool = True):
+        """Record one search: the depth its records came from and the latency of each call made.
+
+        Searches in a fixed depth mode pass adaptive=False; they count toward
+        latencies but not toward escalations or savings.
+        """
+        with self._lock:
+            self._decisions.append({
+                "query": query,
+                "depth": depth,
+                "adaptive": adaptive,
+                "score": score,
+                "basic_seconds": basic_seconds,
+                "advanced_seconds": advanced_seconds,
+                "at": time.time()
+            })
+
+    def recent(self, limit: int = 20) -> list:
+        with self._lock:
+            return list(self._decisions)[-limit:]
+
+    def report(self) -> dict:
+        """Escalation rate, mean latencies, and the seconds and credits saved versus always searching advanced."""
+        with self._lock:
+            decisions = list(self._decisions)
+
+        adaptive = [d for d in decisions if d["adaptive"]]
+        fixed = [d for d in decisions if not d["adaptive"]]
+        escalated = [d for d in adaptive if d["advanced_seconds"] is not None]
+        advanced = [d["advanced_seconds"] for d in decisions if d["advanced_seconds"] is not None]
+        mean_advanced = sum(advanced) / len(advanced) if advanced else None
+
+        # A basic-only search saved an advanced call; an escalated one added a basic call
+        seconds_saved = 0.0
+        if mean_advanced is not None:
+            for d in adaptive:
+                if d["advanced_seconds"] is None:
+                    seconds_saved += mean_advanced - d["basic_seconds"]
+                else:
+                    seconds_saved -= d["basic_seconds"]
+        credits_used = sum(CREDITS["basic"] + (CREDITS["advanced"] if d["advanced_seconds"] is not None else 0)
+                           for d in adaptive)
+
+        return {
+            "searches": len(decisions),
+            "adaptive": len(adaptive),
+            "fixed": len(fixed),
+            "escalated": len(escalated),
+            "escalation_rate": len(escalated) / len(adaptive) if adaptive else 0.0,
+            "mean_basic_seconds": sum(d["basic_seconds"] for d in adaptive) / len(adaptive) if adaptive else None,
+            "mean_advanced_seconds": mean_advanced,
+            "estimated_seconds_saved": seconds_saved,
+            "credits_saved": len(adaptive) * CREDITS["advanced"] - credits_used
+        }
+
+    def reset(self):
+        with self._lock:
+            self._decisions.clear()
+
+
+def search_depth_mode() -> str:
+    """TAVILY_SEARCH_DEPTH: "adaptive" (basic, escalating when weak), "basic" or "advanced"."""
+    return os.getenv("TAVILY_SEARCH_DEPTH", "adaptive").strip().lower()
+
+
+def escalate_below() -> float:
+    """Basic results scoring under this (TAVILY_ESCALATE_BELOW) are retried at advanced depth."""
+    return float(os.getenv("TAVILY_ESCALATE_BELOW", "0.6"))
+
+
+# Process-wide decisions shared by every Tavily tool instance
+depth_decisions = DepthDecisions()
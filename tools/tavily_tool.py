@@ -1,11 +1,23 @@
 """
 Tavily Search Tool - Primary web search tool for comprehensive research
 """
-from typing import Optional, Type
-from langchain.tools import BaseTool
+from typing import List, Optional, Type, Union
 from pydantic import BaseModel, Field
-from tavily import TavilyClient
+from tools.base import ResearchTool
+from tools.records import ResearchRecord, parse_timestamp
+from tools.research_window import current_window
+from tools.search_depth import depth_decisions, escalate_below, score_response, search_depth_mode
+from tavily import AsyncTavilyClient, TavilyClient
 import os
+import time
+
+SEARCH_OPTIONS = {
+    "max_results": 5,
+    "include_answer": True,
+    "include_raw_content": False
+}
+# Leave an escalated search at least this long, or keep the basic results
+MIN_ESCALATION_SECONDS = 2.0
 
 
 class TavilySearchInput(BaseModel):
@@ -13,62 +25,132 @@ class TavilySearchInput(BaseModel):
     query: str = Field(description="Search query for web content")
 
 
-class TavilySearchTool(BaseTool):
-    """Tool for comprehensive web searches using Tavily API."""
+class TavilySearchTool(ResearchTool):
+    """Tool for comprehensive web searches using Tavily API.
+    
+    In the default "adaptive" depth mode a query is searched at basic depth
+    first, and only retried at advanced depth when the basic results score
+    below `escalate_score` (see tools/search_depth.py).
+    """
     
     name: str = "tavily_search"
     description: str = "Search the web for comprehensive information, articles, tutorials, and expert opinions. Best for general questions, lists, explanations, and evergreen content."
     args_schema: Type[BaseModel] = TavilySearchInput
+    default_timeout: float = 30
     api_key: str
+    depth_mode: str = Field(default_factory=search_depth_mode)
+    escalate_score: float = Field(default_factory=escalate_below)
     
     def __init__(self, api_key: str):
         super().__init__(api_key=api_key)
     
-    def _run(self, query: str) -> str:
-        """Execute the web search."""
+    def _search(self, query: str, timeout: Optional[float] = None) -> Union[List[ResearchRecord], str]:
+        """Search Tavily with a per-attempt timeout."""
         try:
             # Create client for this search
             client = TavilyClient(api_key=self.api_key)
             
-            # Perform search with Tavily
-            response = client.search(
-                query=query,
-                search_depth="advanced",
-                max_results=5,
-                include_answer=True,
-                include_raw_content=False
-            )
-            
-            if not response or 'results' not in response:
-                return f"No search results found for query: {query}"
-            
-            # Format the results
-            formatted_results = []
+            if self.depth_mode != "adaptive":
+                start = time.monotonic()
+                response = client.search(query=query, timeout=timeout or 60, **self._options(self.depth_mode))
+                self._record_fixed(query, time.monotonic() - start)
+                return self._parse(query, response)
             
-            # Include the AI-generated answer if available
-            if response.get('answer'):
-                formatted_results.append(f"**Summary Answer:** {response['answer']}\n")
+            # Basic depth first; escalate only when the results look weak
+            start = time.monotonic()
+            basic = client.search(query=query, timeout=timeout or 60, **self._options("basic"))
+            basic_seconds = time.monotonic() - start
+            score, left = self._escalation(query, basic, basic_seconds, timeout)
+            advanced, advanced_seconds = None, None
+            if left is not None:
+                start = time.monotonic()
+                try:
+                    advanced = client.search(query=query, timeout=left, **self._options("advanced"))
+                    advanced_seconds = time.monotonic() - start
+                except Exception:
+                    pass  # A failed escalation still has the basic results to fall back on
+            return self._settle(query, score, basic, basic_seconds, advanced, advanced_seconds)
             
-            # Format individual results
-            results = response.get('results', [])
-            for i, result in enumerate(results[:5], 1):
-                title = result.get('title', 'No title')
-                content = result.get('content', 'No content')
-                url = result.get('url', '')
-                
-                formatted_result = f"""
-**Result {i}:**
-Title: {title}
-Content: {content[:300]}{'...' if len(content) > 300 else ''}
-URL: {url}
-"""
-                formatted_results.append(formatted_result)
+        except Exception as e:
+            return f"Error performing web search: {str(e)}"
+    
+    async def _asearch(self, query: str, timeout: Optional[float] = None) -> Union[List[ResearchRecord], str]:
+        """Search Tavily without holding a thread while the request is in flight."""
+        try:
+            client = AsyncTavilyClient(api_key=self.api_key)
             
-            return "\n".join(formatted_results)
+            if self.depth_mode != "adaptive":
+                start = time.monotonic()
+                response = await client.search(query=query, timeout=timeout or 60, **self._options(self.depth_mode))
+                self._record_fixed(query, time.monotonic() - start)
+                return self._parse(query, response)
             
+            start = time.monotonic()
+            basic = await client.search(query=query, timeout=timeout or 60, **self._options("basic"))
+            basic_seconds = time.monotonic() - start
+            score, left = self._escalation(query, basic, basic_seconds, timeout)
+            advanced, advanced_seconds = None, None
+            if left is not None:
+                start = time.monotonic()
+                try:
+                    advanced = await client.search(query=query, timeout=left, **self._options("advanced"))
+                    advanced_seconds = time.monotonic() - start
+                except Exception:
+                    pass  # A failed escalation still has the basic results to fall back on
+            return self._settle(query, score, basic, basic_seconds, advanced, advanced_seconds)
         except Exception as e:
             return f"Error performing web search: {str(e)}"
     
-    async def _arun(self, query: str) -> str:
-        """Async version of the tool."""
-        return self._run(query)
+    def _escalation(self, query: str, basic: dict, basic_seconds: float, timeout: Optional[float]) -> tuple:
+        """Score the basic results: (score, timeout for an advanced retry, or None to keep them)."""
+        score = score_response(query, basic, SEARCH_OPTIONS["max_results"])["score"]
+        left = 60 if timeout is None else timeout - basic_seconds
+        if score >= self.escalate_score or left < MIN_ESCALATION_SECONDS:
+            return score, None
+        return score, left
+    
+    def _settle(self, query: str, score: float, basic: dict, basic_seconds: float,
+                advanced: Optional[dict], advanced_seconds: Optional[float]) -> Union[List[ResearchRecord], str]:
+        """Record the adaptive decision and parse the results it kept."""
+        if advanced is None:
+            depth_decisions.record(query, "basic", score, basic_seconds, None)
+            return self._parse(query, basic)
+        depth_decisions.record(query, "advanced", score, basic_seconds, advanced_seconds)
+        return self._parse(query, advanced)
+    
+    def _record_fixed(self, query: str, seconds: float):
+        depth = self.depth_mode
+        depth_decisions.record(query, depth, None, seconds if depth == "basic" else None,
+                               seconds if depth == "advanced" else None, adaptive=False)
+    
+    @staticmethod
+    def _options(depth: str) -> dict:
+        options = {**SEARCH_OPTIONS, "search_depth": depth}
+        window = current_window()
+        if window is not None and window.since:
+            # Tavily filters by day; the window drops anything earlier within that day
+            options["start_date"] = window.since_date()
+        return options
+    
+    def _parse(self, query: str, response: dict) -> Union[List[ResearchRecord], str]:
+        if not response or 'results' not in response:
+            return f"No search results found for query: {query}"
+        
+        records = []
+        
+        # Include the AI-generated answer if available
+        if response.get('answer'):
+            records.append(ResearchRecord(source=self.name, kind="answer", text=response['answer']))
+        
+        for result in response.get('results', [])[:5]:
+            records.append(ResearchRecord(
+                source=self.name,
+                kind="web",
+                title=result.get('title', 'No title'),
+                url=result.get('url', ''),
+                text=result.get('content') or '',
+                published=parse_timestamp(result.get('published_date', '')),
+                score=float(result.get('score') or 0.0)
+            ))
+        
+        return records
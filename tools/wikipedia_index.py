@@ -0,0 +1,279 @@
+"""
+Offline Wikipedia abstracts index - memory-mapped title/token lookups
+
+Build once from a Wikipedia abstracts dump (enwiki-*-abstract.xml[.gz]) or a
+JSONL file of {"title", "url", "abstract"} records:
+
+    python -m tools.wikipedia_index build enwiki-latest-abstract.xml.gz wiki_abstracts.idx
+    python -m tools.wikipedia_index search wiki_abstracts.idx "machine learning"
+
+File layout (native little-endian byte order, every section 8-byte aligned):
+    header | doc offsets (u64, n+1) | doc blob (title \\x1f url \\x1f abstract)
+    | title hashes (u64, sorted) | title doc ids (u32)
+    | term hashes (u64, sorted) | term posting starts (u64, t+1) | postings (u32)
+
+Postings carry the doc id in the low 31 bits and a title-match flag in the top bit.
+"""
+import bisect
+from array import array
+import gzip
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"WKABIDX1"
+HEADER = struct.Struct("<8sQQQQQQQQQ")
+TITLE_FLAG = 1 << 31
+SEPARATOR = "\x1f"
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the to was were which with".split()
+)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens without stopwords."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS and len(token) > 1]
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(_TOKEN_RE.findall(title.lower()))
+
+
+def stable_hash(text: str) -> int:
+    """64-bit hash that is identical across processes (unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def iter_dump(path: str) -> Iterator[Tuple[str, str, str]]:
+    """Yield (title, url, abstract) from an abstracts XML dump or a JSONL file."""
+    opener = gzip.open if path.endswith(".gz") else open
+    if ".jsonl" in path:
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record.get("title", ""), record.get("url", ""), record.get("abstract", "")
+        return
+
+    from xml.etree.ElementTree import iterparse
+
+    with opener(path, "rb") as f:
+        fields = {}
+        for _, element in iterparse(f, events=("end",)):
+            if element.tag in ("title", "url", "abstract"):
+                fields[element.tag] = element.text or ""
+            elif element.tag == "doc":
+                title = fields.get("title", "")
+                if title.startswith("Wikipedia: "):
+                    title = title[len("Wikipedia: "):]
+                abstract = fields.get("abstract", "")
+                # Skip disambiguation stubs and empty abstracts
+                if title and abstract and not abstract.endswith("may refer to:"):
+                    yield title, fields.get("url", ""), abstract
+                fields = {}
+                element.clear()
+
+
+def _align(f):
+    padding = (-f.tell()) % 8
+    if padding:
+        f.write(b"\0" * padding)
+
+
+def build_index(source: str, output: str, max_postings: int = 200) -> dict:
+    """Build the index file from a dump; returns build stats."""
+    doc_offsets = [0]
+    title_entries = []
+    title_postings: Dict[int, List[int]] = defaultdict(list)
+    body_postings: Dict[int, List[int]] = defaultdict(list)
+
+    with open(output + ".blob", "wb") as blob:
+        for doc_id, (title, url, abstract) in enumerate(iter_dump(source)):
+            record = SEPARATOR.join((title, url, abstract.replace(SEPARATOR, " "))).encode("utf-8")
+            blob.write(record)
+            doc_offsets.append(doc_offsets[-1] + len(record))
+            title_entries.append((stable_hash(normalize_title(title)), doc_id))
+
+            title_tokens = set(tokenize(title))
+            for token in title_tokens:
+                postings = title_postings[stable_hash(token)]
+                if len(postings) < max_postings:
+                    postings.append(doc_id | TITLE_FLAG)
+            for token in set(tokenize(abstract)) - title_tokens:
+                postings = body_postings[stable_hash(token)]
+                if len(postings) < max_postings:
+                    postings.append(doc_id)
+
+    doc_count = len(doc_offsets) - 1
+    title_entries.sort()
+    term_hashes = sorted(set(title_postings) | set(body_postings))
+
+    with open(output, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        sections = []
+
+        _align(f)
+        sections.append(f.tell())
+        f.write(array("Q", doc_offsets).tobytes())
+        _align(f)
+        sections.append(f.tell())
+        with open(output + ".blob", "rb") as blob:
+            while chunk := blob.read(1 << 20):
+                f.write(chunk)
+
+        _align(f)
+        sections.append(f.tell())
+        f.write(array("Q", (h for h, _ in title_entries)).tobytes())
+        _align(f)
+        sections.append(f.tell())
+        f.write(array("I", (d for _, d in title_entries)).tobytes())
+
+        _align(f)
+        sections.append(f.tell())
+        f.write(array("Q", term_hashes).tobytes())
+
+        starts = [0]
+        for term in term_hashes:
+            # Title matches first so the posting cap keeps the most relevant docs
+            starts.append(starts[-1] + min(max_postings, len(title_postings.get(term, ())) + len(body_postings.get(term, ()))))
+        _align(f)
+        sections.append(f.tell())
+        f.write(array("Q", starts).tobytes())
+
+        _align(f)
+        sections.append(f.tell())
+        for term in term_hashes:
+            postings = (title_postings.get(term, []) + body_postings.get(term, []))[:max_postings]
+            f.write(array("I", postings).tobytes())
+        size = f.tell()
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, doc_count, len(term_hashes), *sections))
+
+    os.remove(output + ".blob")
+    return {"docs": doc_count, "terms": len(term_hashes), "bytes": size}
+
+
+class WikipediaAbstractIndex:
+    """Read-only view over an index file; lookups touch only the pages they need."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.doc_count, self.term_count, doc_offsets, self._blob,
+         title_hashes, title_ids, term_hashes, term_starts, postings) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a Wikipedia abstracts index: {path}")
+
+        view = self._view = memoryview(self._mm)
+        n, t = self.doc_count, self.term_count
+        self._doc_offsets = view[doc_offsets:doc_offsets + 8 * (n + 1)].cast("Q")
+        self._title_hashes = view[title_hashes:title_hashes + 8 * n].cast("Q")
+        self._title_ids = view[title_ids:title_ids + 4 * n].cast("I")
+        self._term_hashes = view[term_hashes:term_hashes + 8 * t].cast("Q")
+        self._term_starts = view[term_starts:term_starts + 8 * (t + 1)].cast("Q")
+        self._postings_offset = postings
+
+    def document(self, doc_id: int) -> dict:
+        """Title, URL and abstract for a doc id."""
+        start = self._blob + self._doc_offsets[doc_id]
+        end = self._blob + self._doc_offsets[doc_id + 1]
+        title, url, abstract = self._mm[start:end].decode("utf-8").split(SEPARATOR, 2)
+        return {"title": title, "url": url, "abstract": abstract}
+
+    def lookup_title(self, title: str) -> Optional[dict]:
+        """Exact (normalized) title match."""
+        key = stable_hash(normalize_title(title))
+        i = bisect.bisect_left(self._title_hashes, key)
+        if i < self.doc_count and self._title_hashes[i] == key:
+            return self.document(self._title_ids[i])
+        return None
+
+    def _postings(self, token: str) -> memoryview:
+        key = stable_hash(token)
+        i = bisect.bisect_left(self._term_hashes, key)
+        if i >= self.term_count or self._term_hashes[i] != key:
+            return memoryview(b"").cast("I")
+        start = self._postings_offset + 4 * self._term_starts[i]
+        end = self._postings_offset + 4 * self._term_starts[i + 1]
+        return self._view[start:end].cast("I")
+
+    def search(self, query: str, limit: int = 3) -> List[dict]:
+        """Exact title match first, then docs ranked by idf-weighted token overlap."""
+        results = []
+        exact = self.lookup_title(query)
+        if exact:
+            results.append(exact)
+
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            postings = self._postings(token)
+            if not len(postings):
+                continue
+            idf = math.log(1 + self.doc_count / len(postings))
+            for posting in postings:
+                weight = 2.0 if posting & TITLE_FLAG else 1.0
+                scores[posting & ~TITLE_FLAG] += idf * weight
+
+        for doc_id in heapq.nlargest(limit, scores, key=scores.get):
+            document = self.document(doc_id)
+            if not exact or document["title"] != exact["title"]:
+                results.append(document)
+        return results[:limit]
+
+    def close(self):
+        self._doc_offsets.release()
+        self._title_hashes.release()
+        self._title_ids.release()
+        self._term_hashes.release()
+        self._term_starts.release()
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+
+_indexes: Dict[str, WikipediaAbstractIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_index(path: str) -> Optional[WikipediaAbstractIndex]:
+    """Open (once per process) the index at path, or None if it is missing or invalid."""
+    with _indexes_lock:
+        if path not in _indexes:
+            try:
+                _indexes[path] = WikipediaAbstractIndex(path)
+            except (OSError, ValueError):
+                return None
+        return _indexes[path]
+
+
+def main(argv: List[str]):
+    if len(argv) >= 3 and argv[0] == "build":
+        stats = build_index(argv[1], argv[2])
+        print(f"✅ Indexed {stats['docs']:,} abstracts, {stats['terms']:,} terms ({stats['bytes'] / 1e6:.1f} MB) -> {argv[2]}")
+    elif len(argv) >= 3 and argv[0] == "search":
+        index = open_index(argv[1])
+        if index is None:
+            print(f"❌ Could not open index: {argv[1]}")
+            return
+        for document in index.search(" ".join(argv[2:])):
+            print(f"{document['title']} - {document['url']}\n  {document['abstract'][:200]}")
+    else:
+        print("Usage:\n  python -m tools.wikipedia_index build <dump.xml[.gz]|records.jsonl[.gz]> <output.idx>\n"
+              "  python -m tools.wikipedia_index search <index.idx> <query>")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,10 +1,19 @@
 """
 Wikipedia Tool - For getting definitions and foundational knowledge
 """
-from typing import Optional, Type
-from langchain.tools import BaseTool
+from typing import List, Optional, Type, Union
 from pydantic import BaseModel, Field
-import wikipedia
+from tools.base import ResearchTool
+from tools.records import ResearchRecord
+from tools.wikipedia_index import open_index
+import httpx
+import requests
+import os
+import re
+
+# MediaWiki action API; one request finds the pages and returns their intro sentences
+API_URL = "https://en.wikipedia.org/w/api.php"
+USER_AGENT = "LinkedIn-Content-Strategist (research tool)"
 
 
 class WikipediaSearchInput(BaseModel):
@@ -12,64 +21,104 @@ class WikipediaSearchInput(BaseModel):
     query: str = Field(description="Search query for Wikipedia articles")
 
 
-class WikipediaSearchTool(BaseTool):
+class WikipediaSearchTool(ResearchTool):
     """Tool for searching Wikipedia for definitions, historical context, and foundational knowledge."""
     
     name: str = "wikipedia_search"
     description: str = "Search Wikipedia for definitions, historical context, foundational knowledge about topics, people, or companies. Best for factual information and background context."
     args_schema: Type[BaseModel] = WikipediaSearchInput
+    default_timeout: float = 15
+    index_path: Optional[str] = Field(default_factory=lambda: os.getenv("WIKIPEDIA_INDEX_PATH"))
+    
+    def search_records(self, query: str, allow_fallback: bool = True) -> Union[List[ResearchRecord], str]:
+        """Answer from the offline abstracts index when possible, else the live API."""
+        local_records = self._search_local(query)
+        if local_records:
+            return local_records
+        return super().search_records(query, allow_fallback)
+    
+    async def asearch_records(self, query: str, allow_fallback: bool = True) -> Union[List[ResearchRecord], str]:
+        """Async version of search_records; the index lookup is fast enough to run on the loop."""
+        local_records = self._search_local(query)
+        if local_records:
+            return local_records
+        return await super().asearch_records(query, allow_fallback)
+    
+    def _search_local(self, query: str) -> Optional[List[ResearchRecord]]:
+        """Look the query up in the memory-mapped abstracts index; None on a miss."""
+        if not self.index_path:
+            return None
+        index = open_index(self.index_path)
+        if index is None:
+            return None
+        
+        records = []
+        for document in index.search(query, limit=3):
+            sentences = re.split(r"(?<=[.!?])\s+", document["abstract"])
+            records.append(ResearchRecord(
+                source=self.name,
+                kind="wiki",
+                title=document["title"],
+                url=document["url"],
+                text=" ".join(sentences[:3])
+            ))
+        return records or None
+    
+    def _params(self, query: str) -> dict:
+        return {
+            "action": "query",
+            "format": "json",
+            "generator": "search",
+            "gsrsearch": query,
+            "gsrlimit": 3,
+            "prop": "extracts|info|pageprops",
+            "exintro": 1,
+            "explaintext": 1,
+            "exsentences": 3,
+            "inprop": "url",
+            "ppprop": "disambiguation",
+            "redirects": 1
+        }
     
-    def _run(self, query: str) -> str:
-        """Execute the Wikipedia search."""
+    def _search(self, query: str, timeout: Optional[float] = None) -> Union[List[ResearchRecord], str]:
+        """Search Wikipedia with a per-attempt timeout."""
         try:
-            # Search for pages
-            search_results = wikipedia.search(query, results=3)
-            
-            if not search_results:
-                return f"No Wikipedia articles found for query: {query}"
-            
-            formatted_results = []
-            
-            for i, title in enumerate(search_results[:3], 1):
-                try:
-                    # Get page summary
-                    page = wikipedia.page(title)
-                    summary = wikipedia.summary(title, sentences=3)
-                    
-                    formatted_result = f"""
-**Article {i}: {title}**
-Summary: {summary}
-URL: {page.url}
-"""
-                    formatted_results.append(formatted_result)
-                    
-                except wikipedia.exceptions.DisambiguationError as e:
-                    # Handle disambiguation by taking the first option
-                    try:
-                        page = wikipedia.page(e.options[0])
-                        summary = wikipedia.summary(e.options[0], sentences=3)
-                        formatted_result = f"""
-**Article {i}: {e.options[0]}**
-Summary: {summary}
-URL: {page.url}
-"""
-                        formatted_results.append(formatted_result)
-                    except:
-                        continue
-                        
-                except wikipedia.exceptions.PageError:
-                    continue
-                except Exception:
-                    continue
-            
-            if not formatted_results:
-                return f"Could not retrieve Wikipedia content for query: {query}"
-            
-            return "\n".join(formatted_results)
+            response = requests.get(API_URL, params=self._params(query), headers={"User-Agent": USER_AGENT},
+                                    timeout=timeout or 10)
+            response.raise_for_status()
+            return self._parse(query, response.json())
             
+        except requests.exceptions.RequestException as e:
+            return f"Error searching Wikipedia: {str(e)}"
         except Exception as e:
+            return f"Unexpected error: {str(e)}"
+    
+    async def _asearch(self, query: str, timeout: Optional[float] = None) -> Union[List[ResearchRecord], str]:
+        """Search Wikipedia without holding a thread while the request is in flight."""
+        try:
+            async with httpx.AsyncClient(timeout=timeout or 10, headers={"User-Agent": USER_AGENT}) as client:
+                response = await client.get(API_URL, params=self._params(query))
+                response.raise_for_status()
+            return self._parse(query, response.json())
+            
+        except httpx.HTTPError as e:
             return f"Error searching Wikipedia: {str(e)}"
+        except Exception as e:
+            return f"Unexpected error: {str(e)}"
     
-    async def _arun(self, query: str) -> str:
-        """Async version of the tool."""
-        return self._run(query)
+    def _parse(self, query: str, data: dict) -> Union[List[ResearchRecord], str]:
+        pages = sorted(data.get("query", {}).get("pages", {}).values(), key=lambda page: page.get("index", 0))
+        if not pages:
+            return f"No Wikipedia articles found for query: {query}"
+        
+        # Disambiguation pages only list other articles
+        records = [
+            ResearchRecord(source=self.name, kind="wiki", title=page["title"], url=page.get("fullurl", ""),
+                           text=page["extract"])
+            for page in pages
+            if page.get("extract") and "disambiguation" not in page.get("pageprops", {})
+        ]
+        if not records:
+            return f"Could not retrieve Wikipedia content for query: {query}"
+        
+        return records
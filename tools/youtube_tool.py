@@ -1,11 +1,11 @@
 """
 YouTube Search Tool - For finding video content and tutorials
 """
-from typing import Optional, Type
-from langchain.tools import BaseTool
+from typing import List, Optional, Type, Union
 from pydantic import BaseModel, Field
+from tools.base import ResearchTool
+from tools.records import ResearchRecord, parse_count, parse_duration, parse_relative_age
 from youtube_search import YoutubeSearch
-import json
 
 
 class YouTubeSearchInput(BaseModel):
@@ -13,46 +13,38 @@ class YouTubeSearchInput(BaseModel):
     query: str = Field(description="Search query for YouTube videos")
 
 
-class YouTubeSearchTool(BaseTool):
+class YouTubeSearchTool(ResearchTool):
     """Tool for searching YouTube videos, tutorials, and expert discussions."""
     
     name: str = "youtube_search"
     description: str = "Search YouTube for video content, tutorials, reviews, and expert discussions. Best for finding educational content and visual explanations."
     args_schema: Type[BaseModel] = YouTubeSearchInput
+    default_timeout: float = 15
     
-    def _run(self, query: str) -> str:
-        """Execute the YouTube search."""
+    def _search(self, query: str, timeout: Optional[float] = None) -> Union[List[ResearchRecord], str]:
+        """Search YouTube with a per-attempt timeout."""
         try:
             # Search YouTube videos
-            results = YoutubeSearch(query, max_results=5).to_dict()
+            results = YoutubeSearch(query, max_results=5, timeout=timeout or 10).to_dict()
             
             if not results:
                 return f"No YouTube videos found for query: {query}"
             
-            # Format the results
-            formatted_results = []
-            for i, video in enumerate(results, 1):
-                title = video.get('title', 'No title')
-                channel = video.get('channel', 'Unknown channel')
-                duration = video.get('duration', 'Unknown duration')
-                views = video.get('views', 'Unknown views')
-                url = f"https://www.youtube.com{video.get('url_suffix', '')}"
-                
-                formatted_video = f"""
-**Video {i}:**
-Title: {title}
-Channel: {channel}
-Duration: {duration}
-Views: {views}
-URL: {url}
-"""
-                formatted_results.append(formatted_video)
+            records = []
+            for video in results:
+                records.append(ResearchRecord(
+                    source=self.name,
+                    kind="video",
+                    title=video.get('title', 'No title'),
+                    url=f"https://www.youtube.com{video.get('url_suffix', '')}",
+                    text=video.get('long_desc') or '',
+                    author=video.get('channel', ''),
+                    published=parse_relative_age(video.get('publish_time', '')),
+                    duration=parse_duration(video.get('duration')),
+                    views=parse_count(video.get('views'))
+                ))
             
-            return "\n".join(formatted_results)
+            return records
             
         except Exception as e:
             return f"Error searching YouTube: {str(e)}"
-    
-    async def _arun(self, query: str) -> str:
-        """Async version of the tool."""
-        return self._run(query)